@@ -3,85 +3,342 @@
 import os
 import re
 import json
-from typing import Any, Optional
-from openai import OpenAI
-
+import time
+import random
+import asyncio
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+from openai import APIError, AsyncOpenAI, BadRequestError, DefaultAsyncHttpxClient, DefaultHttpxClient, OpenAI, Timeout
+
+from app.ai_guard import AIUnavailable, ai_guard
+from app.intent_engine import detect_intent
+from app.language import detect_language
+from app.metrics import metrics
+from app.prompts import build_system_prompt
+from app.reply_cache import cache_key, is_cacheable, reply_cache
+from app.reply_engine import ai_fallback_reply
+from app.signals import Signals, classify
 from app.state import get_state, append_history, mark_handoff
+from app.summarizer import prompt_history, summary_message
+from app.template_engine import get_template
+from app.usage.service import usage_ledger
 
 # ==========================================================
-# OPENAI CLIENT (LAZY INIT — SAFE)
+# OPENAI CONFIG
 # ==========================================================
-def get_openai_client() -> OpenAI:
+OPENAI_POOL_SIZE = int(os.getenv("OPENAI_POOL_SIZE", "20"))
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "30"))
+OPENAI_CONNECT_TIMEOUT = float(os.getenv("OPENAI_CONNECT_TIMEOUT", "5"))
+OPENAI_KEEPALIVE_EXPIRY = float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", "60"))
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "2"))
+# Cached input tokens are billed at a discount (50% for the gpt-4o family)
+OPENAI_CACHED_INPUT_DISCOUNT = float(os.getenv("OPENAI_CACHED_INPUT_DISCOUNT", "0.5"))
+
+# Bot replies: stream the completion and give up after the budget
+AI_STREAMING = os.getenv("AI_STREAMING", "true").lower() in ("1", "true", "yes")
+AI_REPLY_BUDGET_MS = float(os.getenv("AI_REPLY_BUDGET_MS", "6000"))
+
+# call_gpt_json: ask for response_format=json_object (models that reject
+# it are remembered and fall back to extracting JSON from plain text)
+AI_JSON_MODE = os.getenv("AI_JSON_MODE", "true").lower() in ("1", "true", "yes")
+_json_mode_rejected: set = set()
+
+
+# ==========================================================
+# OPENAI CLIENTS (LAZY, ONE PER PROCESS — SAFE)
+# ==========================================================
+# One client = one keep-alive connection pool. Building a client per call
+# meant a fresh TCP + TLS handshake for every completion.
+_client: Optional[OpenAI] = None
+_async_client: Optional[AsyncOpenAI] = None
+_client_lock = threading.Lock()
+
+
+def _api_key() -> str:
     api_key = os.getenv("OPENAI_API_KEY")
     if not api_key:
         raise RuntimeError("OPENAI_API_KEY not configured")
-    return OpenAI(api_key=api_key)
+    return api_key
 
 
-# ==========================================================
-# GPT CALL
-# ==========================================================
-def call_gpt_json(prompt: str) -> Dict[str, Any]:
-    client = get_openai_client()   # <-- created ONLY when needed
-
-    response = client.chat.completions.create(
-        model="gpt-4.1-mini",
-        messages=[
-            {"role": "system", "content": "Return valid JSON only."},
-            {"role": "user", "content": prompt}
-        ],
-        temperature=0.4
+def _client_options() -> dict:
+    # base_url comes from OPENAI_BASE_URL (the SDK reads it itself)
+    return {
+        "max_retries": OPENAI_MAX_RETRIES,
+        "timeout": Timeout(OPENAI_TIMEOUT, connect=OPENAI_CONNECT_TIMEOUT),
+    }
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=OPENAI_POOL_SIZE,
+        max_keepalive_connections=OPENAI_POOL_SIZE,
+        keepalive_expiry=OPENAI_KEEPALIVE_EXPIRY,
     )
 
-    content = response.choices[0].message.content
-    return json.loads(content)
+
+def get_openai_client() -> OpenAI:
+    """
+    Shared sync client (scripts / worker threads).
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                options = _client_options()
+                _client = OpenAI(
+                    api_key=_api_key(),
+                    http_client=DefaultHttpxClient(limits=_limits(), timeout=options["timeout"]),
+                    **options,
+                )
+    return _client
+
+
+def get_async_openai_client() -> AsyncOpenAI:
+    """
+    Shared async client used by the WhatsApp bot. Created on first use,
+    i.e. on the app's event loop, and closed from the app lifespan.
+    """
+    global _async_client
+    if _async_client is None:
+        options = _client_options()
+        _async_client = AsyncOpenAI(
+            api_key=_api_key(),
+            http_client=DefaultAsyncHttpxClient(limits=_limits(), timeout=options["timeout"]),
+            **options,
+        )
+    return _async_client
+
+
+async def close_openai_clients() -> None:
+    global _client, _async_client
+    if _async_client is not None:
+        await _async_client.close()
+        _async_client = None
+    if _client is not None:
+        _client.close()
+        _client = None
+
+
+async def _chat_completion(
+    tenant: Optional[str] = None, project: Optional[str] = None, phone: Optional[str] = None, **kwargs
+):
+    """
+    Every bot completion goes through here: concurrency limits + circuit
+    breaker (ai_guard), latency and error metrics, usage accounting
+    attributed to tenant / project / phone.
+    Raises AIUnavailable when the guard refuses the call.
+    """
+    client = get_async_openai_client()
+    try:
+        async with ai_guard.call(tenant):
+            metrics.incr("ai.openai_calls")
+            started = time.perf_counter()
+            res = await client.chat.completions.create(**kwargs)
+    except AIUnavailable:
+        raise
+    except Exception:
+        metrics.incr("ai.openai_errors")
+        raise
+    latency_ms = (time.perf_counter() - started) * 1000
+    metrics.observe("ai.openai_ms", latency_ms)
+    _record_usage(getattr(res, "usage", None), kwargs["model"], latency_ms, tenant, project, phone)
+    return res
+
+
+async def _stream_completion(
+    tenant: Optional[str] = None, project: Optional[str] = None, phone: Optional[str] = None, **kwargs
+) -> Tuple[str, Any]:
+    """
+    Same as _chat_completion but consumes the reply incrementally.
+    Returns (text, usage).
+    """
+    client = get_async_openai_client()
+    parts, usage = [], None
+    try:
+        async with ai_guard.call(tenant):
+            metrics.incr("ai.openai_calls")
+            started = time.perf_counter()
+            stream = await client.chat.completions.create(
+                stream=True, stream_options={"include_usage": True}, **kwargs
+            )
+            async with stream:
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        if not parts:
+                            metrics.observe("ai.stream.first_token_ms", (time.perf_counter() - started) * 1000)
+                        parts.append(chunk.choices[0].delta.content)
+                    if chunk.usage:
+                        usage = chunk.usage
+    except asyncio.CancelledError:
+        # cut off by the reply budget: usage never arrives, so this call
+        # is missing from the ledger
+        metrics.incr("ai.usage.unmetered_calls")
+        raise
+    except AIUnavailable:
+        raise
+    except Exception:
+        metrics.incr("ai.openai_errors")
+        raise
+    latency_ms = (time.perf_counter() - started) * 1000
+    metrics.observe("ai.openai_ms", latency_ms)
+    _record_usage(usage, kwargs["model"], latency_ms, tenant, project, phone)
+    return "".join(parts), usage
+
+
+def _record_usage(
+    usage, model: str, latency_ms: float,
+    tenant: Optional[str] = None, project: Optional[str] = None, phone: Optional[str] = None,
+) -> None:
+    if usage is None:
+        metrics.incr("ai.usage.unmetered_calls")
+        return
+    details = getattr(usage, "prompt_tokens_details", None)
+    prompt_tokens = usage.prompt_tokens or 0
+    cached_tokens = (getattr(details, "cached_tokens", 0) or 0) if details else 0
+    completion_tokens = usage.completion_tokens or 0
+
+    metrics.incr("ai.prompt_tokens", prompt_tokens)
+    metrics.incr("ai.cached_prompt_tokens", cached_tokens)
+    metrics.incr("ai.completion_tokens", completion_tokens)
+    usage_ledger.record(
+        model, prompt_tokens, completion_tokens, cached_tokens=cached_tokens, latency_ms=latency_ms,
+        tenant=tenant, project=project, phone=phone,
+    )
+
+
+def _prompt_cache_ratio(discount: float = 1.0) -> float:
+    prompt = metrics.counter("ai.prompt_tokens")
+    return round(metrics.counter("ai.cached_prompt_tokens") * discount / prompt, 4) if prompt else 0.0
+
+
+# Share of input tokens served from the provider's prefix cache, and the
+# resulting cut in input-token cost
+metrics.gauge("ai.prompt_cache.hit_ratio", _prompt_cache_ratio)
+metrics.gauge("ai.prompt_cache.input_cost_reduction", lambda: _prompt_cache_ratio(OPENAI_CACHED_INPUT_DISCOUNT))
+
+
+def _cache_reply(key: Optional[tuple], reply: str, usage, started: float) -> None:
+    if key is None or not reply:
+        return
+    tokens = (usage.total_tokens or 0) if usage else 0
+    reply_cache.put(key, reply, tokens=tokens, latency_ms=(time.perf_counter() - started) * 1000)
+
 
 # ==========================================================
-# LANGUAGE DETECTION (USED BY WHATSAPP BOT)
+# BOT REPLY WITHIN A LATENCY BUDGET
 # ==========================================================
-def _detect_language(text: str) -> str:
-    hindi_words = [
-        "kya", "kab", "kaise", "ghar", "zameen", "flat",
-        "booking", "visit", "kal", "aaj", "weekend",
-        "paisa", "loan", "possession", "dekho", "dekhna",
-        "side", "wali", "area", "ke", "ki"
-    ]
-    t = text.lower()
-    hits = sum(1 for w in hindi_words if w in t)
-    if hits >= 4:
-        return "hindi"
-    if 2 <= hits < 4:
-        return "hinglish"
-    return "english"
+async def _generate_reply(
+    messages: list, temperature: float, max_tokens: int, attribution: Optional[dict] = None
+) -> Tuple[Optional[str], Any]:
+    """
+    LLM reply for call_ai, bounded by AI_REPLY_BUDGET_MS (waiting for a
+    free slot counts against it).
+    Returns (reply, usage); reply is None when the budget ran out.
+    """
+    started = time.perf_counter()
+    kwargs = {
+        **(attribution or {}), "model": "gpt-4o-mini", "messages": messages,
+        "temperature": temperature, "max_tokens": max_tokens,
+    }
+    try:
+        if AI_STREAMING:
+            reply, usage = await asyncio.wait_for(_stream_completion(**kwargs), AI_REPLY_BUDGET_MS / 1000)
+        else:
+            res = await asyncio.wait_for(_chat_completion(**kwargs), AI_REPLY_BUDGET_MS / 1000)
+            reply, usage = res.choices[0].message.content, res.usage
+    except asyncio.TimeoutError:
+        metrics.incr("ai.reply.budget_exceeded")
+        return None, None
+
+    metrics.incr("ai.reply.llm")
+    metrics.observe("ai.reply.llm_ms", (time.perf_counter() - started) * 1000)
+    return (reply or "").strip(), usage
+
+
+def _fallback_reply(state: dict, user_text: str, started: float) -> str:
+    """
+    Budget expired: answer from the templates for this message's intent.
+    """
+    intent = state.get("last_intent") or detect_intent(user_text)
+    reply = get_template(intent, state) or ai_fallback_reply(user_text, state.get("project_context"))
+    metrics.incr("ai.reply.fallback")
+    metrics.observe("ai.reply.fallback_ms", (time.perf_counter() - started) * 1000)
+    return reply
+
+
+def _prompt_messages(system_prompt: str, state: dict, user_text: str) -> list:
+    """
+    System prompt, summary of older turns, recent raw turns, new message.
+    The summary goes after the system prompt so the prefix stays cacheable.
+    """
+    msgs = [{"role": "system", "content": system_prompt}]
+    summary = summary_message(state)
+    if summary:
+        msgs.append({"role": "system", "content": summary})
+    for h in prompt_history(state):
+        msgs.append({"role": "assistant" if h["from"] == "bot" else "user", "content": h["text"]})
+    msgs.append({"role": "user", "content": user_text})
+    return msgs
+
+
+def _attribution(phone: str, state: dict) -> dict:
+    """
+    Who an LLM call is billed to (see app.usage).
+    """
+    project = state.get("project_context") or {}
+    return {
+        "tenant": state.get("tenant_id"),
+        "project": project.get("id") or project.get("name"),
+        "phone": phone,
+    }
+
+
+async def _answer(
+    phone: str, state: dict, user_text: str, key: Optional[tuple], messages: list, temperature: float, max_tokens: int
+) -> str:
+    """
+    LLM reply, or a fallback when the budget runs out, ai_guard refuses
+    the call (breaker open / no free slot) or the API call fails.
+    """
+    started = time.perf_counter()
+    try:
+        reply, usage = await _generate_reply(messages, temperature, max_tokens, attribution=_attribution(phone, state))
+    except (AIUnavailable, APIError):
+        # degraded mode: the buyer still gets an answer, without OpenAI
+        metrics.incr("ai.reply.degraded")
+        return ai_fallback_reply(user_text, state.get("project_context"))
+
+    if reply is None:
+        return _fallback_reply(state, user_text, started)
+    _cache_reply(key, reply, usage, started)
+    return reply
 
 
 # ==========================================================
 # WHATSAPP BOT AI (EXISTING LOGIC: keep behavior identical)
 # ==========================================================
-def call_ai(phone: str, user_text: str) -> str:
+async def call_ai(phone: str, user_text: str, signals: Optional[Signals] = None) -> str:
     """
     WhatsApp conversational handler (unchanged behavior).
-    Returns the assistant reply as a string.
+    Returns the assistant reply as a string. `signals` is the message's
+    app.signals.classify result when the caller already has it.
     """
     state = get_state(phone)
     project = state.get("project_context")
     history = state.get("conversation_history", [])
-    text_l = user_text.lower()
+    signals = signals or classify(user_text)
 
     # ==========================================================
     # VISIT RECOGNITION
     # ==========================================================
-    positive_visit_words = [
-        "visit", "site visit", "see property", "want to visit",
-        "schedule visit", "arrange visit", "book visit",
-        "show me property", "property visit"
-    ]
-
     if (
-        any(w in text_l for w in positive_visit_words)
+        signals.has("visit_request")
         and state.get("ai_mode") is True
         and state.get("stop_questions") is False
-        and ("not" not in text_l and "later" not in text_l and "after clarity" not in text_l)
+        and not signals.has("visit_deferral")
     ):
         reply = (
             "Great — a short site visit really gives clarity.\n"
@@ -96,9 +353,7 @@ def call_ai(phone: str, user_text: str) -> str:
     # ==========================================================
     # VISIT HANDOFF CONFIRMATION
     # ==========================================================
-    if state.get("visit_pending_confirmation") is True and any(
-        p in text_l for p in ["yes", "ok", "sure", "call", "confirm", "tomorrow", "morning", "evening"]
-    ):
+    if state.get("visit_pending_confirmation") is True and signals.has("confirmation"):
         state["qualified"] = True
         state["stop_questions"] = True
         state["ai_mode"] = False
@@ -115,12 +370,7 @@ def call_ai(phone: str, user_text: str) -> str:
     # ==========================================================
     # SAFETY FILTER
     # ==========================================================
-    personal = [
-        "who are you", "real name", "login", "password",
-        "email", "phone number", "personal details",
-        "openai account"
-    ]
-    if any(w in text_l for w in personal):
+    if signals.has("personal_info"):
         reply = (
             "I am Pragiti, your real estate assistant for this project. "
             "I help with verified information, availability and visit planning."
@@ -141,42 +391,30 @@ def call_ai(phone: str, user_text: str) -> str:
     # ==========================================================
     # LANGUAGE DETECTION
     # ==========================================================
-    lang = _detect_language(user_text)
+    lang = detect_language(state, user_text)
     state["language"] = lang
 
-    lang_hint = {
-        "english": "Reply in natural English.",
-        "hindi": "Reply in conversational Hindi.",
-        "hinglish": "Reply in natural Hinglish."
-    }.get(lang, "Reply in natural English.")
+    # ==========================================================
+    # REPLY CACHE (FIRST-TURN QUESTIONS ONLY)
+    # ==========================================================
+    key = None
+    # a summary means older turns were folded away: not a first turn
+    if is_cacheable(history) and not state.get("conversation_summary"):
+        key = cache_key(user_text, project, state.get("stop_questions") is True, lang)
+        cached = reply_cache.get(key)
+        if cached is not None:
+            append_history(phone, "user", user_text)
+            append_history(phone, "bot", cached)
+            return cached
 
     # ==========================================================
     # STOP MODE AFTER QUALIFICATION
     # ==========================================================
     if state.get("stop_questions") is True:
-        system_prompt = f"""
-You are Pragiti, a real estate assistant.
-
-STOP qualification questions.
-Only support with answers or clarifications.
-
-Be short, polite and factual.
-Confirm politely if user asks for visits.
-
-{lang_hint}
-"""
-        msgs = [{"role": "system", "content": system_prompt}]
-        for h in history[-6:]:
-            msgs.append({"role": "assistant" if h["from"] == "bot" else "user", "content": h["text"]})
-        msgs.append({"role": "user", "content": user_text})
-
-        res = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=msgs,
-            temperature=0.35,
-            max_tokens=70,
-        )
-        reply = res.choices[0].message.content.strip()
+        system_prompt = build_system_prompt(project, lang, stop_questions=True)
+        msgs = _prompt_messages(system_prompt, state, user_text)
+
+        reply = await _answer(phone, state, user_text, key, msgs, temperature=0.35, max_tokens=70)
         append_history(phone, "user", user_text)
         append_history(phone, "bot", reply)
         return reply
@@ -184,90 +422,15 @@ Confirm politely if user asks for visits.
     # ==========================================================
     # NORMAL MODE — EXCLUSIVITY / REDIRECTION / SHORT REPLIES
     # ==========================================================
-    project_name = project.get("name") or "this project"
-    project_location = project.get("location") or ""
-    project_price = project.get("price_range") or ""
-    project_units = project.get("unit_types") or ""
-    project_status = project.get("status") or ""
-    project_amenities = project.get("usp") or ""
-
-    hesitation_words = [
-        "just exploring", "time pass", "not sure", "thinking", "browsing"
-    ]
-    user_hesitant = any(w in text_l for w in hesitation_words)
+    user_hesitant = signals.has("exploring")
+    legality_trigger = signals.has("legal_query")
 
-    legality_words = [
-        "rera", "legal", "approval", "approved", "registration",
-        "noc", "title", "occupancy", "certificate"
-    ]
-    legality_trigger = any(w in text_l for w in legality_words)
-
-    system_prompt = f"""
-You are PRAGITI — a WhatsApp-style professional advisor for one builder/project only.
-
-PROJECT CONTEXT:
-- {project_name}, {project_location}, price {project_price}
-- Units: {project_units}
-- Status: {project_status}
-- Amenities: {project_amenities}
-
-COMMUNICATION RULES (MANDATORY):
-- Replies must be 2–4 sentences max, WhatsApp style.
-- Never send long paragraphs or lectures.
-- Answer the user's question directly first.
-- Speak warm, advisory, calm — not robotic.
-
-PROJECT EXCLUSIVITY RULE:
-- You only represent this builder’s verified projects.
-- Never suggest or search competitors' properties.
-- If users ask for another locality/project:
-    - Redirect focus back to this project’s advantages (ROI, lifestyle, connectivity).
-    - IF builder has another project there, mention it briefly in 1 line.
-    - Only elaborate if user explicitly says “Tell me more.”
-    - Always return focus to {project_name}.
-
-LEGITIMACY / RERA LOGIC:
-- If user asks about legality or RERA:
-    - Give the factual status.
-    - Add one line on developer compliance & buyer safety.
-- Do not talk legality unless user triggers it.
-
-UNCERTAINTY HANDLING:
-- If information is unknown or pending:
-    - Say: “this requires expert verification, I will confirm,”
-    - Do NOT make up data, timelines or guarantees.
-
-QUALIFICATION BEHAVIOR:
-- Extract details from user statements.
-- Ask at most ONE qualification question every 2–3 turns.
-- If user is hesitant or “just exploring” → DO NOT qualify, only support.
-
-PERSUASION BEHAVIOR:
-- Use ROI, appreciation potential, convenience, family comfort.
-- Keep it mild — no pressure.
-- After deeper clarity, gently suggest visit.
-
-{lang_hint}
-
-FORMAT:
-- short, human-like WhatsApp replies
-- answer-first
-- advisory tone
-"""
+    # Static rules first, project + language last (provider prefix caching)
+    system_prompt = build_system_prompt(project, lang)
 
-    msgs = [{"role": "system", "content": system_prompt}]
-    for h in history[-6:]:
-        msgs.append({"role": "assistant" if h["from"] == "bot" else "user", "content": h["text"]})
-    msgs.append({"role": "user", "content": user_text})
+    msgs = _prompt_messages(system_prompt, state, user_text)
 
-    res = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=msgs,
-        temperature=0.5,
-        max_tokens=75,
-    )
-
-    reply = res.choices[0].message.content.strip()
+    reply = await _answer(phone, state, user_text, key, msgs, temperature=0.5, max_tokens=75)
     append_history(phone, "user", user_text)
     append_history(phone, "bot", reply)
     return reply
@@ -276,27 +439,96 @@ FORMAT:
 # ==========================================================
 # NEW: HELPER FOR PILLAR-2 (STRICT JSON OUTPUT FOR GPT-4.1)
 # ==========================================================
-# We'll add call_gpt_json and helper functions here — ensure no conflict
-import typing  # kept minimal import if needed
+_json_decoder = json.JSONDecoder()
+# a whole double-quoted string (escapes included) or a single brace
+_JSON_TOKEN = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"|[{}]')
 
-def _extract_json_from_text(text: str) -> Optional[Dict[str, Any]]:
+
+def _balanced_end(text: str, start: int) -> Optional[int]:
     """
-    Try to extract a JSON object from a text response.
-    Returns parsed dict or None.
+    Index just past the "}" matching text[start]; string bodies are
+    skipped by the regex, so braces inside strings don't count.
     """
-    m = re.search(r"(\{[\s\S]*\})", text)
-    candidate = m.group(1) if m else text.strip()
+    depth = 0
+    for m in _JSON_TOKEN.finditer(text, start):
+        token = m.group()
+        if token == "{":
+            depth += 1
+        elif token == "}":
+            depth -= 1
+            if depth == 0:
+                return m.end()
+    return None  # unbalanced until the end (truncated output)
+
+
+def _find_json_object(text: str) -> Optional[Tuple[Dict[str, Any], int, int]]:
+    """
+    First top-level {...} that parses, as (object, start, end).
+    raw_decode parses in C and ignores whatever follows the object; when
+    it fails the balanced span is skipped as a whole, so candidates never
+    overlap and the text is scanned once.
+    """
+    start = text.find("{")
+    while start != -1:
+        try:
+            parsed, end = _json_decoder.raw_decode(text, start)
+            if isinstance(parsed, dict):
+                return parsed, start, end
+        except ValueError:
+            pass
+        end = _balanced_end(text, start)
+        if end is None:
+            return None
+        parsed = _loads_lenient(text[start:end])
+        if isinstance(parsed, dict):
+            return parsed, start, end
+        start = text.find("{", end)
+    return None
+
+
+def _loads_lenient(candidate: str) -> Any:
     try:
         return json.loads(candidate)
-    except Exception:
+    except ValueError:
         try:
-            cand2 = candidate.replace("'", '"')
-            return json.loads(cand2)
-        except Exception:
+            return json.loads(candidate.replace("'", '"'))
+        except ValueError:
             return None
 
 
-def call_gpt_json(
+def _extract_json_from_text(text: str) -> Optional[Dict[str, Any]]:
+    """
+    Try to extract a JSON object from a text response.
+    Returns parsed dict or None.
+    """
+    text = text.strip()
+    found = _find_json_object(text)
+    if found is None:
+        return _loads_lenient(text)
+
+    parsed, start, end = found
+    if start != text.find("{") or end != text.rfind("}") + 1:
+        # the old greedy first-"{"-to-last-"}" match would not have
+        # parsed, and call_gpt_json would have paid for a re-completion
+        metrics.incr("ai.json.retries_avoided")
+    return parsed
+
+
+def _retry_delay(base: float, attempt: int) -> float:
+    # exponential backoff with full jitter, so parallel callers spread out
+    return random.uniform(0, base * (2 ** attempt))
+
+
+def _json_mode_supported(model: str, messages: list) -> bool:
+    # the API rejects json_object mode unless a message mentions JSON
+    return (
+        AI_JSON_MODE
+        and model not in _json_mode_rejected
+        and any("json" in (m.get("content") or "").lower() for m in messages)
+    )
+
+
+async def call_gpt_json(
     system_prompt: str,
     user_prompt: str,
     model: str = "gpt-4.1",
@@ -308,7 +540,8 @@ def call_gpt_json(
     """
     Call the OpenAI chat completion, expect a JSON object in the assistant reply.
     Returns a dict: either the parsed JSON or {'error': '...'}.
-    Retries a small number of times if parsing fails.
+    Uses the provider's JSON mode when possible; retries a small number
+    of times (with jittered backoff) if parsing fails.
     """
     messages = [
         {"role": "system", "content": system_prompt},
@@ -316,23 +549,41 @@ def call_gpt_json(
     ]
 
     last_err = None
-    for attempt in range(retries + 1):
+    attempt = 0
+    while attempt <= retries:
+        json_mode = _json_mode_supported(model, messages)
+        kwargs = {"response_format": {"type": "json_object"}} if json_mode else {}
         try:
-            res = client.chat.completions.create(
+            res = await _chat_completion(
                 model=model,
                 messages=messages,
                 temperature=temperature,
                 max_tokens=max_tokens,
+                **kwargs,
             )
-            content = res.choices[0].message.content.strip()
+            content = (res.choices[0].message.content or "").strip()
             parsed = _extract_json_from_text(content)
-            if parsed is not None:
+            if isinstance(parsed, dict):
                 return parsed
             last_err = f"parse_failed: could not extract JSON from model output. raw: {content[:500]}"
+        except AIUnavailable as e:
+            last_err = f"ai_unavailable: {e.reason}"
+            break
+        except BadRequestError as e:
+            if json_mode and "response_format" in str(e):
+                # older / non-OpenAI model: redo this attempt right away
+                # with prompt-only JSON (not counted as a retry; the model
+                # is remembered, so this happens once)
+                print(f"⚠️ JSON mode not supported for {model}, using text extraction")
+                _json_mode_rejected.add(model)
+                last_err = f"json_mode_rejected: {str(e)}"
+                continue
+            last_err = f"api_error: {str(e)}"
         except Exception as e:
             last_err = f"api_error: {str(e)}"
-        # small backoff before retry
         if attempt < retries:
-            sleep(retry_delay)
+            metrics.incr("ai.json.retries")
+            await asyncio.sleep(_retry_delay(retry_delay, attempt))
+        attempt += 1
     return {"error": "strategy_generation_failed", "reason": last_err}
 
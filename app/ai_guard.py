@@ -0,0 +1,206 @@
+# app/ai_guard.py
+
+import asyncio
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+
+from app.metrics import metrics
+
+# ==========================================================
+# CONFIG
+# ==========================================================
+AI_MAX_CONCURRENCY = int(os.getenv("AI_MAX_CONCURRENCY", "32"))
+AI_TENANT_MAX_CONCURRENCY = int(os.getenv("AI_TENANT_MAX_CONCURRENCY", "8"))
+# How long a call may wait for a free slot before it is rejected
+AI_SLOT_TIMEOUT_MS = float(os.getenv("AI_SLOT_TIMEOUT_MS", "1000"))
+
+AI_BREAKER_WINDOW_SECONDS = float(os.getenv("AI_BREAKER_WINDOW_SECONDS", "30"))
+AI_BREAKER_MIN_CALLS = int(os.getenv("AI_BREAKER_MIN_CALLS", "10"))
+AI_BREAKER_ERROR_RATE = float(os.getenv("AI_BREAKER_ERROR_RATE", "0.5"))
+AI_BREAKER_SLOW_MS = float(os.getenv("AI_BREAKER_SLOW_MS", "5000"))
+AI_BREAKER_SLOW_RATE = float(os.getenv("AI_BREAKER_SLOW_RATE", "0.5"))
+AI_BREAKER_OPEN_SECONDS = float(os.getenv("AI_BREAKER_OPEN_SECONDS", "30"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+_STATE_CODES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class AIUnavailable(Exception):
+    """
+    The call was not attempted (breaker open or no free slot).
+    Callers should degrade (template / fallback reply).
+    """
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+# ==========================================================
+# CIRCUIT BREAKER
+# ==========================================================
+class CircuitBreaker:
+    """
+    closed    -> calls flow; outcomes are kept for the last window
+    open      -> every call is rejected until the cool-down passes
+    half_open -> ONE probe call; success closes, failure re-opens
+
+    Opens when, over at least min_calls in the window, the error rate or
+    the share of calls slower than slow_ms crosses its threshold.
+    """
+
+    def __init__(
+        self,
+        name: str = "ai.breaker",
+        window: float = AI_BREAKER_WINDOW_SECONDS,
+        min_calls: int = AI_BREAKER_MIN_CALLS,
+        error_rate: float = AI_BREAKER_ERROR_RATE,
+        slow_ms: float = AI_BREAKER_SLOW_MS,
+        slow_rate: float = AI_BREAKER_SLOW_RATE,
+        open_seconds: float = AI_BREAKER_OPEN_SECONDS,
+    ):
+        self.name = name
+        self.window = window
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.slow_ms = slow_ms
+        self.slow_rate = slow_rate
+        self.open_seconds = open_seconds
+
+        self.state = CLOSED
+        self._opened_at = 0.0
+        self._probe_inflight = False
+        self._outcomes: deque = deque()  # (ts, ok, slow)
+
+        metrics.gauge(f"{name}.state", lambda: _STATE_CODES[self.state])
+
+    def _transition(self, state: str, now: float) -> None:
+        if state == self.state:
+            return
+        print(f"⚠️ AI circuit breaker: {self.state} -> {state}")
+        metrics.incr(f"{self.name}.transition.{state}")
+        self.state = state
+        if state == OPEN:
+            self._opened_at = now
+            self._outcomes.clear()
+        self._probe_inflight = False
+
+    def allow(self, now: Optional[float] = None) -> bool:
+        now = time.monotonic() if now is None else now
+        if self.state == OPEN and now - self._opened_at >= self.open_seconds:
+            self._transition(HALF_OPEN, now)
+        if self.state == CLOSED:
+            return True
+        if self.state == HALF_OPEN and not self._probe_inflight:
+            self._probe_inflight = True
+            return True
+        return False
+
+    def record(self, ok: bool, latency_ms: float, now: Optional[float] = None) -> None:
+        now = time.monotonic() if now is None else now
+        slow = latency_ms >= self.slow_ms
+
+        if self.state == HALF_OPEN:
+            self._transition(CLOSED if ok and not slow else OPEN, now)
+            return
+        if self.state == OPEN:
+            return
+
+        self._outcomes.append((now, ok, slow))
+        while self._outcomes and now - self._outcomes[0][0] > self.window:
+            self._outcomes.popleft()
+
+        calls = len(self._outcomes)
+        if calls < self.min_calls:
+            return
+        errors = sum(1 for _, ok_, _ in self._outcomes if not ok_)
+        slows = sum(1 for _, _, slow_ in self._outcomes if slow_)
+        if errors / calls >= self.error_rate or slows / calls >= self.slow_rate:
+            self._transition(OPEN, now)
+
+
+# ==========================================================
+# GUARD (GLOBAL + PER-TENANT LIMITS, BREAKER)
+# ==========================================================
+class AIGuard:
+    """
+    Wrap every OpenAI call:
+
+        async with ai_guard.call(tenant):
+            res = await client.chat.completions.create(...)
+
+    Raises AIUnavailable instead of queueing forever when the provider
+    is slow or failing.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = AI_MAX_CONCURRENCY,
+        tenant_concurrency: int = AI_TENANT_MAX_CONCURRENCY,
+        slot_timeout_ms: float = AI_SLOT_TIMEOUT_MS,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
+        self.tenant_concurrency = tenant_concurrency
+        self.slot_timeout = slot_timeout_ms / 1000
+        self.breaker = breaker or CircuitBreaker()
+        self._global = asyncio.Semaphore(max_concurrency)
+        self._tenants: Dict[str, asyncio.Semaphore] = {}
+        self._inflight = 0
+
+        metrics.gauge("ai.guard.inflight", lambda: self._inflight)
+
+    def _tenant(self, tenant: str) -> asyncio.Semaphore:
+        sem = self._tenants.get(tenant)
+        if sem is None:
+            sem = self._tenants[tenant] = asyncio.Semaphore(self.tenant_concurrency)
+        return sem
+
+    async def _acquire(self, sem: asyncio.Semaphore, reason: str) -> None:
+        try:
+            await asyncio.wait_for(sem.acquire(), self.slot_timeout)
+        except asyncio.TimeoutError:
+            metrics.incr(f"ai.guard.rejected.{reason}")
+            raise AIUnavailable(reason)
+
+    @asynccontextmanager
+    async def call(self, tenant: Optional[str] = None):
+        tenant_sem = self._tenant(tenant or "default")
+        await self._acquire(tenant_sem, "tenant_busy")
+        try:
+            await self._acquire(self._global, "global_busy")
+        except AIUnavailable:
+            tenant_sem.release()
+            raise
+
+        try:
+            if not self.breaker.allow():
+                metrics.incr("ai.guard.rejected.breaker_open")
+                raise AIUnavailable("breaker_open")
+
+            self._inflight += 1
+            started = time.perf_counter()
+            try:
+                yield
+            except asyncio.CancelledError:
+                # cancelled by a latency budget: it was at least this slow
+                self.breaker.record(True, (time.perf_counter() - started) * 1000)
+                raise
+            except Exception:
+                self.breaker.record(False, (time.perf_counter() - started) * 1000)
+                raise
+            else:
+                self.breaker.record(True, (time.perf_counter() - started) * 1000)
+            finally:
+                self._inflight -= 1
+        finally:
+            self._global.release()
+            tenant_sem.release()
+
+
+# Singleton guard (shared by every OpenAI call in the process)
+ai_guard = AIGuard()
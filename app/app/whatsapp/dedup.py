@@ -0,0 +1,219 @@
+# app/app/whatsapp/dedup.py
+
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, List, Optional
+
+from app.metrics import metrics
+
+# --------------------------------------------------
+# CONFIG
+# --------------------------------------------------
+DEDUP_TTL_SECONDS = int(os.getenv("WHATSAPP_DEDUP_TTL_SECONDS", "900"))
+DEDUP_MAX_IDS = int(os.getenv("WHATSAPP_DEDUP_MAX_IDS", "200000"))
+DEDUP_PATH = os.getenv("WHATSAPP_DEDUP_PATH", "data/whatsapp_dedup.json")
+DEDUP_PERSIST_INTERVAL = int(os.getenv("WHATSAPP_DEDUP_PERSIST_SECONDS", "30"))
+
+
+# --------------------------------------------------
+# TIME-BUCKETED MESSAGE-ID INDEX
+# --------------------------------------------------
+class MessageDedup:
+    """
+    Remembers every message id seen in the last `ttl` seconds.
+
+    Ids live in time buckets (ttl / buckets seconds wide), so expiry
+    is dropping whole buckets instead of scanning ids. A hard cap on
+    the number of ids evicts the oldest ids first when Meta floods us.
+    """
+
+    def __init__(self, ttl: int = DEDUP_TTL_SECONDS, max_ids: int = DEDUP_MAX_IDS, buckets: int = 15):
+        self.ttl = ttl
+        self.max_ids = max_ids
+        self.bucket_width = max(1, ttl // buckets)
+
+        self._buckets: "OrderedDict[int, set]" = OrderedDict()
+        self._bucket_bytes = {}
+        self._size = 0
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    # ---------- lookups ----------
+    def seen(self, message_id: str, now: Optional[float] = None) -> bool:
+        """
+        Pure check, does NOT record the id (see remember()).
+        """
+        with self._lock:
+            self._expire(now or time.time())
+            for ids in self._buckets.values():
+                if message_id in ids:
+                    self.hits += 1
+                    return True
+            self.misses += 1
+            return False
+
+    def drop_seen(self, messages: Iterable[dict]) -> List[dict]:
+        """
+        Keep only messages whose id was NOT seen before (also drops
+        repeats inside the same delivery), preserving order.
+        Messages without an id are kept.
+        """
+        fresh, local = [], set()
+        for message in messages:
+            message_id = message.get("message_id")
+            if message_id:
+                if message_id in local or self.seen(message_id):
+                    continue
+                local.add(message_id)
+            fresh.append(message)
+        return fresh
+
+    def remember(self, message_ids: Iterable[str], now: Optional[float] = None) -> None:
+        now = now or time.time()
+        bucket = int(now // self.bucket_width)
+        with self._lock:
+            self._expire(now)
+            if self._buckets:
+                # keep buckets ordered oldest -> newest (clock skew, late loads)
+                bucket = max(bucket, next(reversed(self._buckets)))
+            ids = self._buckets.get(bucket)
+            if ids is None:
+                ids = self._buckets[bucket] = set()
+                self._bucket_bytes[bucket] = 0
+            for message_id in message_ids:
+                if message_id in ids:
+                    continue
+                ids.add(message_id)
+                size = sys.getsizeof(message_id)
+                self._bucket_bytes[bucket] += size
+                self._bytes += size
+                self._size += 1
+            self._enforce_cap()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+            self._bucket_bytes.clear()
+            self._size = 0
+            self._bytes = 0
+
+    # ---------- eviction ----------
+    def _expire(self, now: float) -> None:
+        oldest_live = int((now - self.ttl) // self.bucket_width)
+        while self._buckets:
+            bucket = next(iter(self._buckets))
+            if bucket >= oldest_live:
+                break
+            self._drop_bucket(bucket)
+
+    def _enforce_cap(self) -> None:
+        while self._size > self.max_ids and self._buckets:
+            bucket = next(iter(self._buckets))
+            ids = self._buckets[bucket]
+            # trim the oldest bucket only as much as needed
+            while ids and self._size > self.max_ids:
+                message_id = ids.pop()
+                size = sys.getsizeof(message_id)
+                self._bucket_bytes[bucket] -= size
+                self._bytes -= size
+                self._size -= 1
+                metrics.incr("whatsapp.dedup.evicted_cap")
+            if not ids:
+                self._drop_bucket(bucket)
+
+    def _drop_bucket(self, bucket: int) -> None:
+        ids = self._buckets.pop(bucket)
+        self._size -= len(ids)
+        self._bytes -= self._bucket_bytes.pop(bucket)
+
+    # ---------- stats ----------
+    def __len__(self) -> int:
+        return self._size
+
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return round(self.hits / total, 4) if total else 0.0
+
+    def memory_bytes(self) -> int:
+        """
+        Approximate footprint: id strings + set tables.
+        """
+        with self._lock:
+            tables = sum(sys.getsizeof(ids) for ids in self._buckets.values())
+            return self._bytes + tables
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self),
+            "buckets": len(self._buckets),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate(),
+            "memory_bytes": self.memory_bytes(),
+        }
+
+    # ---------- persistence ----------
+    def save(self, path: str = DEDUP_PATH) -> None:
+        """
+        Atomic snapshot (write temp file + rename).
+        """
+        with self._lock:
+            self._expire(time.time())
+            data = {
+                "bucket_width": self.bucket_width,
+                "buckets": {str(b): list(ids) for b, ids in self._buckets.items()},
+            }
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp, path)
+
+    def load(self, path: str = DEDUP_PATH) -> int:
+        """
+        Restore a snapshot; expired buckets are skipped.
+        Returns the number of ids loaded.
+        """
+        if not os.path.exists(path):
+            return 0
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            print("⚠️ Dedup snapshot unreadable, starting empty")
+            return 0
+
+        width = data.get("bucket_width") or self.bucket_width
+        for bucket, ids in sorted(data.get("buckets", {}).items(), key=lambda kv: int(kv[0])):
+            self.remember(ids, now=int(bucket) * width)
+        with self._lock:
+            self._expire(time.time())
+        return len(self)
+
+
+async def persist_forever(dedup: MessageDedup, path: str = DEDUP_PATH, interval: int = DEDUP_PERSIST_INTERVAL) -> None:
+    """
+    Background snapshot loop (started from app.main).
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(dedup.save, path)
+        except Exception as e:
+            print("❌ Dedup snapshot failed:", str(e))
+
+
+# Singleton index
+message_dedup = MessageDedup()
+
+metrics.gauge("whatsapp.dedup.entries", message_dedup.__len__)
+metrics.gauge("whatsapp.dedup.hit_rate", message_dedup.hit_rate)
+metrics.gauge("whatsapp.dedup.memory_bytes", message_dedup.memory_bytes)
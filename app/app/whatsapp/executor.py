@@ -0,0 +1,159 @@
+# app/app/whatsapp/executor.py
+
+import asyncio
+import os
+import time
+import traceback
+import zlib
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, List, Optional
+
+from app.metrics import metrics
+
+
+def default_shard_count(per_core: int = 16) -> int:
+    """
+    Work is I/O bound (Graph API, OpenAI) and the pipeline handler is a
+    coroutine, so a shard is cheap: run plenty per core.
+    """
+    return max(1, (os.cpu_count() or 1) * per_core)
+
+
+def shard_for(key: str, shards: int) -> int:
+    """
+    Stable phone -> shard mapping (crc32, NOT hash(): that is salted per process).
+    """
+    return zlib.crc32(key.encode("utf-8")) % shards
+
+
+# --------------------------------------------------
+# SHARDED, PER-KEY ORDERED EXECUTOR (actor-style mailboxes)
+# --------------------------------------------------
+class ShardedExecutor:
+    """
+    Every key (phone number) hashes to ONE shard. A shard is a bounded
+    mailbox drained by a single worker, so items for the same key are
+    processed strictly in order and never concurrently, while different
+    shards run in parallel.
+
+    Coroutine handlers are awaited on the loop; plain functions run on a
+    shared thread pool.
+    """
+
+    def __init__(
+        self,
+        handler: Callable,
+        shards: Optional[int] = None,
+        mailbox_size: int = 250,
+        name: str = "executor",
+    ):
+        self.handler = handler
+        self.shards = max(1, shards or default_shard_count())
+        self.mailbox_size = mailbox_size
+        self.name = name
+
+        self._mailboxes: List[asyncio.Queue] = []
+        self._tasks: List[asyncio.Task] = []
+        self._threads: Optional[ThreadPoolExecutor] = None
+        self._busy = 0
+
+        metrics.gauge(f"{name}.queue_depth", self.depth)
+        metrics.gauge(f"{name}.shard_depth_max", lambda: max(self.depths(), default=0))
+        metrics.gauge(f"{name}.shard_depths", self.depths)
+        metrics.gauge(f"{name}.shards_busy", lambda: self._busy)
+
+    # ---------- lifecycle ----------
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self) -> None:
+        if self._tasks:
+            return
+        self._mailboxes = [asyncio.Queue(maxsize=self.mailbox_size) for _ in range(self.shards)]
+        self._threads = ThreadPoolExecutor(
+            max_workers=self.shards, thread_name_prefix=f"{self.name}-shard"
+        )
+        self._tasks = [
+            asyncio.create_task(self._drain(i)) for i in range(self.shards)
+        ]
+
+    async def stop(self, drain_timeout: float = 10.0) -> None:
+        if not self._tasks:
+            return
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(mb.join() for mb in self._mailboxes)),
+                timeout=drain_timeout,
+            )
+        except asyncio.TimeoutError:
+            print(f"⚠️ {self.name} stopped with {self.depth()} queued items")
+
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._threads.shutdown(wait=False)
+        self._threads = None
+
+    # ---------- introspection ----------
+    def depths(self) -> List[int]:
+        return [mb.qsize() for mb in self._mailboxes]
+
+    def depth(self) -> int:
+        return sum(self.depths())
+
+    def shard_for(self, key: str) -> int:
+        return shard_for(key, self.shards)
+
+    # ---------- producer side ----------
+    def can_accept(self, keys: Iterable[str]) -> bool:
+        """
+        True if every target mailbox has room for the given keys
+        (one slot per key occurrence).
+        """
+        if not self.mailbox_size:
+            return True
+        wanted = Counter(self.shard_for(k) for k in keys)
+        return all(
+            self.mailbox_size - self._mailboxes[shard].qsize() >= n
+            for shard, n in wanted.items()
+        )
+
+    def submit(self, key: str, item: dict) -> bool:
+        """
+        Non-blocking. Returns False if the key's mailbox is full.
+        """
+        item.setdefault("enqueued_at", time.perf_counter())
+        try:
+            self._mailboxes[self.shard_for(key)].put_nowait(item)
+        except asyncio.QueueFull:
+            return False
+        return True
+
+    # ---------- consumer side ----------
+    async def _drain(self, shard: int) -> None:
+        loop = asyncio.get_running_loop()
+        mailbox = self._mailboxes[shard]
+        while True:
+            item = await mailbox.get()
+            started = time.perf_counter()
+            metrics.observe(f"{self.name}.queue_wait_ms", (started - item["enqueued_at"]) * 1000)
+
+            self._busy += 1
+            try:
+                if asyncio.iscoroutinefunction(self.handler):
+                    statuses = await self.handler(item)
+                else:
+                    statuses = await loop.run_in_executor(self._threads, self.handler, item)
+                for status in statuses or []:
+                    metrics.incr(f"{self.name}.processed.{status}")
+            except Exception:
+                metrics.incr(f"{self.name}.errors")
+                print(f"❌ {self.name} shard {shard} error")
+                traceback.print_exc()
+            finally:
+                self._busy -= 1
+                metrics.observe(f"{self.name}.processing_ms", (time.perf_counter() - started) * 1000)
+                mailbox.task_done()
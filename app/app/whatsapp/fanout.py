@@ -0,0 +1,74 @@
+# app/app/whatsapp/fanout.py
+
+from typing import Dict, Iterator, List
+
+
+# --------------------------------------------------
+# PAYLOAD FAN-OUT
+# --------------------------------------------------
+# Meta batches several messages (and several users) into one
+# delivery under load: entry[] -> changes[] -> value.messages[].
+# We walk ALL of them instead of only the first one.
+
+def iter_text_messages(payload: dict) -> Iterator[dict]:
+    """
+    Yield every actionable text message in a webhook payload,
+    in delivery order, as a flat dict.
+    """
+    for entry in payload.get("entry") or []:
+        for change in entry.get("changes") or []:
+            value = change.get("value") or {}
+            messages = value.get("messages")
+            if not messages:
+                continue
+
+            phone_number_id = (value.get("metadata") or {}).get("phone_number_id")
+
+            for message in messages:
+                if message.get("type") != "text":
+                    continue
+
+                from_number = message.get("from")
+                user_text = (message.get("text") or {}).get("body", "").strip()
+                if not from_number or not user_text:
+                    continue
+
+                yield {
+                    "phone": from_number,
+                    "text": user_text,
+                    "message_id": message.get("id"),
+                    "timestamp": _to_int(message.get("timestamp")),
+                    "phone_number_id": phone_number_id,
+                }
+
+
+def group_by_phone(messages) -> List[dict]:
+    """
+    Group messages per sender, preserving per-user order.
+    Within one user, messages are ordered by Meta's timestamp
+    (stable, so equal timestamps keep delivery order).
+    Users are returned in order of first appearance.
+    """
+    groups: Dict[str, List[dict]] = {}
+    for message in messages:
+        groups.setdefault(message["phone"], []).append(message)
+
+    batch = []
+    for phone, items in groups.items():
+        items.sort(key=lambda m: m["timestamp"])
+        batch.append({"phone": phone, "messages": items})
+    return batch
+
+
+def fan_out(payload: dict) -> List[dict]:
+    """
+    payload -> [{"phone": ..., "messages": [...]}, ...]
+    """
+    return group_by_phone(iter_text_messages(payload))
+
+
+def _to_int(value) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
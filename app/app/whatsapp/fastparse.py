@@ -0,0 +1,53 @@
+# app/app/whatsapp/fastparse.py
+
+import json
+import re
+
+# Optional faster decoder (pip install orjson); falls back to stdlib json
+try:
+    import orjson
+
+    def loads(raw: bytes):
+        return orjson.loads(raw)
+
+    JSON_DECODER = "orjson"
+except ImportError:
+    def loads(raw: bytes):
+        return json.loads(raw)
+
+    JSON_DECODER = "json"
+
+
+# --------------------------------------------------
+# RAW-BODY PRE-PARSER
+# --------------------------------------------------
+# Most deliveries are `statuses` (sent / delivered / read) or non-text
+# messages. Classify them on the raw bytes and skip json parsing entirely.
+#
+# This is safe because quotes inside JSON string values are always
+# escaped (\"), so an unescaped `"messages"` / `"type":"text"` can only
+# be a real key/value. A false "text" just falls through to the full
+# parse, which does the exact filtering anyway.
+
+# keys only: `"field": "messages"` is also present on status deliveries
+_MESSAGES_KEY = re.compile(rb'"messages"\s*:')
+_STATUSES_KEY = re.compile(rb'"statuses"\s*:')
+_TEXT_TYPE = re.compile(rb'"type"\s*:\s*"text"')
+
+PAYLOAD_TEXT = "text"
+PAYLOAD_STATUS = "status"
+PAYLOAD_OTHER = "other"
+
+
+def classify_payload(raw: bytes) -> str:
+    """
+    raw webhook body -> "text" | "status" | "other"
+    """
+    if not _MESSAGES_KEY.search(raw):
+        return PAYLOAD_STATUS if _STATUSES_KEY.search(raw) else PAYLOAD_OTHER
+
+    if not _TEXT_TYPE.search(raw):
+        # image / audio / reaction / interactive ... nothing for the funnel
+        return PAYLOAD_OTHER
+
+    return PAYLOAD_TEXT
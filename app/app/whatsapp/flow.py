@@ -1,24 +1,58 @@
+from typing import Optional
+
 from app.state import get_state, append_history
 from app.ai_engine import call_ai
+from app.intent_model import confident_intent
+from app.language import detect_language, message_language
+from app.metrics import metrics
+from app.signals import Signals, classify
+from app.template_engine import get_template
+
+# Keyword misses the on-box model may answer from templates (English
+# only). Visit / booking intents stay with call_ai (it runs the visit
+# confirmation flow).
+LOCAL_REPLY_INTENTS = {"greeting", "price_query", "location_query", "configuration_query"}
 
 def detect_language_from_text(text: str) -> str:
-    hindi_words = [
-        "kya", "kab", "kaise", "ghar", "zameen", "flat",
-        "booking", "visit", "kal", "aaj", "weekend",
-        "paisa", "loan", "possession", "dekho", "dekhna",
-        "side", "wali", "area", "ke", "ki"
-    ]
-    t = text.lower()
-    hits = sum(1 for w in hindi_words if w in t)
-
-    if hits >= 4:
-        return "hindi"
-    if 2 <= hits < 4:
-        return "hinglish"
-    return "english"
-
-
-def route_message(phone: str, text: str) -> str:
+    return message_language(text) or "english"
+
+
+def _local_reply(phone: str, state: dict, text: str, signals: Signals) -> Optional[str]:
+    """
+    Template reply for a message the keyword engine missed ("vague") but
+    the on-box intent model classifies confidently; saves a GPT call.
+    call_ai's visit / safety handling always goes first.
+    """
+    if signals.intent != "vague" or state.get("visit_pending_confirmation") or state.get("stop_questions"):
+        return None
+    if signals.has("visit_request") or signals.has("personal_info"):
+        return None
+
+    # templates are English: Hindi / Hinglish conversations (or a turn
+    # drifting that way) stay with call_ai. Probe a copy so call_ai's own
+    # detection isn't applied twice.
+    if state.get("language") not in (None, "english"):
+        return None
+    probe = {"language": state.get("language"), "language_score": state.get("language_score")}
+    if detect_language(probe, text) != "english":
+        return None
+
+    intent = confident_intent(text)
+    if intent not in LOCAL_REPLY_INTENTS:
+        return None
+    reply = get_template(intent, state)
+    if not reply:
+        return None
+
+    state["language"] = "english"
+    state["language_score"] = probe["language_score"]
+    metrics.incr("ai.intent_model.template_reply")
+    append_history(phone, "user", text)
+    append_history(phone, "bot", reply)
+    return reply
+
+
+async def route_message(phone: str, text: str, signals: Optional[Signals] = None) -> str:
     state = get_state(phone)
     step = state["step"]
     user_lang = state["language"]
@@ -100,7 +134,7 @@ def route_message(phone: str, text: str) -> str:
     # 4) DECISION STEP — hybrid
     # =============================
     if step == "decision":
-        t = text.lower()
+        signals = signals or classify(text)
 
         # ==============================================
         #  ** NEW BUSINESS-SAFETY BLOCK **
@@ -113,54 +147,49 @@ def route_message(phone: str, text: str) -> str:
         #
         # → DO NOT allow competitor suggestion
         # → AI must redirect and preserve exclusivity
+        # (keyword lists: app.signals.SIGNAL_KEYWORDS)
 
-        locality_change_words = [
-            "any project in", "any flat in", "different location",
-            "other project", "other locality", "another place",
-            "raja bazar", "raza bazar", "kankarbagh", "boring road",
-            "search other", "alternative project"
-        ]
-
-        if any(word in t for word in locality_change_words):
+        if signals.has("locality_change"):
             state["ai_mode"] = True
             state["exclusive_redirect"] = True  # IMPORTANT FLAG
-            return call_ai(phone, text)
+            return await call_ai(phone, text, signals)
 
         # ==============================================
         # LEGALITY TRIGGER
         # ==============================================
-        if any(x in t for x in ["rera", "approved", "legal", "permission", "authority", "registration", "brera"]):
+        if signals.has("legality"):
             state["ai_mode"] = True
             state["credibility_trigger"] = True
-            return call_ai(phone, text)
+            return await call_ai(phone, text, signals)
 
         # Visit intent DURING DECISION STAGE
-        if any(x in t for x in ["visit", "site", "see property", "meet", "come"]):
+        if signals.has("visit_interest"):
             state["ai_mode"] = True
-            return call_ai(phone, text)
+            return await call_ai(phone, text, signals)
 
         # User wants more info → AI MODE
-        if any(x in t for x in ["more", "details", "explain", "what about", "availability", "pricing"]):
+        if signals.has("more_info"):
             state["ai_mode"] = True
-            return call_ai(phone, text)
+            return await call_ai(phone, text, signals)
 
         # Unsure → AI MODE
-        if any(x in t for x in ["confused", "not sure", "thinking", "doubt"]):
+        if signals.has("hesitation"):
             state["ai_mode"] = True
-            return call_ai(phone, text)
+            return await call_ai(phone, text, signals)
 
-        # Default → AI MODE
+        # Default → AI MODE (unless the on-box model can answer it)
         state["ai_mode"] = True
-        return call_ai(phone, text)
+        return _local_reply(phone, state, text, signals) or await call_ai(phone, text, signals)
 
     # =============================
     # 5) ANY STEP AFTER AI MODE
     # =============================
     if state.get("ai_mode") is True:
         # NO RESTART — maintain context
-        return call_ai(phone, text)
+        signals = signals or classify(text)
+        return _local_reply(phone, state, text, signals) or await call_ai(phone, text, signals)
 
     # =============================
     # SAFETY FALLBACK
     # =============================
-    return call_ai(phone, text)
+    return await call_ai(phone, text, signals)
@@ -0,0 +1,341 @@
+# app/app/whatsapp/outbound.py
+
+import asyncio
+import heapq
+import itertools
+import os
+import random
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Deque, Dict, List, Optional
+
+from app.metrics import metrics
+from app.app.whatsapp import sender
+from app.app.whatsapp.outbox import Outbox, outbox, STATUS_SENT, STATUS_DROPPED
+
+# --------------------------------------------------
+# CONFIG
+# --------------------------------------------------
+# Cloud API throughput is per business phone number (default tier ~80 msg/s)
+NUMBER_RATE = float(os.getenv("WHATSAPP_SEND_RATE", "80"))
+NUMBER_BURST = float(os.getenv("WHATSAPP_SEND_BURST", "80"))
+# Pair rate limit: how fast we message the SAME buyer
+RECIPIENT_RATE = float(os.getenv("WHATSAPP_RECIPIENT_RATE", "1"))
+RECIPIENT_BURST = float(os.getenv("WHATSAPP_RECIPIENT_BURST", "5"))
+
+MAX_ATTEMPTS = int(os.getenv("WHATSAPP_SEND_MAX_ATTEMPTS", "6"))
+BACKOFF_BASE = float(os.getenv("WHATSAPP_SEND_BACKOFF_BASE", "0.5"))
+BACKOFF_MAX = float(os.getenv("WHATSAPP_SEND_BACKOFF_MAX", "60"))
+SEND_CONCURRENCY = int(os.getenv("WHATSAPP_SEND_CONCURRENCY", "20"))
+MAX_PENDING = int(os.getenv("WHATSAPP_SEND_MAX_PENDING", "10000"))
+
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+# --------------------------------------------------
+# TOKEN BUCKET
+# --------------------------------------------------
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        """
+        Seconds until one token is available (0 = available now).
+        """
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self, now: float) -> None:
+        self._refill(now)
+        self.tokens -= 1
+
+    def idle(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+
+def retry_after_seconds(value: Optional[str]) -> Optional[float]:
+    """
+    Retry-After is either delta-seconds or an HTTP date.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, retry_after: Optional[float] = None) -> float:
+    """
+    Exponential backoff with jitter, never shorter than Retry-After.
+    """
+    delay = min(BACKOFF_MAX, BACKOFF_BASE * (2 ** (attempt - 1)))
+    delay = random.uniform(delay / 2, delay * 1.5)
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return delay
+
+
+# --------------------------------------------------
+# SCHEDULER
+# --------------------------------------------------
+class OutboundScheduler:
+    """
+    Sends are scheduled, not fired inline.
+
+    - one token bucket per business phone number id + one per recipient
+    - one FIFO per recipient: only its head is eligible, so a message in
+      retry never gets overtaken by the next reply to the same buyer
+    - 429 / 5xx / transport errors retry with backoff + jitter,
+      honoring Retry-After; after MAX_ATTEMPTS the message is dropped
+    - with an outbox, a message is only eligible once it is durably
+      written, is marked sent / dropped when done, and anything still
+      pending at startup is re-sent
+    """
+
+    def __init__(self, max_attempts: int = MAX_ATTEMPTS, concurrency: int = SEND_CONCURRENCY, outbox: Optional[Outbox] = None):
+        self.max_attempts = max_attempts
+        self.concurrency = concurrency
+        self.outbox = outbox
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._inflight: set = set()
+
+        self._heap: List[tuple] = []
+        self._seq = itertools.count()
+        self._per_recipient: Dict[str, Deque[dict]] = {}
+        self._number_buckets: Dict[str, TokenBucket] = {}
+        self._recipient_buckets: Dict[str, TokenBucket] = {}
+        self._pending = 0
+
+        metrics.gauge("whatsapp.outbound.pending", lambda: self._pending)
+        metrics.gauge("whatsapp.outbound.inflight", lambda: len(self._inflight))
+
+    # ---------- lifecycle ----------
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    async def start(self) -> None:
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._slots = asyncio.Semaphore(self.concurrency)
+
+        if self.outbox is not None:
+            await asyncio.to_thread(self.outbox.open)
+            await asyncio.to_thread(self.outbox.prune)
+            replayed = await self._replay_outbox()
+            if replayed:
+                print(f"✅ Outbox: re-sending {replayed} unacknowledged messages")
+
+        self._task = asyncio.create_task(self._dispatch())
+
+    async def _replay_outbox(self) -> int:
+        replayed, after_id = 0, 0
+        while True:
+            rows = await asyncio.to_thread(self.outbox.pending, 1000, after_id)
+            if not rows:
+                return replayed
+            for row in rows:
+                row["scheduled_at"] = time.perf_counter()
+                self._enqueue(row)
+            replayed += len(rows)
+            after_id = rows[-1]["outbox_id"]
+
+    async def stop(self, drain_timeout: float = 10.0) -> None:
+        if self._task is None:
+            return
+        deadline = time.monotonic() + drain_timeout
+        while self._pending and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        if self._pending:
+            print(f"⚠️ Outbound scheduler stopped with {self._pending} unsent messages")
+
+        self._task.cancel()
+        await asyncio.gather(self._task, *self._inflight, return_exceptions=True)
+        self._task = None
+        self._loop = None
+
+        if self.outbox is not None:
+            # unsent rows stay pending and are replayed on next start
+            await asyncio.to_thread(self.outbox.close)
+
+    # ---------- producer side ----------
+    def schedule(self, to: str, text: str, phone_number_id: Optional[str] = None) -> bool:
+        """
+        Queue a text message. Safe to call from worker threads.
+        Returns False if the scheduler is not running or is full.
+        """
+        if self._loop is None:
+            metrics.incr("whatsapp.outbound.rejected_not_running")
+            return False
+        if self._pending >= MAX_PENDING:
+            metrics.incr("whatsapp.outbound.dropped_full")
+            return False
+
+        job = {
+            "to": to,
+            "text": text,
+            "phone_number_id": phone_number_id or sender.PHONE_NUMBER_ID or "default",
+            "attempts": 0,
+            "scheduled_at": time.perf_counter(),
+        }
+
+        if self.outbox is not None:
+            # durable first: becomes eligible once the group commit lands
+            loop = self._loop
+            future = self.outbox.append(to, text, job["phone_number_id"])
+            future.add_done_callback(lambda f: loop.call_soon_threadsafe(self._committed, job, f))
+        elif _on_loop(self._loop):
+            self._enqueue(job)
+        else:
+            self._loop.call_soon_threadsafe(self._enqueue, job)
+        return True
+
+    def _committed(self, job: dict, future) -> None:
+        if future.exception() is not None:
+            # still try to deliver, just without the restart guarantee
+            metrics.incr("whatsapp.outbound.not_durable")
+        else:
+            job["outbox_id"] = future.result()
+        self._enqueue(job)
+
+    def _enqueue(self, job: dict) -> None:
+        self._pending += 1
+        metrics.incr("whatsapp.outbound.scheduled")
+        queue = self._per_recipient.get(job["to"])
+        if queue:
+            queue.append(job)  # waits behind the current head
+            return
+        self._per_recipient[job["to"]] = deque([job])
+        self._push(job, time.monotonic())
+
+    def _push(self, job: dict, due: float) -> None:
+        heapq.heappush(self._heap, (due, next(self._seq), job))
+        self._wakeup.set()
+
+    def _finish(self, job: dict, status: str) -> None:
+        """
+        Head of a recipient's FIFO is done (sent or dropped): release the next one.
+        """
+        self._pending -= 1
+        if self.outbox is not None and job.get("outbox_id"):
+            self.outbox.mark(job["outbox_id"], status, job["attempts"])
+        queue = self._per_recipient.get(job["to"])
+        if queue:
+            queue.popleft()
+            if queue:
+                self._push(queue[0], time.monotonic())
+            else:
+                del self._per_recipient[job["to"]]
+
+    # ---------- dispatcher ----------
+    def _bucket(self, buckets: Dict[str, TokenBucket], key: str, rate: float, burst: float) -> TokenBucket:
+        bucket = buckets.get(key)
+        if bucket is None:
+            bucket = buckets[key] = TokenBucket(rate, burst)
+        return bucket
+
+    async def _dispatch(self) -> None:
+        while True:
+            if not self._heap:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            due = self._heap[0][0]
+            now = time.monotonic()
+            if due > now:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=due - now)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            _, _, job = heapq.heappop(self._heap)
+
+            number = self._bucket(self._number_buckets, job["phone_number_id"], NUMBER_RATE, NUMBER_BURST)
+            recipient = self._bucket(self._recipient_buckets, job["to"], RECIPIENT_RATE, RECIPIENT_BURST)
+            wait = max(number.wait_time(now), recipient.wait_time(now))
+            if wait > 0:
+                metrics.incr("whatsapp.outbound.throttled")
+                self._push(job, now + wait)
+                continue
+
+            number.take(now)
+            recipient.take(now)
+
+            await self._slots.acquire()
+            task = asyncio.create_task(self._send(job))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+            if len(self._recipient_buckets) > 10000:
+                self._prune_buckets(now)
+
+    async def _send(self, job: dict) -> None:
+        try:
+            job["attempts"] += 1
+            response = await sender.send_whatsapp_message_async(job["to"], job["text"])
+        finally:
+            self._slots.release()
+
+        if response is not None and response.status_code < 300:
+            metrics.incr("whatsapp.outbound.sent")
+            metrics.observe("whatsapp.outbound.delivery_ms", (time.perf_counter() - job["scheduled_at"]) * 1000)
+            self._finish(job, STATUS_SENT)
+            return
+
+        status = response.status_code if response is not None else None
+        # None = transport error (retry), unless the sender isn't configured at all
+        retryable = status in RETRYABLE_STATUS or (status is None and sender.is_configured())
+        if not retryable or job["attempts"] >= self.max_attempts:
+            metrics.incr("whatsapp.outbound.dropped")
+            print(f"❌ WhatsApp message to {job['to']} dropped after {job['attempts']} attempts (status {status})")
+            self._finish(job, STATUS_DROPPED)
+            return
+
+        retry_after = None
+        if response is not None:
+            retry_after = retry_after_seconds(response.headers.get("Retry-After"))
+            if status == 429:
+                metrics.incr("whatsapp.outbound.rate_limited")
+        metrics.incr("whatsapp.outbound.retried")
+        self._push(job, time.monotonic() + backoff_delay(job["attempts"], retry_after))
+
+    def _prune_buckets(self, now: float) -> None:
+        for key in [k for k, b in self._recipient_buckets.items() if b.idle(now)]:
+            del self._recipient_buckets[key]
+
+
+def _on_loop(loop: asyncio.AbstractEventLoop) -> bool:
+    try:
+        return asyncio.get_running_loop() is loop
+    except RuntimeError:
+        return False
+
+
+# Singleton scheduler (started/stopped from app.main)
+outbound = OutboundScheduler(outbox=outbox)
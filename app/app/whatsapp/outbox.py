@@ -0,0 +1,239 @@
+# app/app/whatsapp/outbox.py
+
+import os
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from typing import List, Optional
+
+from app.metrics import metrics
+
+# --------------------------------------------------
+# CONFIG
+# --------------------------------------------------
+OUTBOX_PATH = os.getenv("WHATSAPP_OUTBOX_PATH", "data/whatsapp_outbox.sqlite3")
+# Group commit window: appends arriving within it share one transaction
+OUTBOX_FLUSH_MS = float(os.getenv("WHATSAPP_OUTBOX_FLUSH_MS", "5"))
+OUTBOX_MAX_BATCH = int(os.getenv("WHATSAPP_OUTBOX_MAX_BATCH", "500"))
+OUTBOX_RETENTION_DAYS = float(os.getenv("WHATSAPP_OUTBOX_RETENTION_DAYS", "7"))
+
+STATUS_PENDING = "pending"
+STATUS_SENT = "sent"
+STATUS_DROPPED = "dropped"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    to_number TEXT NOT NULL,
+    body TEXT NOT NULL,
+    phone_number_id TEXT,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS outbox_status ON outbox(status, id);
+"""
+
+
+# --------------------------------------------------
+# DURABLE OUTBOX (SQLite WAL, single writer, group commit)
+# --------------------------------------------------
+class Outbox:
+    """
+    Every outgoing reply is written here BEFORE the Graph API call and
+    marked sent / dropped afterwards, so a restart in between re-sends
+    instead of losing the reply.
+
+    One writer thread owns the connection. append() / mark() just queue
+    work; the writer drains whatever arrived within the flush window and
+    commits it in ONE transaction (one fsync for many rows).
+    """
+
+    def __init__(self, path: str = OUTBOX_PATH, flush_ms: float = OUTBOX_FLUSH_MS, max_batch: int = OUTBOX_MAX_BATCH):
+        self.path = path
+        self.flush_s = flush_ms / 1000
+        self.max_batch = max_batch
+
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._conn: Optional[sqlite3.Connection] = None
+        self._unacked = 0
+
+        metrics.gauge("whatsapp.outbox.unacked", lambda: self._unacked)
+
+    # ---------- lifecycle ----------
+    def open(self) -> None:
+        if self._thread is not None:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._unacked = self._conn.execute(
+            "SELECT COUNT(*) FROM outbox WHERE status = ?", (STATUS_PENDING,)
+        ).fetchone()[0]
+
+        self._thread = threading.Thread(target=self._writer, name="wa-outbox", daemon=True)
+        self._thread.start()
+
+    def close(self) -> None:
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join(timeout=10)
+        self._thread = None
+        self._conn.close()
+        self._conn = None
+
+    # ---------- writes (queued, group-committed) ----------
+    def append(self, to: str, text: str, phone_number_id: Optional[str] = None) -> Future:
+        """
+        Queue a new pending message. The returned Future resolves to the
+        row id once the row is committed.
+        """
+        future: Future = Future()
+        self._queue.put(("append", (to, text, phone_number_id), future))
+        return future
+
+    def mark(self, outbox_id: int, status: str, attempts: int = 0) -> None:
+        self._queue.put(("mark", (outbox_id, status, attempts), None))
+
+    def _writer(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.flush_s
+            stop = False
+            while len(batch) < self.max_batch:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    nxt = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if nxt is None:
+                    stop = True
+                    break
+                batch.append(nxt)
+
+            self._commit(batch)
+            if stop:
+                return
+
+    def _commit(self, batch: List[tuple]) -> None:
+        started = time.perf_counter()
+        now = time.time()
+        ids = []
+        try:
+            self._conn.execute("BEGIN")
+            for op, args, _ in batch:
+                if op == "append":
+                    to, text, phone_number_id = args
+                    cur = self._conn.execute(
+                        "INSERT INTO outbox (to_number, body, phone_number_id, status, created_at, updated_at) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        (to, text, phone_number_id, STATUS_PENDING, now, now),
+                    )
+                    ids.append(cur.lastrowid)
+                else:
+                    outbox_id, status, attempts = args
+                    self._conn.execute(
+                        "UPDATE outbox SET status = ?, attempts = ?, updated_at = ? WHERE id = ?",
+                        (status, attempts, now, outbox_id),
+                    )
+                    ids.append(None)
+            self._conn.execute("COMMIT")
+        except Exception as e:
+            self._conn.execute("ROLLBACK")
+            metrics.incr("whatsapp.outbox.commit_failed")
+            print("❌ Outbox commit failed:", str(e))
+            for _, _, future in batch:
+                if future is not None:
+                    future.set_exception(e)
+            return
+
+        metrics.observe("whatsapp.outbox.commit_ms", (time.perf_counter() - started) * 1000)
+        metrics.observe("whatsapp.outbox.batch_size", len(batch))
+        for (op, args, future), row_id in zip(batch, ids):
+            if op == "append":
+                self._unacked += 1
+                future.set_result(row_id)
+            elif args[1] != STATUS_PENDING:
+                self._unacked -= 1
+
+    # ---------- reads / maintenance (startup, ops) ----------
+    def pending(self, limit: int = 1000, after_id: int = 0) -> List[dict]:
+        """
+        Unacknowledged messages in send order, paged by id.
+        """
+        rows = self._read(
+            "SELECT id, to_number, body, phone_number_id, attempts FROM outbox "
+            "WHERE status = ? AND id > ? ORDER BY id LIMIT ?",
+            (STATUS_PENDING, after_id, limit),
+        )
+        return [
+            {"outbox_id": r[0], "to": r[1], "text": r[2], "phone_number_id": r[3], "attempts": r[4]}
+            for r in rows
+        ]
+
+    def requeue(self, since: float = 0.0) -> int:
+        """
+        Replay: flip dropped messages (updated after `since`) back to pending.
+        """
+        count = self._write(
+            "UPDATE outbox SET status = ?, updated_at = ? WHERE status = ? AND updated_at >= ?",
+            (STATUS_PENDING, time.time(), STATUS_DROPPED, since),
+        )
+        self._unacked += count
+        return count
+
+    def prune(self, retention_days: float = OUTBOX_RETENTION_DAYS) -> int:
+        """
+        Delete acknowledged rows older than the retention window.
+        """
+        cutoff = time.time() - retention_days * 86400
+        return self._write(
+            "DELETE FROM outbox WHERE status != ? AND updated_at < ?",
+            (STATUS_PENDING, cutoff),
+        )
+
+    def _read(self, sql: str, params: tuple) -> list:
+        # WAL: readers don't block the writer thread
+        conn = sqlite3.connect(self.path)
+        try:
+            return conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+    def _write(self, sql: str, params: tuple) -> int:
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                return conn.execute(sql, params).rowcount
+        finally:
+            conn.close()
+
+
+# Singleton outbox (opened/closed by the outbound scheduler)
+outbox = Outbox()
+
+
+if __name__ == "__main__":
+    # Ops: python -m app.app.whatsapp.outbox [requeue SINCE_UNIX_TS]
+    # Requeued rows are sent on the next app start.
+    import sys
+
+    outbox.open()
+    if len(sys.argv) > 2 and sys.argv[1] == "requeue":
+        print("✅ Requeued:", outbox.requeue(float(sys.argv[2])))
+    else:
+        counts = outbox._read("SELECT status, COUNT(*) FROM outbox GROUP BY status", ())
+        print(dict(counts))
+    outbox.close()
@@ -0,0 +1,179 @@
+# app/app/whatsapp/pipeline.py
+
+import os
+import time
+import traceback
+from typing import List
+
+from app.metrics import metrics
+from app.app.whatsapp.executor import ShardedExecutor, default_shard_count
+from app.app.whatsapp.outbound import outbound
+from app.signals import classify
+from app.state import (
+    get_state,
+    update_state_with_intent,
+    mark_handoff,
+    state_store,
+)
+
+# --------------------------------------------------
+# CONFIG
+# --------------------------------------------------
+# 0 = scale with cores (see executor.default_shard_count)
+SHARDS = int(os.getenv("WHATSAPP_SHARDS", "0")) or default_shard_count()
+# Per-shard mailbox bound
+QUEUE_SIZE = int(os.getenv("WHATSAPP_QUEUE_SIZE", "250"))
+
+# TEMP PROJECT FOR TESTING (until tenants/projects are wired in)
+DEFAULT_PROJECT_CONTEXT = {
+    "name": "Greenwood Residency",
+    "location": "Patna — Saguna More",
+    "price_range": "48L onwards",
+    "unit_types": "2BHK & 3BHK",
+    "usp": "clubhouse, parking, gated security, landscaped gardens, lift",
+    "status": "ready to move"
+}
+
+# --------------------------------------------------
+# MESSAGE HANDLER (async: the OpenAI / Graph calls are awaited, not blocking)
+# --------------------------------------------------
+async def handle_batch(job: dict) -> List[str]:
+    """
+    One job = all messages of ONE user from a webhook delivery.
+    They are handled strictly in order; one failing message does not
+    drop the ones after it.
+    """
+    statuses = []
+    for message in job["messages"]:
+        try:
+            # fresh state in, changed fields out (shared across workers);
+            # the backend I/O runs off the event loop
+            async with state_store.asession(job["phone"]):
+                statuses.append(await handle_message(job["phone"], message))
+        except Exception:
+            print(f"❌ WhatsApp message error ({job['phone']})")
+            traceback.print_exc()
+            statuses.append("error")
+    return statuses
+
+
+async def handle_message(from_number: str, message: dict) -> str:
+    """
+    Full funnel for ONE inbound text message:
+    intent -> state update -> handoff / route_message -> send.
+    Returns a short status string (used for metrics).
+    """
+    user_text = message["text"]
+    message_id = message.get("message_id")
+
+    # Load current state
+    state = get_state(from_number)
+
+    if not state.get("project_context"):
+        state["project_context"] = dict(DEFAULT_PROJECT_CONTEXT)
+    if not state.get("tenant_id"):
+        state["tenant_id"] = message.get("phone_number_id")
+
+    # Dedup happens in the webhook (dedup.message_dedup), before any state
+    state["last_message_id"] = message_id
+
+    # If already handed off to human, do nothing
+    if state.get("handoff_done"):
+        return "agent_handling"
+
+    # Classify once (intent + every signal) + update state
+    with metrics.timer("whatsapp.stage.intent_ms"):
+        signals = classify(user_text)
+        state = update_state_with_intent(from_number, signals.intent)
+
+    # If hot lead → handoff
+    if state.get("rank") == "hot" or signals.has("handoff_request"):
+        outbound.schedule(
+            from_number,
+            "✅ Perfect. Our advisor will call you shortly to confirm the details."
+        )
+        mark_handoff(from_number)
+        return "handoff"
+
+    # ====== FUNNEL HANDLER ======
+    from app.app.whatsapp.flow import route_message
+    with metrics.timer("whatsapp.stage.route_ms"):
+        reply_text = await route_message(from_number, user_text, signals)
+
+    # Rate-limited, retried send (see outbound.OutboundScheduler)
+    outbound.schedule(from_number, reply_text)
+    return "replied"
+
+
+# --------------------------------------------------
+# PIPELINE (per-phone ordered, sharded)
+# --------------------------------------------------
+class MessagePipeline:
+    """
+    The webhook only validates, fans out and enqueues.
+    Jobs are routed to a ShardedExecutor by phone number, so one buyer's
+    messages are handled strictly in order (no interleaved writes to
+    step / score / conversation_history) while different buyers run
+    concurrently.
+    """
+
+    def __init__(self, shards: int = SHARDS, queue_size: int = QUEUE_SIZE, handler=handle_batch):
+        self.executor = ShardedExecutor(
+            handler=handler,
+            shards=shards,
+            mailbox_size=queue_size,
+            name="whatsapp",
+        )
+
+    @property
+    def handler(self):
+        return self.executor.handler
+
+    @handler.setter
+    def handler(self, handler) -> None:
+        self.executor.handler = handler
+
+    # ---------- lifecycle ----------
+    async def start(self) -> None:
+        if self.executor.running:
+            return
+        await self.executor.start()
+        print(
+            f"✅ WhatsApp pipeline started: {self.executor.shards} shards, "
+            f"mailbox {self.executor.mailbox_size}"
+        )
+
+    async def stop(self, drain_timeout: float = 10.0) -> None:
+        await self.executor.stop(drain_timeout)
+
+    # ---------- producer side ----------
+    def depth(self) -> int:
+        return self.executor.depth()
+
+    def submit(self, batch: List[dict]) -> bool:
+        """
+        Non-blocking enqueue of a fanned-out batch (one job per user,
+        see fanout.fan_out). All-or-nothing: returns False if any target
+        shard can't take its jobs (caller should answer non-200 so Meta
+        redelivers later).
+        """
+        if not self.executor.running:
+            metrics.incr("whatsapp.rejected_not_running")
+            return False
+
+        if not self.executor.can_accept(job["phone"] for job in batch):
+            metrics.incr("whatsapp.rejected_queue_full")
+            return False
+
+        now = time.perf_counter()
+        for job in batch:
+            job.setdefault("enqueued_at", now)
+            self.executor.submit(job["phone"], job)
+            metrics.incr("whatsapp.enqueued_messages", len(job["messages"]))
+
+        metrics.incr("whatsapp.enqueued_jobs", len(batch))
+        return True
+
+
+# Singleton pipeline (started/stopped from app.main)
+pipeline = MessagePipeline()
@@ -1,16 +1,13 @@
 from fastapi import APIRouter, Request
-from fastapi.responses import PlainTextResponse
+from fastapi.responses import PlainTextResponse, JSONResponse
 import traceback
 import os
 
-from app.app.whatsapp.sender import send_whatsapp_message
-from app.intent_engine import detect_intent
-from app.template_engine import get_template
-from app.state import (
-    get_state,
-    update_state_with_intent,
-    mark_handoff,
-)
+from app.metrics import metrics
+from app.app.whatsapp.dedup import message_dedup
+from app.app.whatsapp.fastparse import classify_payload, loads, PAYLOAD_TEXT
+from app.app.whatsapp.fanout import iter_text_messages, group_by_phone
+from app.app.whatsapp.pipeline import pipeline
 
 router = APIRouter(prefix="/whatsapp", tags=["WhatsApp"])
 
@@ -36,82 +33,36 @@ async def verify_webhook(request: Request):
 # --------------------------------------------------
 # INCOMING WHATSAPP MESSAGE HANDLER
 # --------------------------------------------------
+# Validate, fan out, dedup + enqueue only. The actual funnel (intent, state, AI, send)
+# runs on the background pipeline so Meta gets its 200 immediately.
 @router.post("/webhook")
 async def receive_message(request: Request):
     try:
-        payload = await request.json()
+        raw = await request.body()
 
-        entry = payload.get("entry", [])
-        if not entry:
+        # Cheap rejection of status callbacks / non-text messages
+        kind = classify_payload(raw)
+        if kind != PAYLOAD_TEXT:
+            metrics.incr(f"whatsapp.fastpath.{kind}")
             return {"status": "ignored"}
 
-        changes = entry[0].get("changes", [])
-        if not changes:
-            return {"status": "ignored"}
-
-        value = changes[0].get("value", {})
-        messages = value.get("messages")
+        payload = loads(raw)
+        messages = list(iter_text_messages(payload))
         if not messages:
             return {"status": "ignored"}
 
-        message = messages[0]
-        if message.get("type") != "text":
-            return {"status": "ignored"}
-
-        from_number = message.get("from")
-        user_text = message.get("text", {}).get("body", "").strip()
-        message_id = message.get("id")
-
-        if not from_number or not user_text:
-            return {"status": "ignored"}
-
-        # Load current state
-        state = get_state(from_number)
-              # ============= ATTACH TEMP PROJECT FOR TESTING =============
-        if not state.get("project_context"):
-            state["project_context"] = {
-                "name": "Greenwood Residency",
-                "location": "Patna — Saguna More",
-                "price_range": "48L onwards",
-                "unit_types": "2BHK & 3BHK",
-                "usp": "clubhouse, parking, gated security, landscaped gardens, lift",
-                "status": "ready to move"
-            }
-        # ============================================================
-
-
-        # Dedup: ignore same message id
-        if state.get("last_message_id") == message_id:
+        # Dedup BEFORE any state is touched (Meta redelivers out of order)
+        messages = message_dedup.drop_seen(messages)
+        if not messages:
             return {"status": "duplicate_ignored"}
 
-        state["last_message_id"] = message_id
-
-        # If already handed off to human, do nothing
-        if state.get("handoff_done"):
-            return {"status": "agent_handling"}
-
-        # Detect intent
-        intent = detect_intent(user_text)
-
-        # Update state
-        state = update_state_with_intent(from_number, intent)
-
-        # If hot lead → handoff
-        explicit_handoff_keywords = ["call me", "site visit", "contact agent", "talk to person"]
-        if state.get("rank") == "hot" or any(k.lower() in user_text.lower() for k in explicit_handoff_keywords):
-            send_whatsapp_message(
-                from_number,
-                "✅ Perfect. Our advisor will call you shortly to confirm the details."
-            )
-            mark_handoff(from_number)
-            return {"status": "handoff"}
-
-        # ====== NEW FUNNEL HANDLER ======
-        from app.app.whatsapp.flow import route_message
-        reply_text = route_message(from_number, user_text)
+        if not pipeline.submit(group_by_phone(messages)):
+            # Non-200 so Meta retries once we have capacity again
+            return JSONResponse({"status": "busy"}, status_code=503)
 
-        send_whatsapp_message(from_number, reply_text)
-        return {"status": "received"}
+        # Only remember ids once they are safely queued
+        message_dedup.remember(m["message_id"] for m in messages if m["message_id"])
+        return {"status": "queued"}
 
     except Exception:
         print("❌ WhatsApp webhook error")
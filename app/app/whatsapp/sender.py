@@ -1,23 +1,67 @@
+import asyncio
+import importlib.util
 import os
-import requests
+import time
+from typing import Optional
+
+import httpx
+
+from app.metrics import metrics
 
 WHATSAPP_ACCESS_TOKEN = os.getenv("WHATSAPP_ACCESS_TOKEN")
 PHONE_NUMBER_ID = os.getenv("WHATSAPP_PHONE_NUMBER_ID")
+# Override to point at a local Graph stub (benchmarks/loadtest)
+GRAPH_API_URL = os.getenv("WHATSAPP_GRAPH_URL", "https://graph.facebook.com").rstrip("/")
+GRAPH_API_VERSION = os.getenv("WHATSAPP_GRAPH_VERSION", "v19.0")
 
-def send_whatsapp_message(to: str, text: str):
-    """
-    Send a WhatsApp text message using Meta Cloud API
-    """
+# Connection pool (shared keep-alive connections to graph.facebook.com)
+SEND_POOL_SIZE = int(os.getenv("WHATSAPP_SEND_POOL_SIZE", "20"))
+SEND_TIMEOUT = float(os.getenv("WHATSAPP_SEND_TIMEOUT", "10"))
+SEND_CONNECT_TIMEOUT = float(os.getenv("WHATSAPP_SEND_CONNECT_TIMEOUT", "5"))
+SEND_KEEPALIVE_EXPIRY = float(os.getenv("WHATSAPP_SEND_KEEPALIVE_EXPIRY", "60"))
+# HTTP/2 needs the optional `h2` package (pip install httpx[http2])
+SEND_HTTP2 = os.getenv("WHATSAPP_SEND_HTTP2", "false").lower() in ("1", "true", "yes")
 
-    if not WHATSAPP_ACCESS_TOKEN:
-        print("❌ WHATSAPP_ACCESS_TOKEN is missing")
-        return
+_client: Optional[httpx.AsyncClient] = None
+_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+# --------------------------------------------------
+# SHARED CLIENT LIFECYCLE (app startup / shutdown)
+# --------------------------------------------------
+def _build_client() -> httpx.AsyncClient:
+    http2 = SEND_HTTP2 and importlib.util.find_spec("h2") is not None
+    if SEND_HTTP2 and not http2:
+        print("⚠️ WHATSAPP_SEND_HTTP2 set but `h2` is not installed, using HTTP/1.1")
+
+    return httpx.AsyncClient(
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=SEND_POOL_SIZE,
+            max_keepalive_connections=SEND_POOL_SIZE,
+            keepalive_expiry=SEND_KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(SEND_TIMEOUT, connect=SEND_CONNECT_TIMEOUT),
+    )
 
-    if not PHONE_NUMBER_ID:
-        print("❌ WHATSAPP_PHONE_NUMBER_ID is missing")
-        return
 
-    url = f"https://graph.facebook.com/v19.0/{PHONE_NUMBER_ID}/messages"
+async def start_sender() -> None:
+    global _client, _loop
+    if _client is None:
+        _client = _build_client()
+        _loop = asyncio.get_running_loop()
+
+
+async def stop_sender() -> None:
+    global _client, _loop
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+        _loop = None
+
+
+def _request_parts(to: str, text: str):
+    url = f"{GRAPH_API_URL}/{GRAPH_API_VERSION}/{PHONE_NUMBER_ID}/messages"
 
     headers = {
         "Authorization": f"Bearer {WHATSAPP_ACCESS_TOKEN}",
@@ -32,15 +76,100 @@ def send_whatsapp_message(to: str, text: str):
             "body": text
         }
     }
+    return url, headers, payload
+
+
+def is_configured() -> bool:
+    return bool(WHATSAPP_ACCESS_TOKEN and PHONE_NUMBER_ID)
+
+
+def _configured() -> bool:
+    if not WHATSAPP_ACCESS_TOKEN:
+        print("❌ WHATSAPP_ACCESS_TOKEN is missing")
+        return False
+
+    if not PHONE_NUMBER_ID:
+        print("❌ WHATSAPP_PHONE_NUMBER_ID is missing")
+        return False
+
+    return True
+
+
+def _record(response: httpx.Response, started: float) -> None:
+    metrics.observe("whatsapp.send_ms", (time.perf_counter() - started) * 1000)
+
+    if response.status_code >= 300:
+        metrics.incr("whatsapp.send.failed")
+        print("❌ WhatsApp send failed")
+        print(response.status_code, response.text)
+    else:
+        metrics.incr("whatsapp.send.ok")
+        print("✅ WhatsApp message sent")
 
-    try:
-        response = requests.post(url, headers=headers, json=payload, timeout=10)
 
-        if response.status_code >= 300:
-            print("❌ WhatsApp send failed")
-            print(response.status_code, response.text)
-        else:
-            print("✅ WhatsApp message sent")
+# --------------------------------------------------
+# ASYNC SENDER (pooled, keep-alive)
+# --------------------------------------------------
+async def send_whatsapp_message_async(to: str, text: str) -> Optional[httpx.Response]:
+    """
+    Send a WhatsApp text message using Meta Cloud API over the shared pool.
+    Returns the response (None if not configured / transport error).
+    """
+    if not _configured():
+        return None
+
+    if _client is None:
+        # Not started (scripts, tests): one-off client
+        async with _build_client() as client:
+            return await _post(client, to, text)
 
+    return await _post(_client, to, text)
+
+
+async def _post(client: httpx.AsyncClient, to: str, text: str) -> Optional[httpx.Response]:
+    url, headers, payload = _request_parts(to, text)
+    started = time.perf_counter()
+    try:
+        response = await client.post(url, headers=headers, json=payload)
     except Exception as e:
+        metrics.incr("whatsapp.send.error")
         print("❌ WhatsApp request error:", str(e))
+        return None
+
+    _record(response, started)
+    return response
+
+
+def _running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+# --------------------------------------------------
+# SYNC COMPATIBILITY WRAPPER
+# --------------------------------------------------
+def send_whatsapp_message(to: str, text: str):
+    """
+    Send a WhatsApp text message using Meta Cloud API.
+    When the outbound scheduler is running the message goes through it
+    (written to the outbox first, rate limited, retried) and this returns
+    True once it is queued. Otherwise it hands the send to the app's event
+    loop so it reuses the shared connection pool. Must not be called from
+    the event loop thread itself (use send_whatsapp_message_async there).
+    """
+    # lazy: outbound imports this module
+    from app.app.whatsapp.outbound import outbound
+
+    if outbound.running:
+        return outbound.schedule(to, text)
+
+    loop = _loop
+    if loop is not None and loop.is_running():
+        if _running_loop() is loop:
+            raise RuntimeError("send_whatsapp_message() called on the event loop; await send_whatsapp_message_async()")
+        future = asyncio.run_coroutine_threadsafe(send_whatsapp_message_async(to, text), loop)
+        return future.result(timeout=SEND_TIMEOUT * 2)
+
+    return asyncio.run(send_whatsapp_message_async(to, text))
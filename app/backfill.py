@@ -0,0 +1,206 @@
+# app/backfill.py
+
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from datetime import datetime, timezone
+from itertools import islice
+from typing import IO, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app.intent_engine import detect_intent
+from app.state import apply_intent
+
+# ==========================================================
+# CONFIG
+# ==========================================================
+BACKFILL_CHUNK_SIZE = int(os.getenv("BACKFILL_CHUNK_SIZE", "2000"))
+# Chunks in flight per worker (bounds memory: nothing else is buffered)
+BACKFILL_PREFETCH = int(os.getenv("BACKFILL_PREFETCH", "2"))
+
+
+# ==========================================================
+# INPUT
+# ==========================================================
+def read_records(lines: Iterable[str]) -> Iterator[dict]:
+    """
+    NDJSON -> {"phone", "timestamp", "text"} records, lazily. Rows that
+    don't parse or have no phone/text are skipped (counted by the caller
+    via stats["skipped"]).
+    """
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            yield {}
+            continue
+        yield row if isinstance(row, dict) else {}
+
+
+def _chunks(records: Iterator[dict], size: int) -> Iterator[List[dict]]:
+    while True:
+        chunk = list(islice(records, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+# ==========================================================
+# CLASSIFICATION (RUNS IN WORKER PROCESSES)
+# ==========================================================
+def classify_chunk(texts: List[str]) -> List[str]:
+    """
+    Intents for a list of texts with the compiled keyword matcher.
+    Module-level so it pickles into a process pool.
+    """
+    return [detect_intent(text) for text in texts]
+
+
+def _classified(chunks: Iterator[List[dict]], executor: Optional[Executor], prefetch: int) -> Iterator[Tuple[List[dict], List[str]]]:
+    """
+    (chunk, intents) in input order. With an executor, at most `prefetch`
+    chunks are in flight, so a huge input never piles up in memory.
+    """
+    if executor is None:
+        for chunk in chunks:
+            yield chunk, classify_chunk([r.get("text") or "" for r in chunk])
+        return
+
+    pending: deque = deque()
+    for chunk in chunks:
+        pending.append((chunk, executor.submit(classify_chunk, [r.get("text") or "" for r in chunk])))
+        if len(pending) >= prefetch:
+            done, future = pending.popleft()
+            yield done, future.result()
+    while pending:
+        done, future = pending.popleft()
+        yield done, future.result()
+
+
+# ==========================================================
+# SCORING (SEQUENTIAL PER USER, IN THE PARENT)
+# ==========================================================
+def _new_user() -> dict:
+    # only the fields apply_intent reads / writes (no intent_history:
+    # it would grow with every record and scoring doesn't read it)
+    return {
+        "score": 0,
+        "rank": "cold",
+        "last_intent": None,
+        "message_count": 0,
+        "last_timestamp": None,
+    }
+
+
+def backfill(
+    records: Iterable[dict],
+    out: Optional[IO[str]] = None,
+    workers: int = 0,
+    chunk_size: int = BACKFILL_CHUNK_SIZE,
+    intent_weight: int = 5,
+) -> Tuple[Dict[str, dict], dict]:
+    """
+    Re-classify and re-score a stream of (phone, timestamp, text)
+    records with the current keyword tables and scoring weights.
+
+    Records must be in time order per phone (a global time-ordered
+    export is fine); each one is scored on top of that user's previous
+    records, exactly like update_state_with_intent did live. One result
+    line per record is written to `out` as it is produced.
+
+    workers: 0 = classify in this process, N = process pool of N.
+    Returns (per-user states, stats).
+    """
+    users: Dict[str, dict] = {}
+    last_seen: Dict[str, float] = {}  # phone -> last parsed timestamp
+    stats = {
+        "records": 0, "skipped": 0, "out_of_order": 0, "bad_timestamp": 0,
+        "users": 0, "seconds": 0.0, "records_per_sec": 0.0,
+    }
+    started = time.perf_counter()
+
+    valid = (r for r in records if _valid(r, stats))
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 0 else None
+    try:
+        for chunk, intents in _classified(_chunks(valid, chunk_size), executor, max(1, workers) * BACKFILL_PREFETCH):
+            for record, intent in zip(chunk, intents):
+                phone = str(record["phone"])
+                user = users.get(phone)
+                if user is None:
+                    user = users[phone] = _new_user()
+
+                ts = record.get("timestamp")
+                if ts is not None:
+                    seen = _ts(ts)
+                    if seen is None:
+                        stats["bad_timestamp"] += 1
+                    else:
+                        if phone in last_seen and seen < last_seen[phone]:
+                            stats["out_of_order"] += 1
+                        last_seen[phone] = seen
+                        user["last_timestamp"] = ts
+
+                apply_intent(user, intent, intent_weight, keep_history=False)
+                stats["records"] += 1
+                if out is not None:
+                    out.write(json.dumps({
+                        "phone": phone,
+                        "timestamp": ts,
+                        "intent": intent,
+                        "score": user["score"],
+                        "rank": user["rank"],
+                    }) + "\n")
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    stats["users"] = len(users)
+    stats["seconds"] = round(time.perf_counter() - started, 3)
+    stats["records_per_sec"] = round(stats["records"] / stats["seconds"], 1) if stats["seconds"] else 0.0
+    return users, stats
+
+
+def _valid(record: dict, stats: dict) -> bool:
+    if record.get("phone") and isinstance(record.get("text"), str):
+        return True
+    stats["skipped"] += 1
+    return False
+
+
+def _ts(value) -> Optional[float]:
+    """
+    Epoch seconds (number or numeric string) or ISO-8601 (naive = UTC)
+    -> epoch seconds; None if it is neither.
+    """
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if not isinstance(value, str):
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    text = value.strip()
+    if text.endswith(("Z", "z")):
+        text = text[:-1] + "+00:00"
+    try:
+        parsed = datetime.fromisoformat(text)
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def write_users(users: Dict[str, dict], out: IO[str]) -> None:
+    """
+    Final per-user score / rank, one NDJSON line per phone.
+    """
+    for phone, user in users.items():
+        out.write(json.dumps({"phone": phone, **user}) + "\n")
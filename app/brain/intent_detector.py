@@ -1,6 +1,6 @@
 # app/brain/intent_detector.py
 
-import re
+from app.intent_matcher import KeywordMatcher
 
 INTENTS = {
     "GREETING": [
@@ -57,12 +57,10 @@ INTENTS = {
 }
 
 
+_matcher = KeywordMatcher(INTENTS)
+
+
 def detect_intent(text: str) -> str:
     text = text.lower().strip()
 
-    for intent, keywords in INTENTS.items():
-        for keyword in keywords:
-            if re.search(r"\b" + re.escape(keyword) + r"\b", text):
-                return intent
-
-    return "UNKNOWN"
+    return _matcher.match(text) or "UNKNOWN"
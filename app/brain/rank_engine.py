@@ -1,23 +1,28 @@
 # app/brain/rank_engine.py
 
+from typing import Optional
+
 from app.brain.scoring_rules import (
     INTENT_SCORES,
-    NEGATIVE_SIGNALS,
     HOT_SCORE,
     WARM_SCORE
 )
+from app.signals import NEGATIVE, Signals, classify
+
 
+def update_score(state: dict, intent: str, text: str, signals: Optional[Signals] = None):
+    signals = signals or classify(text)
 
-def update_score(state: dict, intent: str, text: str):
-    # Positive scoring
+    # Positive scoring: the detected intent plus every other intent the
+    # message carries ("price and site visit?" counts both), once each
     score = INTENT_SCORES.get(intent, 0)
+    score += sum(
+        INTENT_SCORES.get(other, 0) for other in signals.brain_intents if other != intent
+    )
     state["score"] += score
 
-    # Negative scoring (basic text-based)
-    lowered = text.lower()
-    for phrase, penalty in NEGATIVE_SIGNALS.items():
-        if phrase in lowered:
-            state["score"] += penalty
+    # Negative scoring (NEGATIVE_SIGNALS phrases, each penalty once)
+    state["score"] += signals.weight(NEGATIVE)
 
 
 def update_rank(state: dict):
@@ -1,30 +1,33 @@
 # app/brain/state_manager.py
 
-from collections import defaultdict
+from app.state_store import create_store
 
-# In-memory store (for now)
-# Later this can be Redis / DB
-USER_STATE = defaultdict(dict)
+# Brain lead state per user, on the same backend as app.state
+# (STATE_BACKEND); each update below writes its changed fields back
+BRAIN_STATE = create_store("brain")
 
 
 def get_user_state(user_id: str) -> dict:
     """
     Returns current state for a user
     """
-    if user_id not in USER_STATE:
-        USER_STATE[user_id] = {
-            "intent_depth": defaultdict(int),
+    state = BRAIN_STATE.get(user_id)
+    if state is None:
+        state = {
+            "intent_depth": {},
             "last_intent": None,
             "score": 0,
             "rank": "COLD"
         }
-    return USER_STATE[user_id]
+        BRAIN_STATE.put(user_id, state)
+    return state
 
 
 def update_intent_depth(user_id: str, intent: str):
-    state = get_user_state(user_id)
-    state["intent_depth"][intent] += 1
-    state["last_intent"] = intent
+    with BRAIN_STATE.session(user_id):
+        state = get_user_state(user_id)
+        state["intent_depth"][intent] = state["intent_depth"].get(intent, 0) + 1
+        state["last_intent"] = intent
 
 
 def get_intent_depth(user_id: str, intent: str) -> int:
@@ -32,12 +35,13 @@ def get_intent_depth(user_id: str, intent: str) -> int:
     return state["intent_depth"].get(intent, 0)
 
 
-def update_lead_state(user_id: str, intent: str, text: str):
+def update_lead_state(user_id: str, intent: str, text: str, signals=None):
     from app.brain.rank_engine import update_score, update_rank
 
-    state = get_user_state(user_id)
+    with BRAIN_STATE.session(user_id):
+        state = get_user_state(user_id)
 
-    update_score(state, intent, text)
-    update_rank(state)
+        update_score(state, intent, text, signals)
+        update_rank(state)
 
     return state
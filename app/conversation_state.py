@@ -0,0 +1,307 @@
+# app/conversation_state.py
+
+import threading
+from collections.abc import MutableMapping
+from typing import Any, Callable, Dict, Iterable, Iterator, List
+
+# Bump when a stored field changes shape and add the step to MIGRATIONS
+SCHEMA_VERSION = 1
+
+
+# ==========================================================
+# INTENT HISTORY (ONE BYTE PER INTENT)
+# ==========================================================
+# Process-local intent <-> code table; codes never leave the process
+# (stored / serialised form is the list of names)
+_INTENT_NAMES: List[str] = []
+_INTENT_CODES: Dict[str, int] = {}
+_intent_lock = threading.Lock()
+
+
+def _intent_code(intent: str) -> int:
+    code = _INTENT_CODES.get(intent)
+    if code is None:
+        with _intent_lock:
+            code = _INTENT_CODES.get(intent)
+            if code is None:
+                if len(_INTENT_NAMES) > 255:
+                    raise ValueError("more than 256 distinct intents")
+                code = _INTENT_CODES[intent] = len(_INTENT_NAMES)
+                _INTENT_NAMES.append(intent)
+    return code
+
+
+class IntentHistory:
+    """
+    The list of detected intents as a bytearray of codes: append /
+    iterate / index / len / `in` behave like the old list of names.
+    """
+
+    __slots__ = ("_codes",)
+
+    def __init__(self, intents: Iterable[str] = ()):
+        self._codes = bytearray(_intent_code(intent) for intent in intents)
+
+    def append(self, intent: str) -> None:
+        self._codes.append(_intent_code(intent))
+
+    def __len__(self) -> int:
+        return len(self._codes)
+
+    def __iter__(self) -> Iterator[str]:
+        names = _INTENT_NAMES
+        return (names[code] for code in self._codes)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [_INTENT_NAMES[code] for code in self._codes[index]]
+        return _INTENT_NAMES[self._codes[index]]
+
+    def __contains__(self, intent: str) -> bool:
+        code = _INTENT_CODES.get(intent)
+        return code is not None and code in self._codes
+
+    def __eq__(self, other) -> bool:
+        return list(self) == list(other)
+
+    def __repr__(self) -> str:
+        return f"IntentHistory({list(self)!r})"
+
+    def to_json(self) -> List[str]:
+        return list(self)
+
+
+# ==========================================================
+# CONVERSATION HISTORY ENTRY
+# ==========================================================
+class HistoryEntry:
+    """
+    One turn: 2 slots instead of a {"from", "text"} dict. Readers keep
+    using entry["from"] / entry["text"] / entry.get(...).
+    """
+
+    __slots__ = ("sender", "text")
+
+    def __init__(self, sender: str, text: str):
+        self.sender = sender
+        self.text = text
+
+    def __getitem__(self, key: str) -> str:
+        if key == "from":
+            return self.sender
+        if key == "text":
+            return self.text
+        raise KeyError(key)
+
+    def get(self, key: str, default=None):
+        if key == "from":
+            return self.sender
+        if key == "text":
+            return self.text
+        return default
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, HistoryEntry):
+            return self.sender == other.sender and self.text == other.text
+        if isinstance(other, dict):
+            return other == {"from": self.sender, "text": self.text}
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"HistoryEntry({self.sender!r}, {self.text!r})"
+
+    def to_json(self) -> list:
+        # stored as [sender, text]
+        return [self.sender, self.text]
+
+
+# ==========================================================
+# STATE
+# ==========================================================
+# Field -> default (mutable defaults are built per instance, see _FACTORIES).
+# This is the single source of truth for all state fields.
+_DEFAULTS: Dict[str, Any] = {
+    # Scoring-related
+    "score": 0,
+    "rank": "cold",
+    "intent_history": None,
+    "last_intent": None,
+    "message_count": 0,
+
+    # Handoff / escalation
+    "handoff_done": False,
+
+    # Conversation flow
+    "step": "intro",
+    "ai_mode": None,
+    "exclusive_redirect": None,
+    "credibility_trigger": None,
+    "visit_pending_confirmation": None,
+    "last_message_id": None,
+
+    # Language preference (+ running score, see app.language)
+    "language": None,
+    "language_score": None,
+
+    # Qualification data
+    "budget": None,
+    "location": None,
+    "purpose": None,
+    "timeline": None,
+    "loan_flag": None,
+    "visit_time": None,
+    "qualified": False,
+
+    # Stop AI or funnel from asking more probing questions
+    "stop_questions": False,
+
+    # Behaviour tracking
+    "skip_count": 0,
+    "frustration_flags": None,
+
+    # Conversation memory (for AI fallback)
+    "conversation_history": None,
+    # Older turns folded into topics / questions (see app.summarizer)
+    "conversation_summary": None,
+
+    # Conversation mode
+    "conversation_mode": None,
+
+    # Full project context
+    "project_context": None,
+
+    # Tenant (WhatsApp business number until tenants are wired in)
+    "tenant_id": None,
+
+    "schema_version": SCHEMA_VERSION,
+}
+
+_FACTORIES: Dict[str, Callable[[], Any]] = {
+    "intent_history": IntentHistory,
+    "frustration_flags": list,
+    "conversation_history": list,
+}
+
+FIELDS = tuple(_DEFAULTS)
+_FIELD_SET = frozenset(FIELDS)
+
+
+class ConversationState(MutableMapping):
+    """
+    Per-phone state as fixed slots behind the same mapping interface the
+    code has always used (state["step"], state.get(...), update()).
+    Keys outside FIELDS still work; they live in a small side dict.
+
+    Old / stored shapes are upgraded once in from_dict() (store load),
+    never on access.
+    """
+
+    __slots__ = FIELDS + ("_extra",)
+
+    def __init__(self):
+        for field, default in _DEFAULTS.items():
+            setattr(self, field, default)
+        for field, factory in _FACTORIES.items():
+            setattr(self, field, factory())
+        self._extra = None
+
+    # ---------- mapping interface ----------
+    def __getitem__(self, key: str):
+        if key in _FIELD_SET:
+            return getattr(self, key)
+        if self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def get(self, key: str, default=None):
+        if key in _FIELD_SET:
+            return getattr(self, key)
+        if self._extra is not None:
+            return self._extra.get(key, default)
+        return default
+
+    def __setitem__(self, key: str, value) -> None:
+        if key in _FIELD_SET:
+            setattr(self, key, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __delitem__(self, key: str) -> None:
+        # known fields can't disappear, they go back to their default
+        if key in _FIELD_SET:
+            factory = _FACTORIES.get(key)
+            setattr(self, key, factory() if factory else _DEFAULTS[key])
+        elif self._extra is not None and key in self._extra:
+            del self._extra[key]
+        else:
+            raise KeyError(key)
+
+    def __contains__(self, key) -> bool:
+        return key in _FIELD_SET or (self._extra is not None and key in self._extra)
+
+    def __iter__(self) -> Iterator[str]:
+        yield from FIELDS
+        if self._extra:
+            yield from list(self._extra)
+
+    def __len__(self) -> int:
+        return len(FIELDS) + (len(self._extra) if self._extra else 0)
+
+    def __repr__(self) -> str:
+        return f"ConversationState({self.to_json()!r})"
+
+    # ---------- (de)serialisation ----------
+    def to_json(self) -> dict:
+        return {key: _jsonable(self[key]) for key in self}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ConversationState":
+        """
+        Stored or legacy (plain dict) state -> ConversationState, running
+        the schema migrations from its schema_version (0 = plain dict era).
+        """
+        data = dict(data)
+        version = data.get("schema_version") or 0
+        while version < SCHEMA_VERSION:
+            data = MIGRATIONS[version](data)
+            version += 1
+        data["schema_version"] = SCHEMA_VERSION
+
+        state = cls()
+        for key, value in data.items():
+            if key == "intent_history":
+                value = IntentHistory(value or ())
+            elif key == "conversation_history":
+                value = [HistoryEntry(sender, text) for sender, text in value or ()]
+            elif key in _FACTORIES and value is None:
+                value = _FACTORIES[key]()
+            state[key] = value
+        return state
+
+
+def _jsonable(value):
+    to_json = getattr(value, "to_json", None)
+    if to_json is not None:
+        return to_json()
+    if isinstance(value, list):
+        return [_jsonable(v) for v in value]
+    return value
+
+
+# ==========================================================
+# MIGRATIONS (version N -> N + 1, on the raw dict)
+# ==========================================================
+def _v0_to_v1(data: dict) -> dict:
+    # history entries {"from", "text"} -> [sender, text]
+    data["conversation_history"] = [
+        [entry.get("from"), entry.get("text")] if isinstance(entry, dict) else list(entry)
+        for entry in data.get("conversation_history") or ()
+    ]
+    return data
+
+
+MIGRATIONS: Dict[int, Callable[[dict], dict]] = {
+    0: _v0_to_v1,
+}
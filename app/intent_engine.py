@@ -1,4 +1,4 @@
-import re
+from app.intent_matcher import KeywordMatcher
 
 # --------------------------------
 # INTENT KEYWORDS (EN + HINGLISH + HINDI)
@@ -61,17 +61,15 @@ INTENT_KEYWORDS = {
 # INTENT DETECTOR
 # --------------------------------
 
+# compiled once; strict word boundary match, table order = priority
+_matcher = KeywordMatcher(INTENT_KEYWORDS)
+
+
 def detect_intent(text: str) -> str:
     if not text:
         return "vague"
 
     text = text.lower().strip()
 
-    for intent, keywords in INTENT_KEYWORDS.items():
-        for kw in keywords:
-            # strict word boundary match
-            if re.search(rf"\b{re.escape(kw)}\b", text):
-                return intent
-
-    return "vague"
+    return _matcher.match(text) or "vague"
 
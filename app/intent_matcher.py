@@ -0,0 +1,61 @@
+# app/intent_matcher.py
+
+import re
+from typing import Dict, List, Optional
+
+
+class KeywordMatcher:
+    """
+    Keyword table -> one regex compiled at import.
+
+    Same answer as looping `re.search(rf"\\b{kw}\\b")` over the table in
+    order: the first intent (table order) with any keyword anywhere in
+    the text wins. Every keyword of every intent is one alternative; one
+    capture group per intent tells which matched. The pattern sits in a
+    lookahead so matches can overlap (e.g. "emi kitna" must still reveal
+    "kitna"), and the scan stops early once the top intent is seen.
+    """
+
+    def __init__(self, table: Dict[str, List[str]]):
+        self.intents = list(table)
+        groups = []
+        for keywords in table.values():
+            # longest first so the alternation settles on full phrases
+            alternatives = sorted({re.escape(kw.lower()) for kw in keywords}, key=len, reverse=True)
+            groups.append("(" + "|".join(alternatives) + ")")
+        self.pattern = re.compile(r"(?=\b(?:" + "|".join(groups) + r")\b)")
+
+    def match(self, text: str) -> Optional[str]:
+        best = len(self.intents)
+        for m in self.pattern.finditer(text):
+            rank = m.lastindex - 1
+            if rank < best:
+                best = rank
+                if best == 0:
+                    break
+        return self.intents[best] if best < len(self.intents) else None
+
+
+def trie_pattern(keywords: List[str]) -> str:
+    """
+    Regex source matching any of `keywords`, factored by common prefix
+    ("site", "site visit" -> "site(?:\\ visit)?"). Same matches as a plain
+    longest-first alternation, but the engine tests each character once
+    per position instead of once per keyword. Greedy optional suffixes
+    keep the longest keyword first.
+    """
+    root: dict = {}
+    for kw in keywords:
+        node = root
+        for ch in kw:
+            node = node.setdefault(ch, {})
+        node[""] = True
+
+    def build(node: dict) -> str:
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{body})?" if "" in node else body
+
+    return build(root)
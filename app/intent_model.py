@@ -0,0 +1,255 @@
+# app/intent_model.py
+
+import os
+import threading
+import zlib
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from app.metrics import metrics
+
+# Optional dependency (pip install numpy); without it the model is off
+# and every keyword miss goes to call_ai as before
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# ==========================================================
+# CONFIG
+# ==========================================================
+INTENT_MODEL_ENABLED = os.getenv("AI_INTENT_MODEL", "true").lower() in ("1", "true", "yes")
+INTENT_MODEL_PATH = os.getenv("AI_INTENT_MODEL_PATH", "data/intent_model.npz")
+# Calibrated probability needed before the flow answers from a template
+INTENT_MODEL_THRESHOLD = float(os.getenv("AI_INTENT_MODEL_THRESHOLD", "0.9"))
+
+HASH_DIM = 1 << 14
+_NGRAMS = (2, 3, 4)
+
+
+# ==========================================================
+# FEATURES (HASHED CHARACTER N-GRAMS + WORDS)
+# ==========================================================
+def _bucket(feature: str) -> int:
+    # stable across processes (the built-in hash() is salted)
+    return zlib.crc32(feature.encode("utf-8")) % HASH_DIM
+
+
+@lru_cache(maxsize=50000)
+def _word_features(word: str) -> Tuple[int, ...]:
+    padded = f" {word} "
+    grams = [padded[i:i + n] for n in _NGRAMS for i in range(len(padded) - n + 1)]
+    return (_bucket("w:" + word),) + tuple(_bucket(g) for g in grams)
+
+
+def features(text: str) -> List[int]:
+    """
+    Hashed bucket ids for one message (repeats = counts). Char n-grams
+    are taken inside words, so "prise" still shares most features with
+    "price" and "kitne" with "kitna".
+    """
+    out: List[int] = []
+    for word in (text or "").lower().split():
+        word = word.strip("?!.,:;\"'()")
+        if word:
+            out.extend(_word_features(word))
+    return out
+
+
+# ==========================================================
+# MODEL (MULTINOMIAL LOGISTIC REGRESSION, TEMPERATURE-CALIBRATED)
+# ==========================================================
+class IntentModel:
+    """
+    Linear softmax over hashed features. Inference is one gather + sum
+    over the message's buckets, a few microseconds on top of feature
+    hashing. Trained offline (scripts/train_intent_model.py).
+    """
+
+    def __init__(self, labels: Sequence[str], weights, bias, temperature: float = 1.0):
+        self.labels = list(labels)
+        self.weights = weights  # (HASH_DIM, n_labels) float32
+        self.bias = bias  # (n_labels,)
+        self.temperature = temperature
+
+    # ---------- inference ----------
+    def _logits(self, idx: List[int]):
+        if not idx:
+            return self.bias.copy()
+        return self.weights[idx].sum(axis=0) / np.sqrt(len(idx)) + self.bias
+
+    def predict_proba(self, text: str) -> Dict[str, float]:
+        logits = self._logits(features(text)) / self.temperature
+        p = np.exp(logits - logits.max())
+        p /= p.sum()
+        return dict(zip(self.labels, p.tolist()))
+
+    def predict(self, text: str) -> Tuple[str, float]:
+        logits = self._logits(features(text)) / self.temperature
+        p = np.exp(logits - logits.max())
+        best = int(p.argmax())
+        return self.labels[best], float(p[best] / p.sum())
+
+    # ---------- training ----------
+    @classmethod
+    def train(
+        cls,
+        texts: Sequence[str],
+        labels: Sequence[str],
+        epochs: int = 150,
+        lr: float = 0.05,
+        l2: float = 1e-4,
+    ) -> "IntentModel":
+        """
+        Full-batch Adam on the sparse design matrix (kept as flat index /
+        row arrays, never densified).
+        """
+        names = sorted(set(labels))
+        y = np.array([names.index(label) for label in labels])
+        rows, idx, vals = _sparse(texts)
+        n, k = len(texts), len(names)
+        onehot = np.eye(k, dtype=np.float32)[y]
+
+        weights = np.zeros((HASH_DIM, k), dtype=np.float32)
+        bias = np.zeros(k, dtype=np.float32)
+        m_w, v_w = np.zeros_like(weights), np.zeros_like(weights)
+        m_b, v_b = np.zeros_like(bias), np.zeros_like(bias)
+        beta1, beta2, eps = 0.9, 0.999, 1e-8
+
+        for step in range(1, epochs + 1):
+            logits = _batch_logits(weights, bias, rows, idx, vals, n)
+            probs = _softmax(logits)
+            delta = (probs - onehot) / n  # dLoss/dlogits
+
+            grad_w = _scatter(idx, vals[:, None] * delta[rows], HASH_DIM) + l2 * weights
+            grad_b = delta.sum(axis=0)
+
+            for param, grad, m, v in ((weights, grad_w, m_w, v_w), (bias, grad_b, m_b, v_b)):
+                m *= beta1
+                m += (1 - beta1) * grad
+                v *= beta2
+                v += (1 - beta2) * grad * grad
+                m_hat = m / (1 - beta1 ** step)
+                v_hat = v / (1 - beta2 ** step)
+                param -= lr * m_hat / (np.sqrt(v_hat) + eps)
+
+        return cls(names, weights, bias)
+
+    def calibrate(self, texts: Sequence[str], labels: Sequence[str]) -> float:
+        """
+        Temperature scaling on held-out data (grid search on NLL), so
+        predicted probabilities match observed accuracy.
+        """
+        rows, idx, vals = _sparse(texts)
+        logits = _batch_logits(self.weights, self.bias, rows, idx, vals, len(texts))
+        y = np.array([self.labels.index(label) for label in labels])
+        best_t, best_nll = 1.0, float("inf")
+        for t in np.linspace(0.25, 5.0, 96):
+            p = _softmax(logits / t)
+            nll = -np.log(p[np.arange(len(y)), y] + 1e-12).mean()
+            if nll < best_nll:
+                best_t, best_nll = float(t), nll
+        self.temperature = best_t
+        return best_t
+
+    # ---------- persistence ----------
+    def save(self, path: str = INTENT_MODEL_PATH) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = f"{path}.tmp.npz"
+        np.savez_compressed(
+            tmp,
+            labels=np.array(self.labels),
+            weights=self.weights,
+            bias=self.bias,
+            temperature=np.array(self.temperature),
+            hash_dim=np.array(HASH_DIM),
+        )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str = INTENT_MODEL_PATH) -> "IntentModel":
+        with np.load(path) as data:
+            if int(data["hash_dim"]) != HASH_DIM:
+                raise ValueError(f"model hashed into {int(data['hash_dim'])} buckets, expected {HASH_DIM}")
+            return cls(
+                [str(label) for label in data["labels"]],
+                data["weights"].astype(np.float32),
+                data["bias"].astype(np.float32),
+                float(data["temperature"]),
+            )
+
+
+def _sparse(texts: Sequence[str]):
+    rows: List[int] = []
+    idx: List[int] = []
+    vals: List[float] = []
+    for r, text in enumerate(texts):
+        f = features(text)
+        if not f:
+            continue
+        scale = 1.0 / len(f) ** 0.5
+        rows.extend([r] * len(f))
+        idx.extend(f)
+        vals.extend([scale] * len(f))
+    return np.array(rows), np.array(idx), np.array(vals, dtype=np.float32)
+
+
+def _scatter(target_rows, contributions, size: int):
+    # sum contribution rows into `size` output rows (np.add.at, but one
+    # bincount per column is an order of magnitude faster)
+    return np.stack(
+        [np.bincount(target_rows, weights=contributions[:, c], minlength=size) for c in range(contributions.shape[1])],
+        axis=1,
+    ).astype(np.float32)
+
+
+def _batch_logits(weights, bias, rows, idx, vals, n: int):
+    return _scatter(rows, weights[idx] * vals[:, None], n) + bias
+
+
+def _softmax(logits):
+    e = np.exp(logits - logits.max(axis=1, keepdims=True))
+    return e / e.sum(axis=1, keepdims=True)
+
+
+# ==========================================================
+# RUNTIME (LAZY SINGLETON)
+# ==========================================================
+_model: Optional[IntentModel] = None
+_loaded = False
+_lock = threading.Lock()
+
+
+def get_intent_model() -> Optional[IntentModel]:
+    """
+    The trained model, or None (numpy missing, disabled, not trained yet).
+    """
+    global _model, _loaded
+    if _loaded:
+        return _model
+    with _lock:
+        if not _loaded:
+            if INTENT_MODEL_ENABLED and np is not None and os.path.exists(INTENT_MODEL_PATH):
+                try:
+                    _model = IntentModel.load(INTENT_MODEL_PATH)
+                    print(f"✅ Intent model loaded ({len(_model.labels)} intents)")
+                except Exception as e:
+                    print("❌ Intent model load failed:", str(e))
+            _loaded = True
+    return _model
+
+
+def confident_intent(text: str, threshold: float = INTENT_MODEL_THRESHOLD) -> Optional[str]:
+    """
+    Model intent when its calibrated probability clears the threshold.
+    """
+    model = get_intent_model()
+    if model is None:
+        return None
+    with metrics.timer("ai.intent_model.predict_ms"):
+        intent, prob = model.predict(text)
+    if prob < threshold:
+        metrics.incr("ai.intent_model.unsure")
+        return None
+    metrics.incr("ai.intent_model.confident")
+    return intent
@@ -0,0 +1,107 @@
+# app/language.py
+
+import os
+import re
+from functools import lru_cache
+from typing import Optional, Tuple
+
+# ==========================================================
+# CONFIG
+# ==========================================================
+LANGUAGE_CACHE_SIZE = int(os.getenv("AI_LANGUAGE_CACHE_SIZE", "4096"))
+# Weight of the newest message in the per-user running score
+LANGUAGE_SMOOTHING = float(os.getenv("AI_LANGUAGE_SMOOTHING", "0.5"))
+
+# ==========================================================
+# LEXICONS (romanized Hindi vs English function words)
+# ==========================================================
+# Only words that are unambiguous in a buyer chat. Real estate nouns
+# (flat, loan, visit, booking, area, possession...) are used in every
+# language and count for neither side; so do words that are also common
+# English ("me", "to", "hi", "the", "main", "door").
+HINGLISH_WORDS = frozenset("""
+    kya kyaa kyu kyun kyon kab kaise kaisa kaisi kahan kaha kidhar kitna kitne kitni kaun kaunsa
+    hai hain hei hoga hogi honge ho hona tha thi raha rahi rahe
+    ka ke ki ko se mein mai par pe tak liye wala wali wale
+    aap apka apki aapka aapki hum humko hume humein mujhe mera meri mere tum tumhara
+    nahi nahin haan han ji bhai bhaiya accha acha theek thik
+    chahiye chahte chahta chahti chahenge karna karo kariye karenge karein kar sakte sakta sakti
+    batao bataiye bataye dikhao dikhaiye bhejo bhejiye milega milegi milenge mil dena dijiye
+    dekhna dekho dekhne dekh aana aao aaunga jaana jao chalo
+    abhi kal aaj parso baad pehle jaldi thoda zyada bahut sab kuch koi aur bhi
+    ghar zameen makaan paisa paise rupay daam mehnga sasta kiraya
+    wahan yahan waha yaha idhar udhar paas
+""".split())
+
+ENGLISH_WORDS = frozenset("""
+    the a an is are was were be been am do does did have has had will would can could should
+    what where when which who why how whats
+    i you we they he she it this that these those my your our their
+    please tell want need like know send show give let share
+    there here any some much many more about of for with from into on at by and or but if than
+    not no yes yeah okay thanks thank
+""".split())
+
+_TOKEN = re.compile(r"[a-z]+|[\u0900-\u097f]+")
+_DEVANAGARI = re.compile(r"[\u0900-\u097f]")
+
+# Message -> per-message "Hindi-ness"; the running score picks the language
+_SCORES = {"english": 0.0, "hinglish": 0.5, "hindi": 1.0}
+
+
+@lru_cache(maxsize=LANGUAGE_CACHE_SIZE)
+def _evidence(lowered: str) -> Tuple[int, int, bool]:
+    """
+    (romanized Hindi tokens, English tokens, any Devanagari) for one
+    message. Cached: "ok", "yes", "price?" repeat constantly.
+    """
+    hindi = english = 0
+    for token in _TOKEN.findall(lowered):
+        if token in HINGLISH_WORDS:
+            hindi += 1
+        elif token in ENGLISH_WORDS:
+            english += 1
+    return hindi, english, bool(_DEVANAGARI.search(lowered))
+
+
+def message_language(text: str) -> Optional[str]:
+    """
+    Language of one message, or None when it carries no evidence
+    ("ok", "2bhk?", a number).
+    """
+    hindi, english, devanagari = _evidence((text or "").strip().lower())
+    if devanagari:
+        return "hindi"
+    if hindi == 0:
+        return "english" if english else None
+    if hindi >= 4 and hindi >= 4 * english:
+        return "hindi"
+    if hindi >= 2 or hindi >= english:
+        return "hinglish"
+    return "english"
+
+
+def detect_language(state: dict, text: str) -> str:
+    """
+    Language for this turn, smoothed over the conversation: each message
+    moves the user's running score (0 = English, 1 = Hindi) instead of
+    deciding on its own, so one short "ok" or "price kya hai" doesn't flip
+    the reply language. Seeded from the language picked in the funnel.
+    """
+    score = state.get("language_score")
+    if score is None:
+        score = _SCORES.get(state.get("language"), None)
+
+    lang = message_language(text)
+    if lang is not None:
+        observed = _SCORES[lang]
+        score = observed if score is None else score + LANGUAGE_SMOOTHING * (observed - score)
+    if score is None:
+        return state.get("language") or "english"
+
+    state["language_score"] = score
+    if score >= 0.75:
+        return "hindi"
+    if score >= 0.35:
+        return "hinglish"
+    return "english"
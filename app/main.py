@@ -1,19 +1,30 @@
 from dotenv import load_dotenv
 load_dotenv()
 
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 
 # Core boot logic
 from app.app.brain_loader import load_brain
 from app.app.context import COUNTERS, SCORING
+from app.metrics import metrics
+from app.ai_engine import close_openai_clients
+from app.usage.service import usage_ledger, flush_forever
 
 # Routers
 from app.app.whatsapp.routes import router as whatsapp_router
+from app.app.whatsapp.pipeline import pipeline
+from app.app.whatsapp.dedup import message_dedup, persist_forever
+from app.app.whatsapp.sender import start_sender, stop_sender
+from app.app.whatsapp.outbound import outbound
 from app.leads.routes import router as leads_router
 from app.users.routes import router as users_router
 from app.tenants.routes import router as tenants_router
 from app.projects.routes import router as projects_router
 from app.scoring.routes import router as scoring_router
+from app.usage.routes import router as usage_router
 
 
 # --------------------------------------------------
@@ -27,12 +38,40 @@ print("✅ Brain loaded:", list(COUNTERS.keys()))
 print("✅ EstatePilot backend booting")
 
 
+# --------------------------------------------------
+# BACKGROUND WORKERS (WHATSAPP PIPELINE)
+# --------------------------------------------------
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Restore recently seen message ids so a restart doesn't re-answer retries
+    print("✅ Dedup ids restored:", message_dedup.load())
+    dedup_snapshots = asyncio.create_task(persist_forever(message_dedup))
+    print("✅ AI usage rows restored:", usage_ledger.load())
+    usage_snapshots = asyncio.create_task(flush_forever(usage_ledger))
+
+    await start_sender()
+    # also opens the outbox and re-sends replies left unacknowledged
+    await outbound.start()
+    await pipeline.start()
+    yield
+    await pipeline.stop()
+    await outbound.stop()
+    await stop_sender()
+    await close_openai_clients()
+
+    dedup_snapshots.cancel()
+    message_dedup.save()
+    usage_snapshots.cancel()
+    usage_ledger.save()
+
+
 # --------------------------------------------------
 # FASTAPI APP
 # --------------------------------------------------
 app = FastAPI(
     title="EstatePilot Backend",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 
@@ -45,8 +84,7 @@ app.include_router(users_router)
 app.include_router(tenants_router)
 app.include_router(projects_router)
 app.include_router(scoring_router)
-
-
+app.include_router(usage_router)
 
 
 # --------------------------------------------------
@@ -56,4 +94,10 @@ app.include_router(scoring_router)
 def health():
     return {"status": "ok"}
 
-    return {"status": "ok"}
+
+# --------------------------------------------------
+# METRICS (QUEUE DEPTH, WAIT / PROCESSING TIME, ...)
+# --------------------------------------------------
+@app.get("/metrics")
+def get_metrics():
+    return metrics.snapshot()
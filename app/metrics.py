@@ -0,0 +1,138 @@
+# app/metrics.py
+
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict
+
+
+# ==========================================================
+# IN-PROCESS METRICS (COUNTERS / GAUGES / LATENCY HISTOGRAMS)
+# ==========================================================
+# Kept dependency-free on purpose. Everything is exported as a
+# plain dict via GET /metrics so it can be scraped or eyeballed
+# while sizing workers during campaign spikes.
+
+_RESERVOIR_SIZE = 2048
+
+
+class Histogram:
+    """
+    Rolling latency histogram.
+    Keeps the last N observations for percentiles plus lifetime count/sum.
+    """
+
+    def __init__(self, size: int = _RESERVOIR_SIZE):
+        self._values = deque(maxlen=size)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self._values.append(value)
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def snapshot(self) -> dict:
+        values = sorted(self._values)
+        if not values:
+            return {"count": 0}
+
+        def pct(p: float) -> float:
+            idx = min(len(values) - 1, int(round(p * (len(values) - 1))))
+            return round(values[idx], 3)
+
+        return {
+            "count": self.count,
+            "avg": round(self.total / self.count, 3),
+            "p50": pct(0.50),
+            "p95": pct(0.95),
+            "p99": pct(0.99),
+            "max": round(self.max, 3),
+        }
+
+
+class Metrics:
+    """
+    Process-wide registry. Names are free-form dotted strings,
+    e.g. "whatsapp.queue_wait_ms".
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, int] = {}
+        self._gauges: Dict[str, Callable[[], float]] = {}
+        self._histograms: Dict[str, Histogram] = {}
+
+    def incr(self, name: str, value: int = 1) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def gauge(self, name: str, fn: Callable[[], float]) -> None:
+        """
+        Register a callable that is evaluated at snapshot time.
+        """
+        with self._lock:
+            self._gauges[name] = fn
+
+    def observe(self, name: str, value: float) -> None:
+        with self._lock:
+            hist = self._histograms.get(name)
+            if hist is None:
+                hist = self._histograms[name] = Histogram()
+            hist.observe(value)
+
+    def timer(self, name: str) -> "_Timer":
+        """
+        with metrics.timer("stage_ms"): ...
+        """
+        return _Timer(self, name)
+
+    def counter(self, name: str) -> int:
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            histograms = {k: h.snapshot() for k, h in self._histograms.items()}
+
+        gauge_values = {}
+        for name, fn in gauges.items():
+            try:
+                gauge_values[name] = fn()
+            except Exception:
+                gauge_values[name] = None
+
+        return {
+            "counters": counters,
+            "gauges": gauge_values,
+            "histograms": histograms,
+        }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+
+class _Timer:
+    def __init__(self, registry: Metrics, name: str):
+        self._registry = registry
+        self._name = name
+        self._start = 0.0
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._registry.observe(self._name, (time.perf_counter() - self._start) * 1000)
+        return False
+
+
+# Singleton registry
+metrics = Metrics()
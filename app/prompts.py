@@ -0,0 +1,113 @@
+# app/prompts.py
+
+from collections import OrderedDict
+from typing import Optional
+
+from app.metrics import metrics
+from app.reply_cache import project_hash
+
+# ==========================================================
+# SYSTEM PROMPTS (STATIC PREFIX FIRST, SPECIFICS LAST)
+# ==========================================================
+# Providers cache prompts by exact prefix. Everything that is the same
+# for every tenant / project / language comes first and must stay
+# byte-identical; the project block and language hint are appended
+# after it. Don't interpolate anything into the *_RULES blocks.
+
+NORMAL_RULES = """You are PRAGITI — a WhatsApp-style professional advisor for one builder/project only.
+The project you represent is described under PROJECT CONTEXT at the end of this message.
+
+COMMUNICATION RULES (MANDATORY):
+- Replies must be 2–4 sentences max, WhatsApp style.
+- Never send long paragraphs or lectures.
+- Answer the user's question directly first.
+- Speak warm, advisory, calm — not robotic.
+
+PROJECT EXCLUSIVITY RULE:
+- You only represent this builder’s verified projects.
+- Never suggest or search competitors' properties.
+- If users ask for another locality/project:
+    - Redirect focus back to this project’s advantages (ROI, lifestyle, connectivity).
+    - IF builder has another project there, mention it briefly in 1 line.
+    - Only elaborate if user explicitly says “Tell me more.”
+    - Always return focus to the project in PROJECT CONTEXT.
+
+LEGITIMACY / RERA LOGIC:
+- If user asks about legality or RERA:
+    - Give the factual status.
+    - Add one line on developer compliance & buyer safety.
+- Do not talk legality unless user triggers it.
+
+UNCERTAINTY HANDLING:
+- If information is unknown or pending:
+    - Say: “this requires expert verification, I will confirm,”
+    - Do NOT make up data, timelines or guarantees.
+
+QUALIFICATION BEHAVIOR:
+- Extract details from user statements.
+- Ask at most ONE qualification question every 2–3 turns.
+- If user is hesitant or “just exploring” → DO NOT qualify, only support.
+
+PERSUASION BEHAVIOR:
+- Use ROI, appreciation potential, convenience, family comfort.
+- Keep it mild — no pressure.
+- After deeper clarity, gently suggest visit.
+
+FORMAT:
+- short, human-like WhatsApp replies
+- answer-first
+- advisory tone
+"""
+
+STOP_RULES = """You are Pragiti, a real estate assistant.
+
+STOP qualification questions.
+Only support with answers or clarifications.
+
+Be short, polite and factual.
+Confirm politely if user asks for visits.
+"""
+
+LANG_HINTS = {
+    "english": "Reply in natural English.",
+    "hindi": "Reply in conversational Hindi.",
+    "hinglish": "Reply in natural Hinglish.",
+}
+
+_MAX_COMPILED = 2048
+_compiled: "OrderedDict[tuple, str]" = OrderedDict()
+
+
+def _project_block(project: dict) -> str:
+    return (
+        "PROJECT CONTEXT:\n"
+        f"- {project.get('name') or 'this project'}, {project.get('location') or ''}, "
+        f"price {project.get('price_range') or ''}\n"
+        f"- Units: {project.get('unit_types') or ''}\n"
+        f"- Status: {project.get('status') or ''}\n"
+        f"- Amenities: {project.get('usp') or ''}\n"
+    )
+
+
+def _compile(project: Optional[dict], lang: str, stop_questions: bool) -> str:
+    lang_hint = LANG_HINTS.get(lang, LANG_HINTS["english"])
+    if stop_questions:
+        return f"{STOP_RULES}\n{lang_hint}\n"
+    return f"{NORMAL_RULES}\n{_project_block(project or {})}\n{lang_hint}\n"
+
+
+def build_system_prompt(project: Optional[dict], lang: str, stop_questions: bool = False) -> str:
+    """
+    System prompt for call_ai, compiled once per (project, language, mode).
+    """
+    key = (project_hash(project), lang, bool(stop_questions))
+    prompt = _compiled.get(key)
+    if prompt is not None:
+        _compiled.move_to_end(key)
+        return prompt
+
+    metrics.incr("ai.prompts_compiled")
+    prompt = _compiled[key] = _compile(project, lang, stop_questions)
+    while len(_compiled) > _MAX_COMPILED:
+        _compiled.popitem(last=False)
+    return prompt
@@ -0,0 +1,137 @@
+# app/reply_cache.py
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from app.metrics import metrics
+
+# ==========================================================
+# CONFIG
+# ==========================================================
+REPLY_CACHE_ENABLED = os.getenv("AI_REPLY_CACHE", "true").lower() in ("1", "true", "yes")
+REPLY_CACHE_MAX_ENTRIES = int(os.getenv("AI_REPLY_CACHE_MAX_ENTRIES", "5000"))
+REPLY_CACHE_TTL_SECONDS = float(os.getenv("AI_REPLY_CACHE_TTL_SECONDS", "21600"))
+# Only cache while the conversation is young: later replies depend on history
+REPLY_CACHE_MAX_HISTORY = int(os.getenv("AI_REPLY_CACHE_MAX_HISTORY", "2"))
+
+_NON_WORD = re.compile(r"[^\w\s]+")
+_SPACES = re.compile(r"\s+")
+
+
+# ==========================================================
+# KEYS
+# ==========================================================
+def normalize_question(text: str) -> str:
+    """
+    "Price kya hai??" and "price  kya hai" -> "price kya hai"
+    """
+    text = _NON_WORD.sub(" ", (text or "").lower())
+    return _SPACES.sub(" ", text).strip()
+
+
+def project_hash(project: Optional[dict]) -> str:
+    """
+    Content hash of project_context: editing the project changes the
+    key, so stale replies are never served for the new details.
+    """
+    if not project:
+        return "-"
+    blob = json.dumps(project, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(blob.encode("utf-8")).hexdigest()[:16]
+
+
+def cache_key(text: str, project: Optional[dict], stop_questions: bool, language: str) -> Tuple[str, str, bool, str]:
+    return (normalize_question(text), project_hash(project), bool(stop_questions), language or "english")
+
+
+# ==========================================================
+# LRU + TTL REPLY CACHE
+# ==========================================================
+class ReplyCache:
+    """
+    Maps (normalized question, project hash, stop mode, language) to a
+    previous LLM reply. LRU order with a size cap; entries also expire
+    after the TTL so replies pick up prompt/model changes eventually.
+
+    Each entry remembers what the original call cost (tokens, latency),
+    which is what every hit saves.
+    """
+
+    def __init__(self, max_entries: int = REPLY_CACHE_MAX_ENTRIES, ttl: float = REPLY_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[tuple, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        metrics.gauge("ai.reply_cache.entries", lambda: len(self._entries))
+        metrics.gauge("ai.reply_cache.hit_rate", self.hit_rate)
+
+    def get(self, key: tuple, now: Optional[float] = None) -> Optional[str]:
+        now = time.time() if now is None else now
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry["expires_at"] <= now:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                metrics.incr("ai.reply_cache.misses")
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+
+        metrics.incr("ai.reply_cache.hits")
+        metrics.incr("ai.reply_cache.saved_tokens", entry["tokens"])
+        metrics.incr("ai.reply_cache.saved_ms", int(entry["latency_ms"]))
+        return entry["reply"]
+
+    def put(self, key: tuple, reply: str, tokens: int = 0, latency_ms: float = 0.0, now: Optional[float] = None) -> None:
+        now = time.time() if now is None else now
+        with self._lock:
+            self._entries[key] = {
+                "reply": reply,
+                "tokens": tokens,
+                "latency_ms": latency_ms,
+                "expires_at": now + self.ttl,
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                metrics.incr("ai.reply_cache.evicted")
+
+    def invalidate_project(self, project: Optional[dict]) -> int:
+        """
+        Drop every reply cached for this project_context (call when a
+        project's details are edited).
+        """
+        digest = project_hash(project)
+        with self._lock:
+            stale = [k for k in self._entries if k[1] == digest]
+            for k in stale:
+                del self._entries[k]
+        return len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return round(self.hits / total, 4) if total else 0.0
+
+
+def is_cacheable(history: list) -> bool:
+    return REPLY_CACHE_ENABLED and len(history) <= REPLY_CACHE_MAX_HISTORY
+
+
+# Singleton cache
+reply_cache = ReplyCache()
@@ -0,0 +1,197 @@
+# app/signals.py
+
+import re
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from app.brain.intent_detector import INTENTS as BRAIN_INTENTS
+from app.brain.scoring_rules import INTENT_SCORES, NEGATIVE_SIGNALS
+from app.intent_engine import INTENT_KEYWORDS
+from app.intent_matcher import trie_pattern
+
+# ==========================================================
+# CONVERSATION SIGNALS (used by flow / call_ai / pipeline)
+# ==========================================================
+# Plain substring match, exactly like the inline `any(w in t ...)` lists
+# these came from. The intent tables (word-boundary match) stay in
+# app.intent_engine / app.brain.intent_detector and are pulled in below.
+SIGNAL_KEYWORDS = {
+    # flow decision step: another locality / project -> exclusive redirect
+    "locality_change": [
+        "any project in", "any flat in", "different location",
+        "other project", "other locality", "another place",
+        "raja bazar", "raza bazar", "kankarbagh", "boring road",
+        "search other", "alternative project"
+    ],
+    "legality": ["rera", "approved", "legal", "permission", "authority", "registration", "brera"],
+    "visit_interest": ["visit", "site", "see property", "meet", "come"],
+    "more_info": ["more", "details", "explain", "what about", "availability", "pricing"],
+    "hesitation": ["confused", "not sure", "thinking", "doubt"],
+
+    # call_ai
+    "visit_request": [
+        "visit", "site visit", "see property", "want to visit",
+        "schedule visit", "arrange visit", "book visit",
+        "show me property", "property visit"
+    ],
+    "visit_deferral": ["not", "later", "after clarity"],
+    "confirmation": ["yes", "ok", "sure", "call", "confirm", "tomorrow", "morning", "evening"],
+    "personal_info": [
+        "who are you", "real name", "login", "password",
+        "email", "phone number", "personal details",
+        "openai account"
+    ],
+    "exploring": ["just exploring", "time pass", "not sure", "thinking", "browsing"],
+    "legal_query": [
+        "rera", "legal", "approval", "approved", "registration",
+        "noc", "title", "occupancy", "certificate"
+    ],
+
+    # pipeline: skip the bot, hand over to a human
+    "handoff_request": ["call me", "site visit", "contact agent", "talk to person"],
+}
+
+INTENT_PREFIX = "intent."
+BRAIN_PREFIX = "brain."
+NEGATIVE = "negative"
+
+
+class _Entry(NamedTuple):
+    signal: str
+    keywords: List[str]
+    word_boundary: bool
+    weight: int
+
+
+def _registry() -> List[_Entry]:
+    """
+    Every keyword table in one list. Order matters for intents: the first
+    table entry wins, as in detect_intent.
+    """
+    entries = [
+        _Entry(INTENT_PREFIX + intent, keywords, True, 0)
+        for intent, keywords in INTENT_KEYWORDS.items()
+    ]
+    entries += [
+        _Entry(BRAIN_PREFIX + intent, keywords, True, INTENT_SCORES.get(intent, 0))
+        for intent, keywords in BRAIN_INTENTS.items()
+    ]
+    entries += [_Entry(name, keywords, False, 0) for name, keywords in SIGNAL_KEYWORDS.items()]
+    # one entry per phrase: each penalty applies once, like rank_engine did
+    entries += [_Entry(NEGATIVE, [phrase], False, penalty) for phrase, penalty in NEGATIVE_SIGNALS.items()]
+    return entries
+
+
+REGISTRY = _registry()
+
+
+class Match(NamedTuple):
+    signal: str
+    start: int
+    end: int
+    weight: int
+
+
+def _compile(entries: List[_Entry], word_boundary: bool) -> Tuple["re.Pattern", Dict[str, list]]:
+    """
+    One regex for every keyword of one match mode, plus a table from each
+    keyword to every (entry index, signal, length, weight) it implies at
+    that position.
+
+    The pattern sits in a lookahead so matches may overlap, and it
+    reports only the longest keyword at a position; any shorter keyword
+    found at the same spot is necessarily a prefix of it, so those hits
+    are precomputed (for word mode, only prefixes that end on a word
+    boundary inside the longer keyword).
+    """
+    keywords = {kw.lower() for e in entries if e.word_boundary == word_boundary for kw in e.keywords}
+    hits: Dict[str, list] = {}
+    for longer in keywords:
+        hits[longer] = [
+            (i, entry.signal, len(kw), entry.weight)
+            for i, entry in enumerate(entries)
+            if entry.word_boundary == word_boundary
+            for kw in {k.lower() for k in entry.keywords}
+            if longer.startswith(kw)
+            and (not word_boundary or len(kw) == len(longer) or not _WORD_CHAR.match(longer[len(kw)]))
+        ]
+    body = f"({trie_pattern(sorted(keywords))})"
+    pattern = rf"(?=\b{body}\b)" if word_boundary else f"(?={body})"
+    return re.compile(pattern), hits
+
+
+_WORD_CHAR = re.compile(r"\w")
+_WORD_PATTERN, _WORD_HITS = _compile(REGISTRY, word_boundary=True)
+_SUBSTRING_PATTERN, _SUBSTRING_HITS = _compile(REGISTRY, word_boundary=False)
+
+
+class Signals:
+    """
+    Everything one message triggers (see classify).
+    Positions refer to the lowercased text.
+    """
+
+    __slots__ = ("text", "matches", "_groups", "_signals")
+
+    def __init__(self, text: str, matches: List[Match], groups: Dict[int, Match]):
+        self.text = text
+        self.matches = matches
+        self._groups = groups  # registry index -> first match
+        self._signals = {m.signal: m for m in groups.values()}
+
+    def has(self, signal: str) -> bool:
+        return signal in self._signals
+
+    def spans(self, signal: str) -> List[Match]:
+        return [m for m in self.matches if m.signal == signal]
+
+    @property
+    def names(self) -> List[str]:
+        return list(self._signals)
+
+    def _first(self, prefix: str) -> Optional[str]:
+        ranked = [i for i, m in self._groups.items() if m.signal.startswith(prefix)]
+        return self._groups[min(ranked)].signal[len(prefix):] if ranked else None
+
+    @property
+    def intent(self) -> str:
+        """
+        Same answer as app.intent_engine.detect_intent.
+        """
+        return self._first(INTENT_PREFIX) or "vague"
+
+    @property
+    def brain_intent(self) -> str:
+        """
+        Same answer as app.brain.intent_detector.detect_intent.
+        """
+        return self._first(BRAIN_PREFIX) or "UNKNOWN"
+
+    @property
+    def brain_intents(self) -> List[str]:
+        return [n[len(BRAIN_PREFIX):] for n in self.names if n.startswith(BRAIN_PREFIX)]
+
+    def weight(self, prefix: str = "") -> int:
+        """
+        Sum of registry weights, each entry counted once however often it
+        occurs.
+        """
+        return sum(m.weight for m in self._groups.values() if m.signal.startswith(prefix))
+
+
+def classify(text: str) -> Signals:
+    """
+    One lowercase + one scan per match mode -> every intent and signal
+    with spans.
+    """
+    lowered = (text or "").lower()
+    matches: List[Match] = []
+    groups: Dict[int, Match] = {}
+    for pattern, hits in ((_WORD_PATTERN, _WORD_HITS), (_SUBSTRING_PATTERN, _SUBSTRING_HITS)):
+        for m in pattern.finditer(lowered):
+            start = m.start()
+            for index, signal, length, weight in hits[m.group(1)]:
+                match = Match(signal, start, start + length, weight)
+                matches.append(match)
+                if index not in groups:
+                    groups[index] = match
+    return Signals(lowered, matches, groups)
@@ -1,9 +1,15 @@
 # app/state.py
 
-from typing import Dict, List, Optional
+from typing import List, Optional
 
-# In-memory user state store (per phone number)
-_user_state: Dict[str, dict] = {}
+from app.conversation_state import ConversationState, HistoryEntry
+from app.state_store import create_store
+from app.summarizer import fold_evicted, fold_user_text, history_limit
+
+# User state per phone number (STATE_BACKEND: memory | sqlite | redis).
+# The pipeline wraps each message in state_store.asession(phone), which
+# refreshes the cached state first and writes changed fields back after.
+state_store = create_store("state", decode=ConversationState.from_dict)
 
 # Lead scoring thresholds (used for rank)
 RANKS = [
@@ -23,81 +29,46 @@ def _calculate_rank(score: int) -> str:
     return "cold"
 
 
-def _initial_state() -> dict:
+def _initial_state() -> ConversationState:
     """
-    Default state for a new WhatsApp user.
-    This is the single source of truth for all state fields.
+    Default state for a new WhatsApp user
+    (fields + defaults: app.conversation_state).
     """
-    return {
-        # Scoring-related
-        "score": 0,
-        "rank": "cold",
-        "intent_history": [],
-        "last_intent": None,
-        "message_count": 0,
-
-        # Handoff / escalation
-        "handoff_done": False,
-
-        # Conversation flow
-        "step": "intro",
-
-        # Language preference
-        "language": None,
-
-        # Qualification data
-        "budget": None,
-        "location": None,
-        "purpose": None,
-        "timeline": None,
-        "loan_flag": None,
-        "visit_time": None,
-        "qualified": False,
-
-        # NEW — stop AI or funnel from asking more probing questions
-        "stop_questions": False,
-
-        # Behaviour tracking
-        "skip_count": 0,
-        "frustration_flags": [],
-
-        # Conversation memory (for AI fallback)
-        "conversation_history": [],
+    return ConversationState()
 
-        # NEW — conversation mode
-        "conversation_mode": None,
 
-        # NEW — full project context
-        "project_context": None,
-    }
-
-
-def get_state(phone: str) -> dict:
+def get_state(phone: str) -> ConversationState:
     """
-    Get the state dict for a given phone.
+    Get the state for a given phone.
     If it doesn't exist yet, create a new one with default values.
+    Stored states from older schemas are upgraded when the store loads
+    them (ConversationState.from_dict), not here.
     """
-    if phone not in _user_state:
-        _user_state[phone] = _initial_state()
-    else:
-        # ensure backward compatibility if keys were added later
-        base = _initial_state()
-        base.update(_user_state[phone])
-        _user_state[phone] = base
-
-    return _user_state[phone]
+    state = state_store.get(phone)
+    if state is None:
+        state = _initial_state()
+        state_store.put(phone, state)
+    return state
 
 
 def update_state_with_intent(phone: str, intent: Optional[str], intent_weight: int = 5) -> dict:
     """
     Scoring logic (unchanged).
     """
-    state = get_state(phone)
+    return apply_intent(get_state(phone), intent, intent_weight)
+
 
+def apply_intent(state: dict, intent: Optional[str], intent_weight: int = 5, keep_history: bool = True) -> dict:
+    """
+    One scoring step on a state dict, without touching the store
+    (shared by the live pipeline and app.backfill). Scoring itself only
+    needs last_intent; keep_history=False skips intent_history.
+    """
     state["message_count"] += 1
 
     if intent and intent != state.get("last_intent"):
-        state["intent_history"].append(intent)
+        if keep_history:
+            state["intent_history"].append(intent)
         state["score"] += intent_weight
         state["last_intent"] = intent
 
@@ -120,16 +91,20 @@ def mark_handoff(phone: str) -> None:
 def append_history(phone: str, sender: str, text: str) -> None:
     """
     Store limited conversation history for AI fallback.
-    Only last N messages are kept to reduce memory.
+    Only last N messages are kept to reduce memory; buyer facts and
+    evicted turns are folded into the summary (app.summarizer).
     """
     state = get_state(phone)
 
-    entry = {"from": sender, "text": text}
-    state["conversation_history"].append(entry)
+    history = state["conversation_history"]
+    history.append(HistoryEntry(sender, text))
+    if sender == "user":
+        fold_user_text(state, text)
 
-    # trim to last 15 messages max
-    if len(state["conversation_history"]) > 15:
-        state["conversation_history"] = state["conversation_history"][-15:]
+    limit = history_limit()
+    if len(history) > limit:
+        fold_evicted(state, history[:-limit])
+        del history[:-limit]
 
 
 # ===================================================
@@ -0,0 +1,1094 @@
+# app/state_store.py
+
+import asyncio
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager, contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import unquote, urlparse
+
+from app.metrics import metrics
+
+# --------------------------------------------------
+# CONFIG
+# --------------------------------------------------
+# memory = per-process dicts (single uvicorn worker only)
+# sqlite = local file shared by every worker on the box (WAL)
+# redis  = any Redis-protocol server, shared across boxes
+STATE_BACKEND = os.getenv("STATE_BACKEND", "memory").lower()
+STATE_SQLITE_PATH = os.getenv("STATE_SQLITE_PATH", "data/state.sqlite3")
+STATE_REDIS_URL = os.getenv("STATE_REDIS_URL", "redis://127.0.0.1:6379/0")
+STATE_REDIS_PREFIX = os.getenv("STATE_REDIS_PREFIX", "state")
+STATE_REDIS_TIMEOUT = float(os.getenv("STATE_REDIS_TIMEOUT", "2"))
+# Per-key lease held by the worker running a session() (sqlite / redis);
+# a crashed worker's lease expires after this long
+STATE_LEASE_MS = int(os.getenv("STATE_LEASE_MS", "30000"))
+# Reload + re-apply rounds when a write finds the key changed under it
+STATE_WRITE_RETRIES = int(os.getenv("STATE_WRITE_RETRIES", "5"))
+
+# Residency per process (see StateStore.evict); 0 disables a limit
+STATE_MAX_RESIDENT = int(os.getenv("STATE_MAX_RESIDENT", "200000"))
+STATE_IDLE_SECONDS = float(os.getenv("STATE_IDLE_SECONDS", "3600"))
+# Handed-off conversations (handoff_done) go idle much sooner
+STATE_HANDOFF_IDLE_SECONDS = float(os.getenv("STATE_HANDOFF_IDLE_SECONDS", "300"))
+STATE_SWEEP_SECONDS = float(os.getenv("STATE_SWEEP_SECONDS", "30"))
+STATE_EVICT_BATCH = int(os.getenv("STATE_EVICT_BATCH", "64"))
+# Where the memory backend parks evicted states
+STATE_COLD_PATH = os.getenv("STATE_COLD_PATH", "data/state_cold.sqlite3")
+
+# Hash field / column holding the per-key write counter
+VERSION_FIELD = "_v"
+
+_HOST = socket.gethostname()
+# _enter_io() result when another worker holds the key's lease
+_LEASE_BUSY = object()
+_LEASE_POLL_MAX = 0.05
+
+
+def _to_json(value):
+    # compact field types (app.conversation_state) serialise themselves
+    to_json = getattr(value, "to_json", None)
+    if to_json is None:
+        raise TypeError(f"{type(value).__name__} is not JSON serializable")
+    return to_json()
+
+
+def _encode(value) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=_to_json)
+
+
+# ==========================================================
+# INTERFACE
+# ==========================================================
+class StateStore:
+    """
+    Per-key (phone) state dicts.
+
+    get() keeps returning the SAME dict until put() replaces it; callers
+    mutate it in place, as they always have. When those mutations reach
+    shared storage is up to the store: save(key), or the end of a
+    session(key) / asession(key) block (one per inbound message, see
+    pipeline).
+
+    Resident keys are bounded (evict()): idle ones are swept, and above
+    max_resident the least recently used go, handed-off conversations
+    first. Recency is the last put() / load / session() end, so get()
+    stays a plain dict lookup. Keys inside a session() are never
+    evicted; the next get() of an evicted key brings it back.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        max_resident: int = STATE_MAX_RESIDENT,
+        idle_seconds: float = STATE_IDLE_SECONDS,
+        handoff_idle_seconds: float = STATE_HANDOFF_IDLE_SECONDS,
+    ):
+        self.namespace = namespace
+        self.max_resident = max_resident
+        self.idle_seconds = idle_seconds
+        self.handoff_idle_seconds = handoff_idle_seconds
+        # key -> last access (monotonic), least recently used first
+        self._active: "OrderedDict[str, float]" = OrderedDict()
+        self._handed_off: "OrderedDict[str, float]" = OrderedDict()
+        self._pinned: Dict[str, int] = {}
+        # key -> [asyncio.Lock, coroutines using it] (asession)
+        self._turns: Dict[str, list] = {}
+        # running asession()s: evictions meanwhile are written afterwards,
+        # off the event loop (see _drain)
+        self._deferring = 0
+        self._next_sweep = time.monotonic() + STATE_SWEEP_SECONDS
+        metrics.gauge(f"state.resident.{namespace}", self.__len__)
+
+    def get(self, key: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    def put(self, key: str, state: dict) -> None:
+        raise NotImplementedError
+
+    def save(self, key: str) -> None:
+        """Write back whatever changed since the last load / save."""
+        dirty = self._dirty(key)
+        if dirty is not None:
+            self._exited(key, dirty, self._exit_io(key, dirty, False))
+
+    def refresh(self, key: str) -> None:
+        """Reload the cached copy if another worker has written since."""
+        self._entered(key, self._enter_io(key, False))
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        """Keys resident in THIS process."""
+        raise NotImplementedError
+
+    def _peek(self, key: str) -> Optional[dict]:
+        """Resident state or None, without loading."""
+        raise NotImplementedError
+
+    def _evict(self, keys: List[str]) -> None:
+        """Persist (where needed) and drop these resident keys."""
+        raise NotImplementedError
+
+    # ---------- session steps ----------
+    # Backend I/O (lease, version check / reload, write-back) lives in
+    # the *_io methods, which only READ the resident cache; the others
+    # apply their results. asession() runs the *_io ones in a worker
+    # thread when _io_bound() says they touch disk / network.
+    leased = False  # per-key lease across workers (shared backends)
+
+    def _io_bound(self, key: str, entering: bool) -> bool:
+        return False
+
+    async def _drain(self) -> None:
+        """Write out what evict() deferred during asession()s."""
+
+    def _enter_io(self, key: str, lease: bool):
+        """Take the lease (if `lease`) and fetch what refresh needs."""
+        return None
+
+    def _entered(self, key: str, fetched) -> None:
+        """Apply _enter_io()'s result to the resident copy."""
+
+    def _dirty(self, key: str):
+        """What save() has to write, None if nothing."""
+        return None
+
+    def _exit_io(self, key: str, dirty, lease: bool):
+        """Write `dirty` back and release the lease (if `lease`)."""
+        return None
+
+    def _exited(self, key: str, dirty, written) -> None:
+        """Apply _exit_io()'s result to the resident copy."""
+
+    def _pin(self, key: str) -> bool:
+        first = key not in self._pinned
+        self._pinned[key] = self._pinned.get(key, 0) + 1
+        return first
+
+    def _unpin(self, key: str) -> None:
+        if self._pinned[key] == 1:
+            del self._pinned[key]
+        else:
+            self._pinned[key] -= 1
+        state = self._peek(key)
+        if state is not None:
+            self._touch(key, state)  # handoff_done may have changed
+        self.evict()
+
+    @contextmanager
+    def session(self, key: str) -> Iterator[None]:
+        """
+        One message: the outermost session of a key holds its lease, so
+        workers handling the same buyer run their sessions one at a time
+        (refresh -> changes -> save) instead of overwriting each other.
+        """
+        lease = self._pin(key) and self.leased
+        try:
+            started, delay = time.perf_counter(), 0.001
+            while (fetched := self._enter_io(key, lease)) is _LEASE_BUSY:
+                time.sleep(delay)
+                delay = min(delay * 2, _LEASE_POLL_MAX)
+            _lease_waited(started, delay)
+            self._entered(key, fetched)
+            yield
+        finally:
+            try:
+                dirty = self._dirty(key)
+                self._exited(key, dirty, self._exit_io(key, dirty, lease))
+            finally:
+                self._unpin(key)
+
+    @asynccontextmanager
+    async def asession(self, key: str):
+        """
+        session() for coroutines: backend round trips run in a worker
+        thread (as the outbox does with SQLite) and waiting for another
+        worker's lease is an asyncio.sleep, so the event loop keeps
+        serving other buyers meanwhile. Coroutines of this process take
+        turns per key as well (not re-entrant).
+        """
+        turn = self._turns.get(key)
+        if turn is None:
+            turn = self._turns[key] = [asyncio.Lock(), 0]
+        turn[1] += 1
+        self._deferring += 1
+        try:
+            async with turn[0]:
+                io = asyncio.to_thread if self._io_bound(key, True) else _call
+                lease = self._pin(key) and self.leased
+                try:
+                    started, delay = time.perf_counter(), 0.001
+                    while (fetched := await io(self._enter_io, key, lease)) is _LEASE_BUSY:
+                        await asyncio.sleep(delay)
+                        delay = min(delay * 2, _LEASE_POLL_MAX)
+                    _lease_waited(started, delay)
+                    self._entered(key, fetched)
+                    yield
+                finally:
+                    try:
+                        dirty = self._dirty(key)
+                        io = asyncio.to_thread if self._io_bound(key, False) else _call
+                        self._exited(key, dirty, await io(self._exit_io, key, dirty, lease))
+                    finally:
+                        self._unpin(key)
+        finally:
+            self._deferring -= 1
+            turn[1] -= 1
+            if not turn[1]:
+                del self._turns[key]
+            await self._drain()
+
+    # ---------- residency ----------
+    def _touch(self, key: str, state: dict) -> None:
+        if state.get("handoff_done"):
+            self._active.pop(key, None)
+            lru = self._handed_off
+        else:
+            self._handed_off.pop(key, None)
+            lru = self._active
+        lru[key] = time.monotonic()
+        lru.move_to_end(key)
+
+    def _forget(self, key: str) -> None:
+        self._active.pop(key, None)
+        self._handed_off.pop(key, None)
+
+    def _take(self, lru: "OrderedDict[str, float]", idle_before: Optional[float], limit: Optional[int], keep: Optional[str]) -> List[str]:
+        keys = []
+        for key, seen in lru.items():
+            if limit is not None and len(keys) >= limit:
+                break
+            if idle_before is not None and seen > idle_before:
+                break
+            if key not in self._pinned and key != keep:
+                keys.append(key)
+        for key in keys:
+            del lru[key]
+        return keys
+
+    def evict(self, keep: Optional[str] = None) -> int:
+        """
+        Sweep idle keys (every STATE_SWEEP_SECONDS), then evict LRU keys
+        while over max_resident (plus up to STATE_EVICT_BATCH, so writes
+        to cold storage are batched). Cheap when there is nothing to do;
+        called after every session() and every new resident key (`keep`:
+        the key just handed to a caller).
+        """
+        now = time.monotonic()
+        victims: List[str] = []
+        if now >= self._next_sweep:
+            self._next_sweep = now + STATE_SWEEP_SECONDS
+            if self.handoff_idle_seconds > 0:
+                victims += self._take(self._handed_off, now - self.handoff_idle_seconds, None, keep)
+            if self.idle_seconds > 0:
+                victims += self._take(self._active, now - self.idle_seconds, None, keep)
+            if victims:
+                metrics.incr("state.evicted_idle", len(victims))
+
+        excess = len(self._active) + len(self._handed_off) - self.max_resident
+        if self.max_resident > 0 and excess > 0:
+            excess += min(STATE_EVICT_BATCH, self.max_resident // 10)
+            handed_off = self._take(self._handed_off, None, excess, keep)
+            active = self._take(self._active, None, excess - len(handed_off), keep)
+            victims += handed_off + active
+            metrics.incr("state.evicted_ceiling", len(handed_off) + len(active))
+            metrics.incr("state.evicted_handoff", len(handed_off))
+
+        if not victims:
+            return 0
+        try:
+            with metrics.timer("state.evict_ms"):
+                self._evict(victims)
+        except Exception as e:
+            # keep them resident (over the ceiling) rather than lose state
+            print(f"❌ State eviction failed ({self.namespace}, {len(victims)} keys):", str(e))
+            metrics.incr("state.evict_failed", len(victims))
+            for key in victims:
+                state = self._peek(key)
+                if state is not None:
+                    self._touch(key, state)
+            return 0
+        metrics.incr("state.evicted", len(victims))
+        return len(victims)
+
+
+async def _call(fn, *args):
+    return fn(*args)
+
+
+def _lease_waited(started: float, delay: float) -> None:
+    if delay > 0.001:
+        metrics.incr("state.lease_waits")
+        metrics.observe("state.lease_wait_ms", (time.perf_counter() - started) * 1000)
+
+
+class MemoryStateStore(StateStore):
+    """
+    Plain dict; nothing to refresh or write back. Evicted states go to
+    the local cold store (one JSON row per key) and are rehydrated by
+    the next get().
+
+    Inside asession() the cold store stays off the event loop: a
+    non-resident key is loaded in a worker thread before the message
+    runs, and evicted states are parked (encoded) until the session
+    ends, then written in one batch from a worker thread. Parked states
+    are still served by get().
+    """
+
+    def __init__(self, namespace: str = "state", decode: Callable[[dict], dict] = dict, cold: Optional["ColdStore"] = None, **limits):
+        super().__init__(namespace, **limits)
+        self.decode = decode  # cold JSON -> state object
+        self.cold = cold if cold is not None else ColdStore()
+        self._states: Dict[str, dict] = {}
+        # key -> encoded state, evicted but not yet in the cold store
+        self._parked: Dict[str, str] = {}
+        self._flushing = False
+        # keys a running asession() found in neither (new buyers)
+        self._absent: set = set()
+
+    def get(self, key: str) -> Optional[dict]:
+        state = self._states.get(key)
+        if state is not None:
+            return state
+        if key in self._absent:
+            return None
+
+        started = time.perf_counter()
+        body = self._parked.pop(key, None)
+        if body is None:
+            body = self.cold.load(self.namespace, key)
+            if body is None:
+                return None
+        return self._rehydrate(key, body, started)
+
+    def _rehydrate(self, key: str, body: str, started: float) -> dict:
+        state = self.decode(json.loads(body))
+        self._states[key] = state
+        self._touch(key, state)
+        metrics.observe("state.rehydrate_ms", (time.perf_counter() - started) * 1000)
+        metrics.incr("state.rehydrated")
+        self.evict(keep=key)
+        return state
+
+    def put(self, key: str, state: dict) -> None:
+        self._absent.discard(key)
+        self._parked.pop(key, None)
+        new = key not in self._states
+        self._states[key] = state
+        self._touch(key, state)
+        if new:
+            self.evict(keep=key)
+
+    def _peek(self, key: str) -> Optional[dict]:
+        return self._states.get(key)
+
+    # ---------- session steps (see StateStore) ----------
+    def _io_bound(self, key: str, entering: bool) -> bool:
+        return entering and key not in self._states and key not in self._parked
+
+    def _enter_io(self, key: str, lease: bool):
+        if key in self._states or key in self._parked:
+            return None
+        return time.perf_counter(), self.cold.load(self.namespace, key)
+
+    def _entered(self, key: str, fetched) -> None:
+        if fetched is None or key in self._states:
+            return
+        started, body = fetched
+        parked = self._parked.pop(key, None)  # evicted meanwhile: newer
+        if parked is not None:
+            body = parked
+        if body is None:
+            self._absent.add(key)
+        else:
+            self._rehydrate(key, body, started)
+
+    def _exited(self, key: str, dirty, written) -> None:
+        self._absent.discard(key)
+
+    # ---------- eviction ----------
+    def _evict(self, keys: List[str]) -> None:
+        for key in keys:
+            self._parked[key] = _encode(self._states.pop(key))
+        if not self._deferring and not self._flushing:
+            batch = list(self._parked.items())
+            if self._write_cold(batch):
+                self._unpark(batch)
+
+    def _write_cold(self, batch: List[Tuple[str, str]]) -> bool:
+        try:
+            with metrics.timer("state.cold_write_ms"):
+                self.cold.write_many(self.namespace, batch)
+        except Exception as e:
+            # stay parked (still served by get()), retried with the next batch
+            print(f"❌ Cold state write failed ({self.namespace}, {len(batch)} keys):", str(e))
+            metrics.incr("state.evict_failed", len(batch))
+            return False
+        return True
+
+    def _unpark(self, batch: List[Tuple[str, str]]) -> None:
+        for key, body in batch:
+            if self._parked.get(key) is body:  # not rehydrated / re-evicted since
+                del self._parked[key]
+
+    async def _drain(self) -> None:
+        if not self._parked or self._flushing:
+            return
+        # one batch in flight, so an older copy never lands after a newer
+        # one; rows parked meanwhile go in the next round
+        self._flushing = True
+        try:
+            while self._parked:
+                batch = list(self._parked.items())
+                if not await asyncio.to_thread(self._write_cold, batch):
+                    return
+                self._unpark(batch)
+        finally:
+            self._flushing = False
+
+    def delete(self, key: str) -> None:
+        self._states.pop(key, None)
+        self._parked.pop(key, None)
+        self._absent.discard(key)
+        self._forget(key)
+        self.cold.delete(self.namespace, key)
+
+    def clear(self) -> None:
+        self._states.clear()
+        self._parked.clear()
+        self._absent.clear()
+        self._active.clear()
+        self._handed_off.clear()
+        self.cold.clear(self.namespace)
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+
+# ==========================================================
+# SHARED STORE (READ-THROUGH CACHE + DIRTY-FIELD WRITE-BACK)
+# ==========================================================
+class _Cached:
+    __slots__ = ("state", "version", "snapshot")
+
+    def __init__(self, state: dict, version: int, snapshot: Dict[str, str]):
+        self.state = state
+        self.version = version
+        self.snapshot = snapshot  # field -> encoded value as last stored
+
+
+class CachedStateStore(StateStore):
+    """
+    Keeps decoded states in-process and stores each top-level field
+    separately in the backend, next to a per-key version counter.
+
+    refresh() costs one version read: the cached dict is reused unless
+    another worker bumped the version. save() re-encodes the fields,
+    diffs them against what was loaded and writes only the changed ones
+    (a message typically touches a handful of ~30 fields). The write is
+    conditional on the version it was diffed against; if another worker
+    got in first, the key is reloaded and the diff re-applied on top.
+    session() additionally holds a per-key lease, so read-modify-write
+    of the same field (message_count, score) isn't lost either, and
+    loads the key up front, so get() inside it never hits the backend.
+    The backend is the cold store: eviction just saves and drops the
+    cached copy.
+    """
+
+    leased = True
+
+    def _io_bound(self, key: str, entering: bool) -> bool:
+        return True
+
+    def __init__(self, backend, namespace: str, decode: Callable[[dict], dict] = dict, **limits):
+        super().__init__(namespace, **limits)
+        self.backend = backend
+        self.decode = decode  # decoded fields -> state object
+        self._cache: Dict[str, _Cached] = {}
+        # keys a running session found missing in the backend (new buyers)
+        self._absent: set = set()
+        self._owner = f"{_HOST}:{os.getpid()}:{id(self):x}"
+
+    def get(self, key: str) -> Optional[dict]:
+        entry = self._cache.get(key)
+        if entry is not None:
+            return entry.state
+        if key in self._absent:
+            return None
+
+        metrics.incr("state.cache_miss")
+        with metrics.timer("state.load_ms"):
+            fields, version = self.backend.load(self.namespace, key)
+        if fields is None:
+            return None
+        return self._install(key, fields, version)
+
+    def _install(self, key: str, fields: Dict[str, str], version: int) -> dict:
+        state = self.decode({field: json.loads(raw) for field, raw in fields.items()})
+        self._cache[key] = _Cached(state, version, fields)
+        self._touch(key, state)
+        self.evict(keep=key)
+        return state
+
+    def put(self, key: str, state: dict) -> None:
+        self._absent.discard(key)
+        entry = self._cache.get(key)
+        if entry is None:
+            self._cache[key] = _Cached(state, 0, {})
+            self._touch(key, state)
+            self.evict(keep=key)
+        else:
+            entry.state = state
+            self._touch(key, state)
+
+    # ---------- session steps (see StateStore) ----------
+    def _enter_io(self, key: str, lease: bool):
+        if lease and not self.backend.acquire(self.namespace, key, self._owner, STATE_LEASE_MS):
+            return _LEASE_BUSY
+        entry = self._cache.get(key)
+        if entry is not None and self.backend.version(self.namespace, key) == entry.version:
+            return entry, None
+        with metrics.timer("state.load_ms"):
+            return entry, self.backend.load(self.namespace, key)
+
+    def _entered(self, key: str, fetched) -> None:
+        entry, loaded = fetched
+        if loaded is None or self._cache.get(key) is not entry:
+            return  # cached copy is current (or was replaced meanwhile)
+        metrics.incr("state.cache_stale" if entry is not None else "state.cache_miss")
+        if entry is not None:
+            self._cache.pop(key, None)
+            self._forget(key)
+        fields, version = loaded
+        if fields is None:
+            self._absent.add(key)
+        else:
+            self._install(key, fields, version)
+
+    def _dirty(self, key: str):
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        encoded = {field: _encode(value) for field, value in entry.state.items()}
+        changed = {f: v for f, v in encoded.items() if entry.snapshot.get(f) != v}
+        removed = [f for f in entry.snapshot if f not in encoded]
+        if not changed and not removed:
+            return None
+        return entry, encoded, changed, removed
+
+    def _exit_io(self, key: str, dirty, lease: bool):
+        try:
+            if dirty is None:
+                return None
+            entry, _, changed, removed = dirty
+            with metrics.timer("state.save_ms"):
+                return self._write(key, entry.version, changed, removed)
+        finally:
+            if lease:
+                self.backend.release(self.namespace, key, self._owner)
+
+    def _exited(self, key: str, dirty, written) -> None:
+        self._absent.discard(key)
+        if dirty is None:
+            return
+        entry, encoded, changed, removed = dirty
+        metrics.incr("state.fields_written", len(changed) + len(removed))
+        if self._cache.get(key) is not entry:
+            return
+        version, merged = written
+        if merged is None:
+            entry.version = version
+            entry.snapshot = encoded
+        else:
+            # another worker's fields are in there too: cache the merge
+            state = self.decode({field: json.loads(raw) for field, raw in merged.items()})
+            self._cache[key] = _Cached(state, version, merged)
+
+    def _write(self, key: str, expected: int, changed: Dict[str, str], removed: List[str]) -> Tuple[int, Optional[Dict[str, str]]]:
+        """
+        Conditional write of the diff against version `expected`. On a
+        conflict: reload, re-apply the diff, retry. Returns the new
+        version and, when a reload happened, the merged stored fields.
+        """
+        merged = None
+        for _ in range(STATE_WRITE_RETRIES):
+            version = self.backend.write(self.namespace, key, changed, removed, expected)
+            if version is not None:
+                return version, merged
+            metrics.incr("state.write_conflict")
+            fields, expected = self.backend.load(self.namespace, key)
+            merged = dict(fields or {})
+            merged.update(changed)
+            for field in removed:
+                merged.pop(field, None)
+        raise RuntimeError(f"state write for {self.namespace}:{key} kept conflicting")
+
+    def _peek(self, key: str) -> Optional[dict]:
+        entry = self._cache.get(key)
+        return entry.state if entry is not None else None
+
+    def _evict(self, keys: List[str]) -> None:
+        for key in keys:
+            self.save(key)
+            self._cache.pop(key, None)
+
+    def delete(self, key: str) -> None:
+        self._cache.pop(key, None)
+        self._absent.discard(key)
+        self._forget(key)
+        self.backend.delete(self.namespace, key)
+
+    def clear(self) -> None:
+        self._cache.clear()
+        self._absent.clear()
+        self._active.clear()
+        self._handed_off.clear()
+        self.backend.clear(self.namespace)
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+
+# ==========================================================
+# SQLITE BACKEND (WAL, one file shared by local workers)
+# ==========================================================
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS state_fields (
+    ns TEXT NOT NULL,
+    key TEXT NOT NULL,
+    field TEXT NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (ns, key, field)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS state_versions (
+    ns TEXT NOT NULL,
+    key TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (ns, key)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS state_leases (
+    ns TEXT NOT NULL,
+    key TEXT NOT NULL,
+    owner TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (ns, key)
+) WITHOUT ROWID;
+"""
+
+
+class _SQLiteFile:
+    """
+    Lazily opened WAL connection, re-opened after a fork.
+    """
+
+    schema = ""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid = 0
+        self._lock = threading.Lock()
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None or self._pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(self.schema)
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+
+class SQLiteBackend(_SQLiteFile):
+    """
+    WAL lets every worker read while one writes; writes are short
+    BEGIN IMMEDIATE transactions (busy_timeout covers contention), which
+    also makes the version check + write of write() atomic. Leases are
+    rows in state_leases, taken over once expired.
+    """
+
+    schema = _SCHEMA
+
+    def __init__(self, path: str = STATE_SQLITE_PATH):
+        super().__init__(path)
+
+    def version(self, ns: str, key: str) -> int:
+        with self._lock:
+            row = self._db().execute(
+                "SELECT version FROM state_versions WHERE ns = ? AND key = ?", (ns, key)
+            ).fetchone()
+        return row[0] if row else 0
+
+    def load(self, ns: str, key: str) -> Tuple[Optional[Dict[str, str]], int]:
+        with self._lock:
+            db = self._db()
+            db.execute("BEGIN")
+            try:
+                row = db.execute(
+                    "SELECT version FROM state_versions WHERE ns = ? AND key = ?", (ns, key)
+                ).fetchone()
+                rows = db.execute(
+                    "SELECT field, value FROM state_fields WHERE ns = ? AND key = ?", (ns, key)
+                ).fetchall()
+            finally:
+                db.execute("COMMIT")
+        if not row:
+            return None, 0
+        return dict(rows), row[0]
+
+    def write(self, ns: str, key: str, changed: Dict[str, str], removed: List[str], expected: int) -> Optional[int]:
+        """New version, or None (nothing written) if it isn't `expected`."""
+        with self._lock:
+            db = self._db()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                row = db.execute(
+                    "SELECT version FROM state_versions WHERE ns = ? AND key = ?", (ns, key)
+                ).fetchone()
+                if (row[0] if row else 0) != expected:
+                    db.execute("ROLLBACK")
+                    return None
+                db.executemany(
+                    "INSERT OR REPLACE INTO state_fields (ns, key, field, value) VALUES (?, ?, ?, ?)",
+                    [(ns, key, f, v) for f, v in changed.items()],
+                )
+                db.executemany(
+                    "DELETE FROM state_fields WHERE ns = ? AND key = ? AND field = ?",
+                    [(ns, key, f) for f in removed],
+                )
+                db.execute(
+                    "INSERT OR REPLACE INTO state_versions (ns, key, version, updated_at) VALUES (?, ?, ?, ?)",
+                    (ns, key, expected + 1, time.time()),
+                )
+                db.execute("COMMIT")
+            except Exception:
+                db.execute("ROLLBACK")
+                raise
+        return expected + 1
+
+    def acquire(self, ns: str, key: str, owner: str, ttl_ms: int) -> bool:
+        now = time.time()
+        with self._lock:
+            cur = self._db().execute(
+                "INSERT INTO state_leases (ns, key, owner, expires_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (ns, key) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+                "WHERE state_leases.expires_at < ? OR state_leases.owner = excluded.owner",
+                (ns, key, owner, now + ttl_ms / 1000, now),
+            )
+        return cur.rowcount == 1
+
+    def release(self, ns: str, key: str, owner: str) -> None:
+        with self._lock:
+            self._db().execute(
+                "DELETE FROM state_leases WHERE ns = ? AND key = ? AND owner = ?", (ns, key, owner)
+            )
+
+    def delete(self, ns: str, key: str) -> None:
+        with self._lock:
+            db = self._db()
+            db.execute("BEGIN IMMEDIATE")
+            db.execute("DELETE FROM state_fields WHERE ns = ? AND key = ?", (ns, key))
+            db.execute("DELETE FROM state_versions WHERE ns = ? AND key = ?", (ns, key))
+            db.execute("COMMIT")
+
+    def clear(self, ns: str) -> None:
+        with self._lock:
+            db = self._db()
+            db.execute("BEGIN IMMEDIATE")
+            db.execute("DELETE FROM state_fields WHERE ns = ?", (ns,))
+            db.execute("DELETE FROM state_versions WHERE ns = ?", (ns,))
+            db.execute("DELETE FROM state_leases WHERE ns = ?", (ns,))
+            db.execute("COMMIT")
+
+
+# ==========================================================
+# COLD STORE (evicted states of the memory backend)
+# ==========================================================
+_COLD_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cold_state (
+    ns TEXT NOT NULL,
+    key TEXT NOT NULL,
+    body TEXT NOT NULL,
+    evicted_at REAL NOT NULL,
+    PRIMARY KEY (ns, key)
+) WITHOUT ROWID;
+"""
+
+
+class ColdStore(_SQLiteFile):
+    """
+    One JSON row per evicted key; a batch of evictions is one
+    transaction. Rows stay after rehydration (overwritten by the next
+    eviction), so a restart still finds the last evicted copy.
+    """
+
+    schema = _COLD_SCHEMA
+
+    def __init__(self, path: str = STATE_COLD_PATH):
+        super().__init__(path)
+
+    def load(self, ns: str, key: str) -> Optional[str]:
+        if self._conn is None and not os.path.exists(self.path):
+            return None  # nothing evicted yet: don't create the file on a read
+        with self._lock:
+            row = self._db().execute(
+                "SELECT body FROM cold_state WHERE ns = ? AND key = ?", (ns, key)
+            ).fetchone()
+        return row[0] if row else None
+
+    def write_many(self, ns: str, records: List[Tuple[str, str]]) -> None:
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                db.executemany(
+                    "INSERT OR REPLACE INTO cold_state (ns, key, body, evicted_at) VALUES (?, ?, ?, ?)",
+                    [(ns, key, body, now) for key, body in records],
+                )
+                db.execute("COMMIT")
+            except Exception:
+                db.execute("ROLLBACK")
+                raise
+
+    def delete(self, ns: str, key: str) -> None:
+        if self._conn is None and not os.path.exists(self.path):
+            return
+        with self._lock:
+            self._db().execute("DELETE FROM cold_state WHERE ns = ? AND key = ?", (ns, key))
+
+    def clear(self, ns: str) -> None:
+        if self._conn is None and not os.path.exists(self.path):
+            return
+        with self._lock:
+            self._db().execute("DELETE FROM cold_state WHERE ns = ?", (ns,))
+
+
+# ==========================================================
+# REDIS-PROTOCOL BACKEND (minimal RESP2 client, no dependency)
+# ==========================================================
+class RespError(Exception):
+    pass
+
+
+class RespClient:
+    """
+    Just enough RESP2 for the state backend: one blocking socket,
+    pipelined commands, one reconnect + retry on a broken connection.
+    Works against Redis, Valkey, KeyDB or scripts/resp_server.py.
+    """
+
+    def __init__(self, url: str = STATE_REDIS_URL, timeout: float = STATE_REDIS_TIMEOUT):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "127.0.0.1"
+        self.port = parsed.port or 6379
+        self.password = unquote(parsed.password) if parsed.password else None
+        self.db = int((parsed.path or "/0").lstrip("/") or 0)
+        self.timeout = timeout
+        self._sock: Optional[socket.socket] = None
+        self._file = None
+        self._pid = 0
+        self._lock = threading.Lock()
+
+    def _connect(self) -> None:
+        self.close()
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._sock, self._file, self._pid = sock, sock.makefile("rb"), os.getpid()
+        setup = []
+        if self.password:
+            setup.append(("AUTH", self.password))
+        if self.db:
+            setup.append(("SELECT", self.db))
+        if setup:
+            self._roundtrip(setup)
+
+    def close(self) -> None:
+        if self._sock is not None:
+            try:
+                self._file.close()
+                self._sock.close()
+            except OSError:
+                pass
+        self._sock = self._file = None
+
+    def execute(self, *args):
+        return self.pipeline([args])[0]
+
+    def watched(self, key: str, read: tuple, build: Callable[[object], Optional[List[tuple]]]) -> Optional[list]:
+        """
+        Optimistic transaction on one connection: WATCH key, run `read`,
+        then MULTI + build(reply) + EXEC. Returns the EXEC replies, or
+        None if build() declined (None) or key changed after the WATCH.
+        """
+        with self._lock:
+            for attempt in (1, 2):
+                try:
+                    if self._sock is None or self._pid != os.getpid():
+                        self._connect()
+                    reply = self._roundtrip([("WATCH", key), read])[1]
+                    commands = build(reply)
+                    if commands is None:
+                        self._roundtrip([("UNWATCH",)])
+                        return None
+                    return self._roundtrip([("MULTI",), *commands, ("EXEC",)])[-1]
+                except (OSError, ConnectionError):
+                    self.close()
+                    if attempt == 2:
+                        raise
+
+    def pipeline(self, commands: List[tuple]) -> list:
+        with self._lock:
+            for attempt in (1, 2):
+                try:
+                    if self._sock is None or self._pid != os.getpid():
+                        self._connect()
+                    return self._roundtrip(commands)
+                except (OSError, ConnectionError):
+                    self.close()
+                    if attempt == 2:
+                        raise
+
+    def _roundtrip(self, commands: List[tuple]) -> list:
+        self._sock.sendall(b"".join(_pack(cmd) for cmd in commands))
+        replies = [self._read() for _ in commands]
+        for reply in replies:
+            if isinstance(reply, RespError):
+                raise reply
+        return replies
+
+    def _read(self):
+        line = self._file.readline()
+        if not line:
+            raise ConnectionError("connection closed by server")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest.decode()
+        if kind == b"-":
+            return RespError(rest.decode())
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            size = int(rest)
+            if size < 0:
+                return None
+            data = self._file.read(size + 2)
+            return data[:-2].decode("utf-8")
+        if kind == b"*":
+            size = int(rest)
+            return None if size < 0 else [self._read() for _ in range(size)]
+        raise ConnectionError(f"bad RESP reply: {line!r}")
+
+
+def _pack(args: tuple) -> bytes:
+    out = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        data = arg if isinstance(arg, bytes) else str(arg).encode("utf-8")
+        out.append(b"$%d\r\n%s\r\n" % (len(data), data))
+    return b"".join(out)
+
+
+class RedisBackend:
+    """
+    One hash per key ("{prefix}:{ns}:{key}"): one hash field per state
+    field plus VERSION_FIELD. Writes are WATCH + version check, then
+    MULTI / HSET / HDEL / HINCRBY / EXEC (aborted if the key changed).
+    Leases are "{hash key}:lease" strings set with NX PX.
+    """
+
+    def __init__(self, client: Optional[RespClient] = None, prefix: str = STATE_REDIS_PREFIX):
+        self.client = client or RespClient()
+        self.prefix = prefix
+
+    def _key(self, ns: str, key: str) -> str:
+        return f"{self.prefix}:{ns}:{key}"
+
+    def version(self, ns: str, key: str) -> int:
+        value = self.client.execute("HGET", self._key(ns, key), VERSION_FIELD)
+        return int(value) if value is not None else 0
+
+    def load(self, ns: str, key: str) -> Tuple[Optional[Dict[str, str]], int]:
+        flat = self.client.execute("HGETALL", self._key(ns, key)) or []
+        fields = dict(zip(flat[::2], flat[1::2]))
+        version = fields.pop(VERSION_FIELD, None)
+        if version is None:
+            return None, 0
+        return fields, int(version)
+
+    def write(self, ns: str, key: str, changed: Dict[str, str], removed: List[str], expected: int) -> Optional[int]:
+        """New version, or None (nothing written) if it isn't `expected`."""
+        k = self._key(ns, key)
+
+        def build(version) -> Optional[List[tuple]]:
+            if int(version or 0) != expected:
+                return None
+            commands: List[tuple] = []
+            if changed:
+                commands.append(("HSET", k, *[item for pair in changed.items() for item in pair]))
+            if removed:
+                commands.append(("HDEL", k, *removed))
+            commands.append(("HINCRBY", k, VERSION_FIELD, 1))
+            return commands
+
+        replies = self.client.watched(k, ("HGET", k, VERSION_FIELD), build)
+        return None if replies is None else int(replies[-1])
+
+    def acquire(self, ns: str, key: str, owner: str, ttl_ms: int) -> bool:
+        return self.client.execute("SET", self._key(ns, key) + ":lease", owner, "NX", "PX", ttl_ms) == "OK"
+
+    def release(self, ns: str, key: str, owner: str) -> None:
+        lease = self._key(ns, key) + ":lease"
+        # only our own lease (it may have expired and been taken over)
+        self.client.watched(lease, ("GET", lease), lambda holder: [("DEL", lease)] if holder == owner else None)
+
+    def delete(self, ns: str, key: str) -> None:
+        self.client.execute("DEL", self._key(ns, key))
+
+    def clear(self, ns: str) -> None:
+        cursor = "0"
+        while True:
+            cursor, keys = self.client.execute("SCAN", cursor, "MATCH", self._key(ns, "*"), "COUNT", 1000)
+            if keys:
+                self.client.execute("DEL", *keys)
+            if cursor == "0":
+                return
+
+
+# ==========================================================
+# FACTORY
+# ==========================================================
+_backends: Dict[str, object] = {}
+
+
+def create_store(namespace: str, backend: str = STATE_BACKEND, decode: Callable[[dict], dict] = dict) -> StateStore:
+    """
+    Store for one kind of state ("state", "brain", ...). Shared
+    backends (and the cold store) are created once per process and
+    reused across namespaces; `decode` turns loaded fields back into the
+    namespace's state type.
+    """
+    if backend == "memory":
+        if "cold" not in _backends:
+            _backends["cold"] = ColdStore()
+        return MemoryStateStore(namespace, decode, _backends["cold"])
+    if backend not in _backends:
+        if backend == "sqlite":
+            _backends[backend] = SQLiteBackend()
+        elif backend == "redis":
+            _backends[backend] = RedisBackend()
+        else:
+            raise ValueError(f"unknown STATE_BACKEND {backend!r} (memory | sqlite | redis)")
+        print(f"✅ State backend: {backend}")
+    return CachedStateStore(_backends[backend], namespace, decode)
@@ -0,0 +1,189 @@
+# app/summarizer.py
+
+import os
+import re
+from typing import List, Optional
+
+from app.intent_engine import detect_intent
+
+# ==========================================================
+# CONFIG
+# ==========================================================
+SUMMARY_ENABLED = os.getenv("AI_SUMMARY", "true").lower() in ("1", "true", "yes")
+# Raw history entries kept (and sent to the model) when summarizing;
+# older entries are folded into the summary
+HISTORY_RAW_ENTRIES = int(os.getenv("AI_HISTORY_RAW_ENTRIES", "4"))
+# Without the summarizer: what append_history keeps / call_ai sends
+LEGACY_HISTORY_ENTRIES = 15
+LEGACY_PROMPT_ENTRIES = 6
+
+_MAX_TOPICS = 8
+_MAX_QUESTIONS = 1
+_QUESTION_CHARS = 60
+
+# ==========================================================
+# SLOT EXTRACTION (budget / location / purpose / timeline / loan)
+# ==========================================================
+# Only amounts the buyer states as THEIR budget ("budget 50 lakh",
+# "under 1 cr", "45 lakh tak"), never a quoted / asked price
+_AMOUNT = r"(\d+(?:\.\d+)?)\s*(lakhs?|lacs?|l|cr|crores?|k)\b"
+_BUDGET = re.compile(
+    r"\b(?:budget|under|below|upto|up to|within|max(?:imum)?|afford)\b(?:\s+(?:is|of|hai|around|about|approx|only|ka|mera|my|rs\.?))*\s*" + _AMOUNT
+    + r"|\b" + _AMOUNT + r"\s*(?:tak|max|budget)\b",
+    re.IGNORECASE,
+)
+_BUDGET_UNITS = {"l": "lakh", "lac": "lakh", "lacs": "lakh", "lakhs": "lakh", "lakh": "lakh",
+                 "cr": "crore", "crore": "crore", "crores": "crore", "k": "thousand"}
+# Known Patna localities (+ AI_LOCALITIES, comma separated): a name
+# from this list anywhere in the message is a location
+KNOWN_LOCALITIES = {
+    "saguna more", "danapur", "bailey road", "boring road", "kankarbagh",
+    "raja bazar", "raza bazar", "rajendra nagar", "patliputra", "ashiana nagar",
+    "anisabad", "khagaul", "phulwari sharif", "bihta", "gola road", "rukanpura",
+    "digha", "kurji", "frazer road", "exhibition road", "gandhi maidan",
+    "kadamkuan", "bhootnath road", "sampatchak", "jakkanpur", "gardanibagh",
+    "sheikhpura", "shastri nagar", "s k puri", "sri krishna puri", "rajiv nagar",
+    "indrapuri", "saristabad", "mithapur", "hajipur", "fatuha", "khemnichak",
+    "bypass", "naubatpur", "nehru nagar", "punaichak", "kidwaipuri",
+} | {
+    name.strip().lower() for name in os.getenv("AI_LOCALITIES", "").split(",") if name.strip()
+}
+_KNOWN_LOCALITY = re.compile(
+    r"\b(" + "|".join(sorted(map(re.escape, KNOWN_LOCALITIES), key=len, reverse=True)) + r")\b"
+)
+# Unknown names only with an explicit place marker after them
+# ("near gola chowk area", "in ramnagar colony")
+_MARKED_LOCATION = re.compile(
+    r"\b(?:near|around|close to|in)\s+([a-z]+(?:\s[a-z]+)?)\s+(?:area|locality|colony|side|mohalla)\b"
+)
+_NOT_PLACES = {
+    "the", "a", "an", "this", "that", "my", "your", "our", "which", "what", "any",
+    "same", "other", "another", "good", "nice", "budget", "total",
+}
+_TIMELINE = re.compile(
+    r"\b(immediately|asap|urgent|this month|next month|this year|next year|"
+    r"\d+\s*(?:months?|mahine|years?|saal))\b"
+)
+_INVESTMENT = ("invest", "investment", "rental", "rent out", "roi", "appreciation")
+_SELF_USE = ("self use", "own use", "family", "to live", "rehne", "for living", "shift")
+_LOAN = ("loan", "emi", "home loan", "finance")
+
+_TOPIC_LABELS = {
+    "price_query": "price",
+    "location_query": "location",
+    "configuration_query": "configuration",
+    "amenities_query": "amenities",
+    "site_visit": "site visit",
+    "purchase_intent_high": "booking",
+    "loan_query": "loan / EMI",
+}
+
+
+def extract_slots(text: str) -> dict:
+    """
+    Qualification facts stated in one buyer message (only what's found).
+    """
+    t = (text or "").lower()
+    slots = {}
+
+    m = _BUDGET.search(t)
+    if m:
+        amount, unit = (m.group(1), m.group(2)) if m.group(1) else (m.group(3), m.group(4))
+        slots["budget"] = f"{amount} {_BUDGET_UNITS.get(unit.lower(), unit)}"
+
+    # low-confidence "in X" phrases are ignored, so they never overwrite
+    # a location the buyer actually stated
+    m = _KNOWN_LOCALITY.search(t)
+    if m:
+        slots["location"] = m.group(1)
+    else:
+        m = _MARKED_LOCATION.search(t)
+        if m and not _NOT_PLACES.intersection(m.group(1).split()):
+            slots["location"] = m.group(1)
+
+    if any(w in t for w in _INVESTMENT):
+        slots["purpose"] = "investment"
+    elif any(w in t for w in _SELF_USE):
+        slots["purpose"] = "self use"
+
+    m = _TIMELINE.search(t)
+    if m:
+        slots["timeline"] = m.group(1)
+
+    if any(w in t for w in _LOAN):
+        slots["loan_flag"] = True
+    return slots
+
+
+# ==========================================================
+# INCREMENTAL FOLDING (called from state.append_history)
+# ==========================================================
+def fold_user_text(state: dict, text: str) -> None:
+    """
+    Newest statement wins for every slot.
+    """
+    for slot, value in extract_slots(text).items():
+        state[slot] = value
+
+
+def fold_evicted(state: dict, entries: List[dict]) -> None:
+    """
+    Turns leaving the raw history are reduced to topics + the last
+    buyer question, so the summary stays a couple of short lines.
+    """
+    summary = state.get("conversation_summary") or {"topics": [], "questions": []}
+    for entry in entries:
+        if entry.get("from") == "bot":
+            continue
+        text = entry.get("text") or ""
+        topic = _TOPIC_LABELS.get(detect_intent(text))
+        if topic:
+            if topic in summary["topics"]:
+                summary["topics"].remove(topic)
+            summary["topics"].append(topic)
+        if "?" in text or topic:
+            summary["questions"].append(text[:_QUESTION_CHARS])
+
+    summary["topics"] = summary["topics"][-_MAX_TOPICS:]
+    summary["questions"] = summary["questions"][-_MAX_QUESTIONS:]
+    state["conversation_summary"] = summary
+
+
+def history_limit() -> int:
+    return HISTORY_RAW_ENTRIES if SUMMARY_ENABLED else LEGACY_HISTORY_ENTRIES
+
+
+# ==========================================================
+# PROMPT SIDE (called from ai_engine.call_ai)
+# ==========================================================
+def prompt_history(state: dict) -> List[dict]:
+    history = state.get("conversation_history", [])
+    return history[-(HISTORY_RAW_ENTRIES if SUMMARY_ENABLED else LEGACY_PROMPT_ENTRIES):]
+
+
+def summary_message(state: dict) -> Optional[str]:
+    """
+    Compact "what we know so far" block sent instead of older raw turns.
+    """
+    if not SUMMARY_ENABLED:
+        return None
+
+    lines = []
+    facts = [
+        f"{slot} {state[slot]}" for slot in ("budget", "location", "purpose", "timeline")
+        if state.get(slot)
+    ]
+    if state.get("loan_flag"):
+        facts.append("needs loan")
+    if facts:
+        lines.append("- Buyer details: " + "; ".join(facts))
+
+    summary = state.get("conversation_summary") or {}
+    if summary.get("topics"):
+        lines.append("- Discussed: " + ", ".join(summary["topics"]))
+    if summary.get("questions"):
+        lines.append("- Last earlier question: " + " | ".join(summary["questions"]))
+
+    if not lines:
+        return None
+    return "EARLIER IN THIS CHAT:\n" + "\n".join(lines)
@@ -0,0 +1,21 @@
+from fastapi import APIRouter, HTTPException
+from app.usage.service import DIMENSIONS, usage_ledger
+
+router = APIRouter(prefix="/usage")
+
+@router.get("/")
+def usage_totals():
+    return usage_ledger.totals()
+
+@router.get("/top/{dimension}")
+def top_spenders(dimension: str, limit: int = 10, by: str = "cost_usd"):
+    if dimension not in DIMENSIONS:
+        raise HTTPException(status_code=404, detail=f"dimension must be one of {', '.join(DIMENSIONS)}")
+    return usage_ledger.top(dimension, limit=limit, by=by)
+
+@router.get("/{dimension}/{key}")
+def usage_for(dimension: str, key: str):
+    row = usage_ledger.get(dimension, key)
+    if row is None:
+        raise HTTPException(status_code=404, detail="no usage recorded")
+    return row
@@ -0,0 +1,199 @@
+# app/usage/service.py
+
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from app.metrics import metrics
+
+# --------------------------------------------------
+# CONFIG
+# --------------------------------------------------
+USAGE_PATH = os.getenv("AI_USAGE_PATH", "data/ai_usage.json")
+USAGE_FLUSH_SECONDS = int(os.getenv("AI_USAGE_FLUSH_SECONDS", "60"))
+# Per-phone rows are the only unbounded dimension: keep the most recent N
+USAGE_MAX_PHONES = int(os.getenv("AI_USAGE_MAX_PHONES", "100000"))
+
+# USD per 1M tokens: (input, cached input, output). List prices; update
+# when OpenAI changes them. Unknown models are counted with cost 0.
+MODEL_PRICES = {
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+    "gpt-4o": (2.50, 1.25, 10.00),
+    "gpt-4.1": (2.00, 0.50, 8.00),
+    "gpt-4.1-mini": (0.40, 0.10, 1.60),
+}
+
+DIMENSIONS = ("tenant", "project", "phone", "model")
+UNATTRIBUTED = "unattributed"
+
+
+def call_cost(model: str, prompt_tokens: int, cached_tokens: int, completion_tokens: int) -> float:
+    price = MODEL_PRICES.get(model)
+    if price is None:
+        # dated snapshots, e.g. gpt-4o-mini-2024-07-18
+        price = next((p for m, p in MODEL_PRICES.items() if model.startswith(m + "-")), (0.0, 0.0, 0.0))
+    input_price, cached_price, output_price = price
+    return (
+        (prompt_tokens - cached_tokens) * input_price
+        + cached_tokens * cached_price
+        + completion_tokens * output_price
+    ) / 1_000_000
+
+
+def _empty_row() -> dict:
+    return {
+        "calls": 0,
+        "prompt_tokens": 0,
+        "cached_tokens": 0,
+        "completion_tokens": 0,
+        "cost_usd": 0.0,
+        "latency_ms": 0.0,
+        "last_at": 0.0,
+    }
+
+
+# --------------------------------------------------
+# IN-MEMORY LEDGER (PER TENANT / PROJECT / PHONE / MODEL)
+# --------------------------------------------------
+class UsageLedger:
+    """
+    Aggregates every LLM call (tokens, cost, latency) per tenant,
+    project, phone and model. Cheap to update on the hot path; flushed
+    to a JSON snapshot periodically so totals survive restarts.
+    """
+
+    def __init__(self, max_phones: int = USAGE_MAX_PHONES):
+        self.max_phones = max_phones
+        self._rows: Dict[str, "OrderedDict[str, dict]"] = {d: OrderedDict() for d in DIMENSIONS}
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        model: str,
+        prompt_tokens: int,
+        completion_tokens: int,
+        cached_tokens: int = 0,
+        latency_ms: float = 0.0,
+        tenant: Optional[str] = None,
+        project: Optional[str] = None,
+        phone: Optional[str] = None,
+    ) -> float:
+        """
+        Add one call. Returns its cost in USD.
+        """
+        cost = call_cost(model, prompt_tokens, cached_tokens, completion_tokens)
+        keys = {
+            "tenant": tenant or UNATTRIBUTED,
+            "project": project or UNATTRIBUTED,
+            "phone": phone or UNATTRIBUTED,
+            "model": model,
+        }
+        now = time.time()
+        with self._lock:
+            for dimension, key in keys.items():
+                rows = self._rows[dimension]
+                row = rows.get(key)
+                if row is None:
+                    row = rows[key] = _empty_row()
+                row["calls"] += 1
+                row["prompt_tokens"] += prompt_tokens
+                row["cached_tokens"] += cached_tokens
+                row["completion_tokens"] += completion_tokens
+                row["cost_usd"] += cost
+                row["latency_ms"] += latency_ms
+                row["last_at"] = now
+                rows.move_to_end(key)
+
+            phones = self._rows["phone"]
+            while len(phones) > self.max_phones:
+                phones.popitem(last=False)
+
+        metrics.incr("ai.usage.calls")
+        metrics.incr("ai.usage.cost_micro_usd", int(cost * 1_000_000))
+        return cost
+
+    # ---------- queries ----------
+    def top(self, dimension: str, limit: int = 10, by: str = "cost_usd") -> List[dict]:
+        if dimension not in self._rows:
+            raise ValueError(f"unknown dimension: {dimension}")
+        with self._lock:
+            rows = [dict(row, key=key) for key, row in self._rows[dimension].items()]
+        rows.sort(key=lambda r: r.get(by, 0), reverse=True)
+        return [_present(r) for r in rows[:limit]]
+
+    def get(self, dimension: str, key: str) -> Optional[dict]:
+        with self._lock:
+            row = self._rows.get(dimension, {}).get(key)
+            return _present(dict(row, key=key)) if row else None
+
+    def totals(self) -> dict:
+        with self._lock:
+            total = _empty_row()
+            for row in self._rows["model"].values():
+                for field in ("calls", "prompt_tokens", "cached_tokens", "completion_tokens", "cost_usd", "latency_ms"):
+                    total[field] += row[field]
+                total["last_at"] = max(total["last_at"], row["last_at"])
+        return _present(dict(total, key="all"))
+
+    # ---------- persistence ----------
+    def save(self, path: str = USAGE_PATH) -> None:
+        """
+        Atomic snapshot (write temp file + rename).
+        """
+        with self._lock:
+            data = {d: dict(rows) for d, rows in self._rows.items()}
+            data = json.loads(json.dumps(data))  # deep copy while locked
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp, path)
+
+    def load(self, path: str = USAGE_PATH) -> int:
+        """
+        Restore a snapshot. Returns the number of rows loaded.
+        """
+        if not os.path.exists(path):
+            return 0
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            print("⚠️ Usage snapshot unreadable, starting empty")
+            return 0
+
+        loaded = 0
+        with self._lock:
+            for dimension in DIMENSIONS:
+                rows = sorted((data.get(dimension) or {}).items(), key=lambda kv: kv[1].get("last_at", 0))
+                for key, row in rows:
+                    self._rows[dimension][key] = dict(_empty_row(), **row)
+                    loaded += 1
+        return loaded
+
+
+def _present(row: dict) -> dict:
+    calls = row["calls"] or 1
+    row["cost_usd"] = round(row["cost_usd"], 6)
+    row["avg_latency_ms"] = round(row.pop("latency_ms") / calls, 1)
+    return row
+
+
+async def flush_forever(ledger: UsageLedger, path: str = USAGE_PATH, interval: int = USAGE_FLUSH_SECONDS) -> None:
+    """
+    Background snapshot loop (started from app.main).
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(ledger.save, path)
+        except Exception as e:
+            print("❌ Usage snapshot failed:", str(e))
+
+
+# Singleton ledger
+usage_ledger = UsageLedger()
@@ -0,0 +1,60 @@
+# benchmarks/bench_backfill.py
+"""
+Backfill throughput (app.backfill) vs replaying messages one at a time
+through detect_intent + update_state_with_intent, on synthetic history
+(scripts/intent_corpus.py phrases spread over --users phones).
+
+    python -m benchmarks.bench_backfill
+    python -m benchmarks.bench_backfill --records 500000 --workers 1 2 4
+"""
+
+import argparse
+import io
+import random
+import time
+
+from app.backfill import backfill
+from app.intent_engine import detect_intent
+from app.state import state_store, update_state_with_intent
+from scripts.intent_corpus import corpus
+
+
+def records(n: int, users: int, seed: int = 7):
+    rng = random.Random(seed)
+    train, held_out = corpus()
+    texts = [t for t, _ in train + held_out]
+    for i in range(n):
+        yield {"phone": f"91{rng.randrange(users):08d}", "timestamp": i, "text": rng.choice(texts)}
+
+
+def replay(n: int, users: int) -> float:
+    started = time.perf_counter()
+    for r in records(n, users):
+        update_state_with_intent(r["phone"], detect_intent(r["text"]))
+    elapsed = time.perf_counter() - started
+    state_store.clear()
+    return n / elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--records", type=int, default=200_000)
+    parser.add_argument("--users", type=int, default=20_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 1, 2, 4])
+    args = parser.parse_args()
+
+    print(f"{args.records} records, {args.users} users")
+    print(f"replay (get_state + update_state_with_intent)  {replay(min(args.records, 50_000), args.users):10.0f} records/s")
+
+    baseline = None
+    for workers in args.workers:
+        out = io.StringIO()
+        users, stats = backfill(records(args.records, args.users), out, workers=workers)
+        if baseline is None:
+            baseline = users
+        same = all(users[p]["score"] == baseline[p]["score"] for p in baseline)
+        print(f"backfill workers={workers:<2}  {stats['records_per_sec']:10.0f} records/s  users {stats['users']}  same scores {same}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# benchmarks/bench_fanout.py
+"""
+Webhook fan-out throughput, in MESSAGES/sec (not requests/sec).
+
+Posts synthetic multi-message deliveries to the real /whatsapp/webhook
+route and waits until the pipeline has handled every message. The funnel
+itself is replaced by a no-op handler so we measure parse + fan-out +
+enqueue + dispatch only.
+
+    python -m benchmarks.bench_fanout --requests 500 --users 5 --per-user 4
+"""
+
+import argparse
+import random
+import threading
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.app.whatsapp.routes import router
+from app.app.whatsapp.pipeline import pipeline
+from app.app.whatsapp.dedup import message_dedup
+from benchmarks.payloads import multi_message_payload
+
+
+def run(requests: int, users: int, per_user: int, shards: int) -> dict:
+    handled = {"messages": 0}
+    lock = threading.Lock()
+
+    def noop_handler(job):
+        with lock:
+            handled["messages"] += len(job["messages"])
+        return ["replied"] * len(job["messages"])
+
+    message_dedup.clear()
+    pipeline.handler = noop_handler
+    pipeline.executor.shards = shards
+    pipeline.executor.mailbox_size = 0  # unbounded for the benchmark
+
+    @asynccontextmanager
+    async def lifespan(app):
+        await pipeline.start()
+        yield
+        await pipeline.stop()
+
+    app = FastAPI(lifespan=lifespan)
+    app.include_router(router)
+
+    rng = random.Random(7)
+    payloads = [multi_message_payload(users, per_user, seq=i, rng=rng) for i in range(requests)]
+    expected = requests * users * per_user
+
+    with TestClient(app) as client:
+        started = time.perf_counter()
+        for payload in payloads:
+            client.post("/whatsapp/webhook", json=payload)
+        while handled["messages"] < expected:
+            time.sleep(0.001)
+        elapsed = time.perf_counter() - started
+
+    return {
+        "requests": requests,
+        "messages": handled["messages"],
+        "messages_per_request": users * per_user,
+        "elapsed_s": round(elapsed, 3),
+        "requests_per_s": round(requests / elapsed, 1),
+        "messages_per_s": round(handled["messages"] / elapsed, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--users", type=int, default=5)
+    parser.add_argument("--per-user", type=int, default=4)
+    parser.add_argument("--shards", type=int, default=8)
+    args = parser.parse_args()
+
+    for users, per_user in [(1, 1), (args.users, 1), (args.users, args.per_user)]:
+        result = run(args.requests, users, per_user, args.shards)
+        print(
+            f"{users:>3} users x {per_user:>2} msgs/payload: "
+            f"{result['messages_per_s']:>9} msg/s  "
+            f"({result['requests_per_s']} req/s, {result['messages']} messages in {result['elapsed_s']}s)"
+        )
+
+
+if __name__ == "__main__":
+    main()
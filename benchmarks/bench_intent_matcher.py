@@ -0,0 +1,88 @@
+# benchmarks/bench_intent_matcher.py
+"""
+detect_intent: the old per-keyword re.search loop vs the single compiled
+KeywordMatcher, for app.intent_engine and app.brain.intent_detector.
+
+Builds a message corpus from the sample texts plus every keyword in
+filler sentences, checks both versions return the same intent for every
+message, and reports per-call latency.
+
+    python -m benchmarks.bench_intent_matcher --messages 20000
+"""
+
+import argparse
+import random
+import re
+import time
+
+from app.brain import intent_detector
+from app import intent_engine
+from benchmarks.payloads import SAMPLE_TEXTS
+
+FILLERS = [
+    "{kw}", "sir {kw} batao", "what about the {kw} please", "{kw}?? and also the rest",
+    "mujhe {kw} ke baare me jaanna hai", "ok thanks, {kw} later", "hmm {kw}",
+]
+NOISE = [
+    "ok", "thanks", "will check", "hiring?", "pricey", "emi kitna hoga", "location visit kab",
+    "price high hai", "home loan milega kya", "ready to buy if discount", "what is the carpet area",
+]
+
+
+def legacy(table: dict, default: str):
+    """
+    The loop both detectors used before.
+    """
+    def detect(text: str) -> str:
+        text = text.lower().strip()
+        for intent, keywords in table.items():
+            for kw in keywords:
+                if re.search(rf"\b{re.escape(kw)}\b", text):
+                    return intent
+        return default
+    return detect
+
+
+def corpus(size: int, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    keywords = [kw for table in (intent_engine.INTENT_KEYWORDS, intent_detector.INTENTS) for kws in table.values() for kw in kws]
+    base = SAMPLE_TEXTS + NOISE + [f.format(kw=kw) for kw in keywords for f in FILLERS]
+    out = []
+    for _ in range(size):
+        text = rng.choice(base)
+        if rng.random() < 0.3:
+            text = f"{text} {rng.choice(base)}"
+        out.append(text)
+    return out
+
+
+def per_call_us(fn, messages: list) -> float:
+    started = time.perf_counter()
+    for text in messages:
+        fn(text)
+    return (time.perf_counter() - started) / len(messages) * 1_000_000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=20000)
+    args = parser.parse_args()
+    messages = corpus(args.messages)
+
+    cases = [
+        ("app.intent_engine", legacy(intent_engine.INTENT_KEYWORDS, "vague"), intent_engine.detect_intent),
+        ("app.brain.intent_detector", legacy(intent_detector.INTENTS, "UNKNOWN"), intent_detector.detect_intent),
+    ]
+    print(f"{len(messages)} messages")
+    for name, old, new in cases:
+        mismatches = sum(1 for text in messages if old(text) != new(text))
+        old_us = per_call_us(old, messages)
+        new_us = per_call_us(new, messages)
+        print(
+            f"{name:<27} legacy {old_us:6.1f} µs/call   compiled {new_us:5.1f} µs/call   "
+            f"x{old_us / new_us:4.1f}   mismatches {mismatches}"
+        )
+
+
+if __name__ == "__main__":
+    main()
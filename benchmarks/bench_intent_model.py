@@ -0,0 +1,76 @@
+# benchmarks/bench_intent_model.py
+"""
+On-box intent model (app.intent_model) vs the keyword engine
+(app.intent_engine.detect_intent) on the held-out half of the seed
+corpus (scripts/intent_corpus.py: unseen wordings, typos).
+
+Reports accuracy, per-call latency (p50 / p99), and for keyword misses
+(detect_intent -> "vague" on a non-vague message, which used to go to
+GPT) how many the model answers confidently and how often it is right.
+
+    python -m benchmarks.bench_intent_model
+    python -m benchmarks.bench_intent_model --model data/intent_model.npz
+"""
+
+import argparse
+import os
+import statistics
+import time
+
+from app.intent_engine import detect_intent
+from app.intent_model import INTENT_MODEL_THRESHOLD, IntentModel
+from scripts.intent_corpus import corpus
+
+
+def latencies_us(fn, texts: list, rounds: int = 5) -> list:
+    out = []
+    for _ in range(rounds):
+        for text in texts:
+            started = time.perf_counter()
+            fn(text)
+            out.append((time.perf_counter() - started) * 1_000_000)
+    return out
+
+
+def pct(values: list, q: float) -> float:
+    return statistics.quantiles(values, n=100)[int(q) - 1]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", help="trained .npz (default: train on the seed corpus here)")
+    parser.add_argument("--threshold", type=float, default=INTENT_MODEL_THRESHOLD)
+    args = parser.parse_args()
+
+    train, held_out = corpus()
+    calib, test = held_out[: len(held_out) // 2], held_out[len(held_out) // 2:]
+    if args.model and os.path.exists(args.model):
+        model = IntentModel.load(args.model)
+    else:
+        started = time.perf_counter()
+        model = IntentModel.train([t for t, _ in train], [label for _, label in train])
+        model.calibrate([t for t, _ in calib], [label for _, label in calib])
+        print(f"trained on {len(train)} messages in {time.perf_counter() - started:.1f}s")
+
+    texts = [t for t, _ in test]
+    keyword_ok = sum(detect_intent(t) == label for t, label in test)
+    model_ok = sum(model.predict(t)[0] == label for t, label in test)
+
+    misses = [(t, label) for t, label in test if detect_intent(t) == "vague" and label != "vague"]
+    answered = [(t, label) for t, label in misses if model.predict(t)[1] >= args.threshold]
+    answered_ok = sum(model.predict(t)[0] == label for t, label in answered)
+
+    kw = latencies_us(detect_intent, texts)
+    ml = latencies_us(model.predict, texts)
+
+    print(f"{len(test)} held-out messages")
+    print(f"keyword engine  accuracy {keyword_ok / len(test):6.1%}  p50 {pct(kw, 50):6.1f} µs  p99 {pct(kw, 99):6.1f} µs")
+    print(f"intent model    accuracy {model_ok / len(test):6.1%}  p50 {pct(ml, 50):6.1f} µs  p99 {pct(ml, 99):6.1f} µs")
+    print(
+        f"keyword misses  {len(misses)}: model confident (p >= {args.threshold}) on {len(answered)}, "
+        f"correct {answered_ok} ({answered_ok / max(1, len(answered)):.1%})"
+    )
+
+
+if __name__ == "__main__":
+    main()
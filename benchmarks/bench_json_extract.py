@@ -0,0 +1,105 @@
+# benchmarks/bench_json_extract.py
+"""
+call_gpt_json output parsing: the old greedy (\{[\s\S]*\}) regex vs the
+balanced-brace scanner in app.ai_engine, on large model outputs.
+
+Reports microseconds per extraction for each output shape, and over a
+mixed corpus of realistic replies how many the old extractor failed on
+(each failure was a full re-completion) that the scanner recovers.
+
+    python -m benchmarks.bench_json_extract --size 200000 --repeat 50
+"""
+
+import argparse
+import json
+import re
+import time
+
+from app.ai_engine import _extract_json_from_text
+
+
+def legacy_extract(text: str):
+    """
+    The extractor call_gpt_json used before.
+    """
+    m = re.search(r"(\{[\s\S]*\})", text)
+    candidate = m.group(1) if m else text.strip()
+    try:
+        return json.loads(candidate)
+    except Exception:
+        try:
+            return json.loads(candidate.replace("'", '"'))
+        except Exception:
+            return None
+
+
+def make_object(size: int) -> str:
+    items = []
+    i = 0
+    while sum(len(x) for x in items) < size:
+        items.append(json.dumps({
+            "week": i,
+            "channel": "whatsapp",
+            "action": f"Follow up {{lead}} #{i} with \"site visit\" offer",
+            "notes": ["price", "loan", "possession"],
+        }))
+        i += 1
+    return '{"plan": [' + ", ".join(items) + '], "summary": "ok"}'
+
+
+def shapes(size: int) -> dict:
+    obj = make_object(size)
+    prose = "Sure! Here is the strategy you asked for. " * (size // 400 + 1)
+    return {
+        "clean json": obj,
+        "fenced + prose": f"{prose}\n```json\n{obj}\n```\nLet me know if {{anything}} needs changes.",
+        "trailing braces": f"{obj}\n\nNote: replace {{name}} with the buyer name.",
+        "truncated": obj[: len(obj) // 2],
+        "no json": prose,
+    }
+
+
+CORPUS = [
+    '{"strategy": "nurture", "steps": 3}',
+    '```json\n{"strategy": "visit", "steps": 2}\n```',
+    'Here you go: {"strategy": "call", "steps": 1}',
+    '{"strategy": "nurture"}\nUse {first_name} in the greeting.',
+    'Draft: {placeholder}\nFinal: {"strategy": "visit"}',
+    "{'strategy': 'call', 'steps': 1}",
+    '{"a": 1}\n{"b": 2}',
+    'I could not build a plan.',
+]
+
+
+def time_it(fn, text: str, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn(text)
+    return (time.perf_counter() - started) / repeat * 1_000_000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=200_000, help="approx. JSON size in bytes")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"{'output':<18} {'bytes':>8} {'legacy µs':>11} {'scanner µs':>11}  legacy ok  scanner ok")
+    for name, text in shapes(args.size).items():
+        old = time_it(legacy_extract, text, args.repeat)
+        new = time_it(_extract_json_from_text, text, args.repeat)
+        print(
+            f"{name:<18} {len(text):>8} {old:>11.0f} {new:>11.0f}  "
+            f"{str(isinstance(legacy_extract(text), dict)):>9}  {str(isinstance(_extract_json_from_text(text), dict)):>10}"
+        )
+
+    legacy_failed = sum(1 for t in CORPUS if not isinstance(legacy_extract(t), dict))
+    scanner_failed = sum(1 for t in CORPUS if not isinstance(_extract_json_from_text(t), dict))
+    print(
+        f"\ncorpus of {len(CORPUS)} replies: legacy re-completions {legacy_failed}, "
+        f"scanner re-completions {scanner_failed}, retries avoided {legacy_failed - scanner_failed}"
+    )
+
+
+if __name__ == "__main__":
+    main()
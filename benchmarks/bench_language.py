@@ -0,0 +1,153 @@
+# benchmarks/bench_language.py
+"""
+Language detection: the old substring-count detector (call_ai /
+flow.detect_language_from_text) vs app.language, on a hand-labelled
+sample of buyer messages.
+
+Reports per-message accuracy and latency (cold and with the LRU cache
+warm), and per-turn accuracy over labelled conversations, where
+app.language.detect_language smooths across turns.
+
+    python -m benchmarks.bench_language --repeat 200
+"""
+
+import argparse
+import time
+
+from app import language
+
+# (message, label). Romanized Hindi with English nouns is Hinglish;
+# mostly-Hindi romanized text or Devanagari is Hindi.
+LABELLED = [
+    ("hi", "english"),
+    ("hello, is this project still available?", "english"),
+    ("what is the price of a 2bhk", "english"),
+    ("where exactly is the project located", "english"),
+    ("is it rera approved", "english"),
+    ("can you send me the brochure please", "english"),
+    ("I want to book a site visit this weekend", "english"),
+    ("what about the loan and emi options", "english"),
+    ("when is the possession date", "english"),
+    ("is there parking and a lift", "english"),
+    ("my budget is around 50 lakh", "english"),
+    ("do you have any flat near boring road", "english"),
+    ("tell me more about the amenities", "english"),
+    ("the area looks good, what is the booking amount", "english"),
+    ("are there schools and hospitals nearby", "english"),
+    ("I will visit on sunday morning", "english"),
+    ("can I get a home loan for this flat", "english"),
+    ("send the floor plan for 3bhk", "english"),
+    ("is the side road wide enough for cars", "english"),
+    ("thanks, I will think about it", "english"),
+    ("price kya hai", "hinglish"),
+    ("2bhk ka size kitna hai", "hinglish"),
+    ("emi kitna banega", "hinglish"),
+    ("parking hai kya", "hinglish"),
+    ("site visit kal kar sakte hai", "hinglish"),
+    ("possession kab tak milega", "hinglish"),
+    ("loan milega kya is flat pe", "hinglish"),
+    ("location bhejo please", "hinglish"),
+    ("budget 50 lakh hai, koi option hai?", "hinglish"),
+    ("brochure bhej dijiye", "hinglish"),
+    ("amenities kya kya hai", "hinglish"),
+    ("weekend pe visit possible hai?", "hinglish"),
+    ("rera approved hai na?", "hinglish"),
+    ("3bhk ka rate batao", "hinglish"),
+    ("booking amount kitna hai", "hinglish"),
+    ("thoda discount milega?", "hinglish"),
+    ("mujhe kal site dekhna hai, aap time batao", "hindi"),
+    ("aap mujhe ghar ke baare mein bataiye, kitna paisa lagega", "hindi"),
+    ("hum log abhi ghar dekh rahe hai, kya aap bata sakte hai", "hindi"),
+    ("mera budget thoda kam hai, kya koi sasta ghar milega", "hindi"),
+    ("kya aap kal aa sakte hai, hum wahan milenge", "hindi"),
+    ("yeh project kahan hai aur kab tak ban jayega", "hindi"),
+    ("क्या यह प्रोजेक्ट तैयार है", "hindi"),
+    ("कीमत कितनी है", "hindi"),
+    ("मुझे साइट विजिट करनी है", "hindi"),
+    ("bhai zameen ka daam kya hai aur kab tak milega", "hindi"),
+]
+
+# Conversations: every turn labelled with the language the user is
+# writing in. Short neutral turns ("ok", "2bhk?") keep the user's language.
+CONVERSATIONS = [
+    [("hi", "english"), ("what is the price of 2bhk", "english"), ("ok", "english"),
+     ("and the side facing flat?", "english"), ("area?", "english"), ("booking kab?", "english")],
+    [("price kya hai", "hinglish"), ("ok", "hinglish"), ("2bhk?", "hinglish"),
+     ("loan milega kya", "hinglish"), ("what about parking", "hinglish"), ("thik hai", "hinglish")],
+    [("aap mujhe ghar ke baare mein bataiye", "hindi"), ("kitna paisa lagega", "hindi"),
+     ("ok", "hindi"), ("kal aa sakte hai kya", "hindi"), ("visit?", "hindi")],
+    [("is it rera approved", "english"), ("possession date?", "english"), ("ok thanks", "english"),
+     ("kal visit", "english"), ("sure, sunday morning works for me", "english")],
+]
+
+
+def legacy_detect(text: str) -> str:
+    """
+    The detector call_ai and flow.py used before.
+    """
+    hindi_words = [
+        "kya", "kab", "kaise", "ghar", "zameen", "flat",
+        "booking", "visit", "kal", "aaj", "weekend",
+        "paisa", "loan", "possession", "dekho", "dekhna",
+        "side", "wali", "area", "ke", "ki"
+    ]
+    t = text.lower()
+    hits = sum(1 for w in hindi_words if w in t)
+    if hits >= 4:
+        return "hindi"
+    if 2 <= hits < 4:
+        return "hinglish"
+    return "english"
+
+
+def new_detect(text: str) -> str:
+    return language.message_language(text) or "english"
+
+
+def accuracy(fn) -> float:
+    return sum(1 for text, label in LABELLED if fn(text) == label) / len(LABELLED)
+
+
+def conversation_accuracy(smoothed: bool) -> float:
+    right = total = 0
+    for conversation in CONVERSATIONS:
+        state = {"language": None, "language_score": None}
+        for text, label in conversation:
+            lang = language.detect_language(state, text) if smoothed else legacy_detect(text)
+            right += lang == label
+            total += 1
+    return right / total
+
+
+def per_call_us(fn, repeat: int) -> float:
+    texts = [text for text, _ in LABELLED]
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for text in texts:
+            fn(text)
+    return (time.perf_counter() - started) / (repeat * len(texts)) * 1_000_000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{len(LABELLED)} labelled messages, {sum(map(len, CONVERSATIONS))} conversation turns")
+    print(f"legacy substring   accuracy {accuracy(legacy_detect):6.1%}  {per_call_us(legacy_detect, args.repeat):5.2f} µs/message")
+
+    language._evidence.cache_clear()
+    cold = per_call_us(lambda t: (language._evidence.cache_clear(), new_detect(t)), args.repeat)
+    warm = per_call_us(new_detect, args.repeat)
+    print(
+        f"token lexicon      accuracy {accuracy(new_detect):6.1%}  {cold:5.2f} µs/message cold, "
+        f"{warm:5.2f} cached ({language._evidence.cache_info().hits} hits)"
+    )
+    print(
+        f"per-turn, conversations: legacy {conversation_accuracy(False):6.1%}   "
+        f"smoothed {conversation_accuracy(True):6.1%}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+# benchmarks/bench_openai_client.py
+"""
+OpenAI client reuse: a new OpenAI() per completion (what
+get_openai_client() used to do) vs the process-wide async client from
+app.ai_engine, against the local OpenAI stub.
+
+The stub runs over TLS with a throwaway self-signed certificate so the
+per-client handshakes show up in the latency numbers.
+
+    python -m benchmarks.bench_openai_client --calls 200 --concurrency 20
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+from openai import DefaultAsyncHttpxClient, DefaultHttpxClient, OpenAI
+
+from app.metrics import Histogram
+from benchmarks.loadtest.stubs import StubConfig, StubServer, create_stub_app, self_signed_cert
+
+MESSAGES = [
+    {"role": "system", "content": "You are Pragiti, a real estate assistant."},
+    {"role": "user", "content": "What is the price of a 2BHK?"},
+]
+
+
+def connections(stub_url: str) -> int:
+    return httpx.get(f"{stub_url}/_stats", verify=False).json()["connections"]
+
+
+def run_per_call(stub_url: str, calls: int, concurrency: int) -> dict:
+    hist = Histogram(size=calls)
+    before = connections(stub_url)
+
+    def one(_):
+        started = time.perf_counter()
+        client = OpenAI(api_key="bench", base_url=f"{stub_url}/v1", http_client=DefaultHttpxClient(verify=False))
+        client.chat.completions.create(model="gpt-4o-mini", messages=MESSAGES, max_tokens=75)
+        client.close()
+        hist.observe((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(calls)))
+    elapsed = time.perf_counter() - started
+    return {"elapsed_s": elapsed, "latency": hist.snapshot(), "connections": connections(stub_url) - before}
+
+
+def run_shared(stub_url: str, calls: int, concurrency: int) -> dict:
+    os.environ["OPENAI_API_KEY"] = "bench"
+    os.environ["OPENAI_BASE_URL"] = f"{stub_url}/v1"
+    from app import ai_engine
+
+    ai_engine.OPENAI_POOL_SIZE = concurrency
+    # same pool settings as production, but trust the self-signed stub cert
+    ai_engine.DefaultAsyncHttpxClient = lambda **kwargs: DefaultAsyncHttpxClient(verify=False, **kwargs)
+
+    hist = Histogram(size=calls)
+    before = connections(stub_url)
+
+    async def main():
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one(_):
+            async with semaphore:
+                started = time.perf_counter()
+                await ai_engine._chat_completion(model="gpt-4o-mini", messages=MESSAGES, max_tokens=75)
+                hist.observe((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(calls)))
+        elapsed = time.perf_counter() - started
+        await ai_engine.close_openai_clients()
+        return elapsed
+
+    elapsed = asyncio.run(main())
+    return {"elapsed_s": elapsed, "latency": hist.snapshot(), "connections": connections(stub_url) - before}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--openai-latency-ms", type=float, default=50)
+    parser.add_argument("--port", type=int, default=9102)
+    args = parser.parse_args()
+
+    config = StubConfig(openai_latency_ms=args.openai_latency_ms, openai_jitter_ms=args.openai_latency_ms / 4)
+    certfile, keyfile = self_signed_cert(tempfile.mkdtemp())
+    stub = StubServer(create_stub_app(config), port=args.port, ssl_certfile=certfile, ssl_keyfile=keyfile).start()
+    try:
+        for name, fn in (("client per call", run_per_call), ("shared async", run_shared)):
+            r = fn(stub.url, args.calls, args.concurrency)
+            lat = r["latency"]
+            print(
+                f"{name:<16} {args.calls / r['elapsed_s']:>8.1f} calls/s  "
+                f"p50 {lat['p50']:>7} ms  p95 {lat['p95']:>7} ms  "
+                f"connections opened: {r['connections']}"
+            )
+    finally:
+        stub.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# benchmarks/bench_outbox.py
+"""
+Outbox write throughput: one transaction per row vs the group-committed
+writer thread, with several producer threads appending at once (like
+the pipeline shards do).
+
+    python -m benchmarks.bench_outbox --rows 5000 --threads 8
+"""
+
+import argparse
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from app.app.whatsapp.outbox import Outbox, _SCHEMA
+
+
+def run_per_row(path: str, rows: int, threads: int) -> float:
+    conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(_SCHEMA)
+    lock = threading.Lock()
+
+    def producer(n):
+        for i in range(n):
+            now = time.time()
+            with lock:
+                conn.execute("BEGIN")
+                conn.execute(
+                    "INSERT INTO outbox (to_number, body, phone_number_id, status, created_at, updated_at) "
+                    "VALUES (?, ?, ?, 'pending', ?, ?)",
+                    (f"91900{i:07d}", "hello", "bench", now, now),
+                )
+                conn.execute("COMMIT")
+
+    started = time.perf_counter()
+    workers = [threading.Thread(target=producer, args=(rows // threads,)) for _ in range(threads)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - started
+    conn.close()
+    return elapsed
+
+
+def run_group(path: str, rows: int, threads: int) -> float:
+    outbox = Outbox(path=path)
+    outbox.open()
+
+    def producer(n):
+        # wait for the commit like the scheduler does before sending
+        futures = [outbox.append(f"91900{i:07d}", "hello", "bench") for i in range(n)]
+        for f in futures:
+            f.result()
+
+    started = time.perf_counter()
+    workers = [threading.Thread(target=producer, args=(rows // threads,)) for _ in range(threads)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - started
+    outbox.close()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    for name, fn in (("commit per row", run_per_row), ("group commit", run_group)):
+        elapsed = fn(os.path.join(directory, f"{name.replace(' ', '_')}.sqlite3"), args.rows, args.threads)
+        print(f"{name:<15} {args.rows / elapsed:>10.0f} rows/s  ({elapsed:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
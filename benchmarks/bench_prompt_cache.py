@@ -0,0 +1,104 @@
+# benchmarks/bench_prompt_cache.py
+"""
+Provider prompt caching: the old call_ai system prompt (project fields
+interpolated at the top) vs app.prompts (static rules first, project and
+language last), sent for several projects / languages / questions to the
+local OpenAI stub, which caches by exact prefix like the real API.
+
+Reports the share of prompt tokens served from cache and the resulting
+input-cost reduction. The stub's minimum cacheable prefix defaults to 0
+here so the layout effect is visible on its own; pass
+--cache-min-tokens 1024 for OpenAI's real threshold.
+
+    python -m benchmarks.bench_prompt_cache --projects 30 --questions 1
+"""
+
+import argparse
+import asyncio
+import os
+
+from benchmarks.loadtest.stubs import StubConfig, StubServer, create_stub_app
+from benchmarks.payloads import SAMPLE_TEXTS
+
+LANGUAGES = ("english", "hindi", "hinglish")
+
+
+def make_project(i: int) -> dict:
+    return {
+        "name": f"Project {i} Residency",
+        "location": f"Sector {10 + i}, Patna",
+        "price_range": f"{40 + i * 5}L onwards",
+        "unit_types": "2BHK & 3BHK",
+        "usp": "clubhouse, parking, gated security",
+        "status": "ready to move",
+    }
+
+
+def legacy_prompt(project: dict, lang: str) -> str:
+    """
+    Layout of the inline f-string call_ai used to build.
+    """
+    from app.prompts import LANG_HINTS, NORMAL_RULES, _project_block
+
+    rules = NORMAL_RULES.split("\n", 2)[2]  # drop the intro lines, they go first below
+    return (
+        f"\nYou are PRAGITI — a WhatsApp-style professional advisor for one builder/project only.\n\n"
+        f"{_project_block(project)}\n{rules}\n{LANG_HINTS[lang]}\n"
+    )
+
+
+async def run(layout: str, stub_url: str, projects: int, questions: int) -> dict:
+    from app import ai_engine
+    from app.metrics import metrics
+    from app.prompts import build_system_prompt
+
+    metrics.reset()
+    for i in range(projects):
+        project = make_project(i)
+        for lang in LANGUAGES:
+            system = build_system_prompt(project, lang) if layout == "static prefix" else legacy_prompt(project, lang)
+            for q in range(questions):
+                await ai_engine._chat_completion(
+                    model="gpt-4o-mini",
+                    messages=[
+                        {"role": "system", "content": system},
+                        {"role": "user", "content": SAMPLE_TEXTS[q % len(SAMPLE_TEXTS)]},
+                    ],
+                    max_tokens=75,
+                )
+    await ai_engine.close_openai_clients()
+    gauges = metrics.snapshot()["gauges"]
+    return {
+        "prompt_tokens": metrics.counter("ai.prompt_tokens"),
+        "cached_tokens": metrics.counter("ai.cached_prompt_tokens"),
+        "hit_ratio": gauges["ai.prompt_cache.hit_ratio"],
+        "cost_reduction": gauges["ai.prompt_cache.input_cost_reduction"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--projects", type=int, default=30)
+    parser.add_argument("--questions", type=int, default=1)
+    parser.add_argument("--cache-min-tokens", type=int, default=0)
+    parser.add_argument("--port", type=int, default=9103)
+    args = parser.parse_args()
+
+    os.environ["OPENAI_API_KEY"] = "bench"
+    for offset, layout in enumerate(("project first", "static prefix")):
+        # fresh stub per layout: its prefix cache starts empty
+        config = StubConfig(openai_latency_ms=0, openai_jitter_ms=0, cache_min_tokens=args.cache_min_tokens)
+        stub = StubServer(create_stub_app(config), port=args.port + offset).start()
+        os.environ["OPENAI_BASE_URL"] = f"{stub.url}/v1"
+        try:
+            r = asyncio.run(run(layout, stub.url, args.projects, args.questions))
+        finally:
+            stub.stop()
+        print(
+            f"{layout:<14} prompt tokens {r['prompt_tokens']:>8}  cached {r['cached_tokens']:>8}  "
+            f"hit ratio {r['hit_ratio']:.1%}  input cost -{r['cost_reduction']:.1%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
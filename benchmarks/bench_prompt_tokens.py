@@ -0,0 +1,107 @@
+# benchmarks/bench_prompt_tokens.py
+"""
+Prompt size per call_ai call: last 6 raw turns (old behavior) vs rolling
+summary + slots + last few raw turns (app.summarizer), replaying a
+conversation corpus against the local OpenAI stub.
+
+Also reports how often a fact stated in the FIRST turn (the budget) is
+still in the prompt on the last turn.
+
+    python -m benchmarks.bench_prompt_tokens --conversations 50 --turns 12
+    python -m benchmarks.bench_prompt_tokens --corpus convs.ndjson
+
+Corpus lines: {"turns": ["budget 50 lakh hai", "price kya hai", ...]}
+(the first turn should state the budget for the retention column).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+
+from benchmarks.loadtest.stubs import StubConfig, StubServer, create_stub_app
+from benchmarks.payloads import SAMPLE_TEXTS
+
+OPENERS = [
+    "my budget is 50 lakh, need possession in 6 months",
+    "budget around 1.2 cr, looking for investment",
+    "hum 45 lakh tak dekh rahe hai, family ke liye",
+    "budget 60L, home loan lena hai",
+]
+
+
+def generate_corpus(conversations: int, turns: int, seed: int = 11) -> list:
+    rng = random.Random(seed)
+    return [
+        [rng.choice(OPENERS)] + [rng.choice(SAMPLE_TEXTS[1:]) for _ in range(turns - 1)]
+        for _ in range(conversations)
+    ]
+
+
+def load_corpus(path: str) -> list:
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line)["turns"] for line in f if line.strip()]
+
+
+async def replay(corpus: list, summarize: bool) -> dict:
+    from app import ai_engine, reply_cache, state as state_store, summarizer
+    from app.app.whatsapp.pipeline import DEFAULT_PROJECT_CONTEXT
+    from app.metrics import metrics
+    from app.prompts import build_system_prompt
+
+    summarizer.SUMMARY_ENABLED = summarize
+    reply_cache.REPLY_CACHE_ENABLED = False  # every turn must reach the model
+    ai_engine.AI_REPLY_BUDGET_MS = 60000
+    ai_engine.AI_STREAMING = False  # same tokens, faster replay
+    state_store.state_store.clear()
+    metrics.reset()
+
+    retained = 0
+    for i, turns in enumerate(corpus):
+        phone = f"91770{i:07d}"
+        s = state_store.get_state(phone)
+        s.update(step="decision", ai_mode=True, language="english", project_context=dict(DEFAULT_PROJECT_CONTEXT))
+        for text in turns:
+            await ai_engine.call_ai(phone, text)
+
+        s = state_store.get_state(phone)
+        budget = summarizer.extract_slots(turns[0]).get("budget", "")
+        msgs = ai_engine._prompt_messages(build_system_prompt(s["project_context"], "english"), s, "ok")
+        if budget and any(budget.split()[0] in m["content"] for m in msgs[1:]):
+            retained += 1
+
+    await ai_engine.close_openai_clients()
+    calls = metrics.counter("ai.openai_calls") or 1
+    return {
+        "calls": calls,
+        "avg_prompt_tokens": metrics.counter("ai.prompt_tokens") / calls,
+        "retained": retained / len(corpus),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--conversations", type=int, default=50)
+    parser.add_argument("--turns", type=int, default=12)
+    parser.add_argument("--corpus", help="NDJSON corpus instead of generated conversations")
+    parser.add_argument("--port", type=int, default=9104)
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus) if args.corpus else generate_corpus(args.conversations, args.turns)
+    stub = StubServer(create_stub_app(StubConfig(openai_latency_ms=0, openai_jitter_ms=0)), port=args.port).start()
+    os.environ["OPENAI_API_KEY"] = "bench"
+    os.environ["OPENAI_BASE_URL"] = f"{stub.url}/v1"
+    try:
+        for name, summarize in (("last 6 raw turns", False), ("summary + slots", True)):
+            r = asyncio.run(replay(corpus, summarize))
+            print(
+                f"{name:<17} calls {r['calls']:>5}  avg prompt tokens {r['avg_prompt_tokens']:>7.1f}  "
+                f"first-turn budget still in prompt {r['retained']:.0%}"
+            )
+    finally:
+        stub.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+# benchmarks/bench_sender.py
+"""
+WhatsApp send: legacy `requests.post` per message vs the pooled,
+keep-alive async sender, against the local Graph stub.
+
+Reports send latency and how many TCP connections the stub saw
+(connection reuse). The stub runs over TLS with a throwaway self-signed
+certificate so handshakes are part of the measurement.
+
+    python -m benchmarks.bench_sender --messages 300 --concurrency 20
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import tempfile
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import requests
+
+from app.metrics import Histogram
+from benchmarks.loadtest.stubs import StubConfig, StubServer, create_stub_app, self_signed_cert
+
+
+def legacy_send(url: str, to: str, text: str) -> int:
+    """
+    What send_whatsapp_message did before: a fresh requests.post per message.
+    """
+    payload = {"messaging_product": "whatsapp", "to": to, "type": "text", "text": {"body": text}}
+    headers = {"Authorization": "Bearer bench", "Content-Type": "application/json"}
+    return requests.post(url, headers=headers, json=payload, timeout=10, verify=False).status_code
+
+
+def connections(stub_url: str) -> int:
+    return httpx.get(f"{stub_url}/_stats", verify=False).json()["connections"]
+
+
+def run_legacy(stub_url: str, messages: int, concurrency: int) -> dict:
+    url = f"{stub_url}/v19.0/bench/messages"
+    hist = Histogram(size=messages)
+    before = connections(stub_url)
+
+    def one(i):
+        started = time.perf_counter()
+        legacy_send(url, f"91900{i:07d}", "hello")
+        hist.observe((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(messages)))
+    elapsed = time.perf_counter() - started
+    return {"elapsed_s": elapsed, "latency": hist.snapshot(), "connections": connections(stub_url) - before}
+
+
+def run_pooled(stub_url: str, messages: int, concurrency: int) -> dict:
+    # Import late so module-level config picks up the stub env
+    from app.app.whatsapp import sender
+
+    sender.GRAPH_API_URL = stub_url
+    sender.WHATSAPP_ACCESS_TOKEN = "bench"
+    sender.PHONE_NUMBER_ID = "bench"
+    sender.SEND_POOL_SIZE = concurrency
+
+    # same pool settings as production, but trust the self-signed stub cert
+    build_client = sender._build_client
+    def insecure_client():
+        client = build_client()
+        return httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency),
+            timeout=client.timeout,
+            verify=False,
+        )
+    sender._build_client = insecure_client
+
+    hist = Histogram(size=messages)
+    before = connections(stub_url)
+
+    async def main():
+        await sender.start_sender()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one(i):
+            async with semaphore:
+                started = time.perf_counter()
+                await sender.send_whatsapp_message_async(f"91900{i:07d}", "hello")
+                hist.observe((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(messages)))
+        elapsed = time.perf_counter() - started
+        await sender.stop_sender()
+        return elapsed
+
+    # the sender logs every send; keep the benchmark output readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        elapsed = asyncio.run(main())
+    return {"elapsed_s": elapsed, "latency": hist.snapshot(), "connections": connections(stub_url) - before}
+
+
+def main():
+    warnings.filterwarnings("ignore", message="Unverified HTTPS request")
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--graph-latency-ms", type=float, default=20)
+    parser.add_argument("--port", type=int, default=9101)
+    parser.add_argument("--no-tls", action="store_true", help="plain HTTP stub (hides handshake cost)")
+    args = parser.parse_args()
+
+    config = StubConfig(graph_latency_ms=args.graph_latency_ms, graph_jitter_ms=args.graph_latency_ms / 4)
+    certfile = keyfile = None
+    if not args.no_tls:
+        certfile, keyfile = self_signed_cert(tempfile.mkdtemp())
+    stub = StubServer(create_stub_app(config), port=args.port, ssl_certfile=certfile, ssl_keyfile=keyfile).start()
+    try:
+        for name, fn in (("requests.post", run_legacy), ("pooled async", run_pooled)):
+            r = fn(stub.url, args.messages, args.concurrency)
+            lat = r["latency"]
+            print(
+                f"{name:<14} {args.messages / r['elapsed_s']:>8.1f} msg/s  "
+                f"p50 {lat['p50']:>7} ms  p95 {lat['p95']:>7} ms  "
+                f"connections opened: {r['connections']}"
+            )
+    finally:
+        stub.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# benchmarks/bench_signals.py
+"""
+Per-message keyword work on the WhatsApp hot path: the separate scans
+pipeline -> flow.route_message -> call_ai used to do (detect_intent,
+handoff keywords, five flow lists, six call_ai lists, each on its own
+lowercased copy) vs one app.signals.classify call that all of them now
+share.
+
+Checks that every signal agrees with the old inline list for every
+message, then reports per-message latency.
+
+    python -m benchmarks.bench_signals --messages 20000
+"""
+
+import argparse
+import time
+
+from app.brain import intent_detector
+from app.brain.scoring_rules import NEGATIVE_SIGNALS
+from app.intent_engine import detect_intent
+from app.signals import NEGATIVE, SIGNAL_KEYWORDS, classify
+from benchmarks.bench_intent_matcher import corpus
+
+
+def legacy_scans(text: str) -> dict:
+    """
+    What the call sites computed before, each from its own .lower().
+    """
+    out = {"intent": detect_intent(text), "brain_intent": intent_detector.detect_intent(text)}
+    for name, words in SIGNAL_KEYWORDS.items():
+        t = text.lower()
+        out[name] = any(w in t for w in words)
+    t = text.lower()
+    out[NEGATIVE] = sum(p for phrase, p in NEGATIVE_SIGNALS.items() if phrase in t)
+    return out
+
+
+def unified(text: str) -> dict:
+    signals = classify(text)
+    out = {"intent": signals.intent, "brain_intent": signals.brain_intent}
+    for name in SIGNAL_KEYWORDS:
+        out[name] = signals.has(name)
+    out[NEGATIVE] = signals.weight(NEGATIVE)
+    return out
+
+
+def per_call_us(fn, messages: list, rounds: int = 5) -> float:
+    best = float("inf")
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for text in messages:
+            fn(text)
+        best = min(best, time.perf_counter() - started)
+    return best / len(messages) * 1_000_000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=20000)
+    args = parser.parse_args()
+    messages = corpus(args.messages) + [
+        "not interested, just checking", "no need, income is low", "book visit tomorrow morning",
+        "is it rera approved? any project in kankarbagh", "who are you, real name?",
+    ]
+
+    mismatches = {}
+    for text in messages:
+        old, new = legacy_scans(text), unified(text)
+        for key in old:
+            if old[key] != new[key]:
+                mismatches[key] = mismatches.get(key, 0) + 1
+
+    old_us = per_call_us(legacy_scans, messages)
+    new_us = per_call_us(unified, messages)
+    print(f"{len(messages)} messages, {len(SIGNAL_KEYWORDS) + 3} signals + intents per message")
+    print(f"separate scans  {old_us:6.1f} µs/message")
+    print(f"classify once   {new_us:6.1f} µs/message  (x{old_us / new_us:.1f})")
+    print(f"mismatches      {mismatches or 0}")
+
+
+if __name__ == "__main__":
+    main()
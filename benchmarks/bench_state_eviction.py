@@ -0,0 +1,117 @@
+# benchmarks/bench_state_eviction.py
+"""
+Memory-bounded state (app.state_store.StateStore.evict) on campaign
+traffic: a stream of mostly one-off buyers (1 in 10 handed off), then a
+wave of earlier buyers coming back.
+
+Compares the unbounded memory backend with STATE_MAX_RESIDENT set;
+each variant runs in its own process (RSS = growth while serving).
+Rehydration latency is the state.rehydrate_ms histogram.
+
+    python -m benchmarks.bench_state_eviction
+    python -m benchmarks.bench_state_eviction --users 1000000 --max-resident 100000
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def rss_bytes() -> int:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * 4096
+
+
+def child(users: int, returning: int) -> dict:
+    from app.metrics import metrics
+    from app.state import append_history, get_state, mark_handoff, state_store, update_state_with_intent
+
+    def message(phone: str, i: int) -> None:
+        with state_store.session(phone):
+            get_state(phone)
+            update_state_with_intent(phone, "price_query" if i % 2 else "location_query")
+            append_history(phone, "user", f"2bhk price kya hai, budget 50 lakh ({i})")
+            append_history(phone, "bot", "2BHK starts at 48L. Would you like to visit the site?")
+            if i % 10 == 0:
+                mark_handoff(phone)
+
+    phones = [f"91{i:010d}" for i in range(users)]
+    before = rss_bytes()
+    started = time.perf_counter()
+    for i, phone in enumerate(phones):
+        message(phone, i)
+    elapsed = time.perf_counter() - started
+    grown = rss_bytes() - before
+
+    rng = random.Random(3)
+    back = rng.sample(phones[: users // 2], returning)
+    started = time.perf_counter()
+    for i, phone in enumerate(back):
+        message(phone, i + 1)
+    back_elapsed = time.perf_counter() - started
+
+    snap = metrics.snapshot()
+    counters, hist = snap["counters"], snap["histograms"].get("state.rehydrate_ms") or {}
+    correct = sum(get_state(p)["message_count"] == 2 for p in back[:1000]) / min(1000, returning)
+    return {
+        "msgs_per_sec": users / elapsed,
+        "returning_msgs_per_sec": returning / back_elapsed,
+        "rss_mb": grown / 2**20,
+        "resident": len(state_store),
+        "evicted": counters.get("state.evicted", 0),
+        "evicted_handoff": counters.get("state.evicted_handoff", 0),
+        "rehydrated": counters.get("state.rehydrated", 0),
+        "rehydrate_p50_ms": hist.get("p50"),
+        "rehydrate_p99_ms": hist.get("p99"),
+        "returning_correct": correct,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=300_000)
+    parser.add_argument("--returning", type=int, default=20_000)
+    parser.add_argument("--max-resident", type=int, default=50_000)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(child(args.users, args.returning)))
+        return
+
+    tmp = tempfile.mkdtemp(prefix="state-evict-")
+    for name, ceiling in (("unbounded", 0), (f"max {args.max_resident}", args.max_resident)):
+        env = dict(
+            os.environ,
+            STATE_BACKEND="memory",
+            STATE_MAX_RESIDENT=str(ceiling),
+            STATE_IDLE_SECONDS="0",
+            STATE_COLD_PATH=os.path.join(tmp, f"cold-{ceiling}.sqlite3"),
+        )
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_state_eviction", "--child",
+             "--users", str(args.users), "--returning", str(args.returning)],
+            capture_output=True, text=True, check=True, env=env,
+        ).stdout.strip().splitlines()[-1]
+        r = json.loads(out)
+        rehydrate = (
+            f"rehydrate p50 {r['rehydrate_p50_ms']:.3f} ms p99 {r['rehydrate_p99_ms']:.3f} ms"
+            if r["rehydrated"] else "no rehydration"
+        )
+        print(
+            f"{name:<12} {r['msgs_per_sec']:7.0f} msg/s  RSS +{r['rss_mb']:7.1f} MB  resident {r['resident']:>7}  "
+            f"evicted {r['evicted']:>7} (handed off {r['evicted_handoff']:>6})"
+        )
+        print(
+            f"{'':<12} returning {r['returning_msgs_per_sec']:7.0f} msg/s  {rehydrate}  "
+            f"state intact {r['returning_correct']:.0%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+# benchmarks/bench_state_memory.py
+"""
+Memory per user and get_state latency: the old plain-dict state
+(fresh _initial_state() dict merged with the stored one on EVERY
+get_state) vs app.conversation_state.ConversationState (slots, upgraded
+once at load, compact intent / conversation history).
+
+Each variant runs in its own process; memory is the RSS growth while
+building N typical users (project context, language, a few intents,
+raw history + summary after 6 messages).
+
+    python -m benchmarks.bench_state_memory
+    python -m benchmarks.bench_state_memory --users 100000 1000000
+"""
+
+import argparse
+import json
+import random
+import subprocess
+import sys
+import time
+
+from app.conversation_state import _DEFAULTS, _FACTORIES
+
+INTENTS = ["greeting", "price_query", "location_query", "site_visit", "loan_query"]
+PROJECT = {
+    "name": "Greenwood Residency",
+    "location": "Patna — Saguna More",
+    "price_range": "48L onwards",
+    "unit_types": "2BHK & 3BHK",
+    "usp": "clubhouse, parking, gated security, landscaped gardens, lift",
+    "status": "ready to move",
+}
+_FLOW_FIELDS = {"ai_mode", "exclusive_redirect", "credibility_trigger", "visit_pending_confirmation", "last_message_id", "schema_version"}
+
+
+# --------------------------------------------------
+# OLD STATE (as app.state had it before ConversationState)
+# --------------------------------------------------
+_legacy: dict = {}
+
+
+def _legacy_initial_state() -> dict:
+    # same fields / defaults; list-valued ones were plain lists
+    return {
+        field: ([] if field in _FACTORIES else default)
+        for field, default in _DEFAULTS.items()
+        if field not in _FLOW_FIELDS
+    }
+
+
+def legacy_get_state(phone: str) -> dict:
+    if phone not in _legacy:
+        _legacy[phone] = _legacy_initial_state()
+    else:
+        base = _legacy_initial_state()
+        base.update(_legacy[phone])
+        _legacy[phone] = base
+    return _legacy[phone]
+
+
+# --------------------------------------------------
+# WORKLOAD
+# --------------------------------------------------
+def populate(get_state, entry, phone: str, i: int) -> None:
+    state = get_state(phone)
+    state.update(
+        step="decision", ai_mode=True, language="hinglish", tenant_id="1098765",
+        project_context=dict(PROJECT), last_message_id=f"wamid.{i:020d}",
+        conversation_summary={"topics": ["price", "location"], "questions": [f"price kya hai {i}?"]},
+        budget="50 lakh",
+    )
+    for intent in INTENTS[: 2 + i % 3]:
+        state["intent_history"].append(intent)
+    state["score"], state["message_count"] = 15, 6
+    state["conversation_history"] = [entry("user", f"site visit kab {i}?"), entry("bot", "Sure, which day works for you?")]
+
+
+def rss_bytes() -> int:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * 4096
+
+
+def child(variant: str, users: int) -> dict:
+    if variant == "legacy":
+        get_state = legacy_get_state
+        entry = lambda sender, text: {"from": sender, "text": text}  # noqa: E731
+    else:
+        from app.conversation_state import HistoryEntry
+        from app.state import get_state
+        entry = HistoryEntry
+
+    phones = [f"91{i:010d}" for i in range(users)]
+    before = rss_bytes()
+    for i, phone in enumerate(phones):
+        populate(get_state, entry, phone, i)
+    grown = rss_bytes() - before
+
+    rng = random.Random(1)
+    sample = [rng.choice(phones) for _ in range(200_000)]
+    started = time.perf_counter()
+    for phone in sample:
+        get_state(phone)
+    ns = (time.perf_counter() - started) / len(sample) * 1e9
+    return {"bytes_per_user": grown / users, "rss_mb": grown / 2**20, "get_state_ns": ns}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--child", nargs=2, metavar=("VARIANT", "USERS"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(child(args.child[0], int(args.child[1]))))
+        return
+
+    for users in args.users:
+        for variant in ("legacy", "slotted"):
+            out = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_state_memory", "--child", variant, str(users)],
+                capture_output=True, text=True, check=True,
+            ).stdout.strip().splitlines()[-1]
+            r = json.loads(out)
+            print(
+                f"{users:>9} users  {variant:<8} {r['bytes_per_user']:7.0f} B/user  "
+                f"{r['rss_mb']:8.1f} MB  get_state {r['get_state_ns']:6.0f} ns"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+# benchmarks/bench_state_store.py
+"""
+State backends (app.state_store) under N worker processes, the way
+uvicorn --workers N would use them: every message is one
+state_store.session(phone) around get_state + update_state_with_intent
++ two append_history calls.
+
+"handoff" mode: two phases per run, each worker first handles its own
+slice of phones, then the slice of the NEXT worker, so half of every
+buyer's messages land on a process that didn't see the first half.
+"interleaved" mode: every worker handles ALL phones at the same time,
+so sessions of one buyer overlap across processes (--hold-ms inside the
+session stands in for the awaited OpenAI / Graph calls). "users
+correct" is the share of phones whose final message_count equals the
+number of messages sent (memory with >1 worker loses them, which is the
+bug; so would any lost update).
+
+    python -m benchmarks.bench_state_store
+    python -m benchmarks.bench_state_store --backends sqlite redis --workers 1 4 8 --messages 40000
+    python -m benchmarks.bench_state_store --modes interleaved --users 50 --hold-ms 1
+
+redis runs against scripts/resp_server.py unless --redis-url is given.
+"""
+
+import argparse
+import multiprocessing
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def _worker(args) -> tuple:
+    phones, per_phone, offset, hold = args
+    from app.state import append_history, get_state, state_store, update_state_with_intent
+
+    latencies = []
+    counts = {}
+    for i in range(per_phone):
+        for phone in phones:
+            started = time.perf_counter()
+            with state_store.session(phone):
+                get_state(phone)
+                update_state_with_intent(phone, ("price_query", "site_visit")[(i + offset) % 2])
+                append_history(phone, "user", f"message {i} from {phone}")
+                state = get_state(phone)
+                if hold:
+                    time.sleep(hold)
+                append_history(phone, "bot", "reply")
+            latencies.append((time.perf_counter() - started) * 1_000_000)
+            counts[phone] = state["message_count"]
+    return latencies, counts
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_port(port: int, timeout: float = 10) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f"nothing listening on {port}")
+
+
+def run(backend: str, mode: str, workers: int, users: int, messages: int, hold_ms: float) -> dict:
+    os.environ["STATE_BACKEND"] = backend
+    phones = [f"9180{i:08d}" for i in range(users)]
+    slices = [phones[w::workers] for w in range(workers)]
+    hold = hold_ms / 1000
+
+    if mode == "handoff":
+        per_phone = max(1, messages // users // 2)
+        phases = [
+            [(slices[(w + phase) % workers], per_phone, phase, hold) for w in range(workers)]
+            for phase in (0, 1)
+        ]
+        expected = 2 * per_phone
+    else:
+        per_phone = max(1, messages // users // workers)
+        phases = [[(phones, per_phone, w, hold) for w in range(workers)]]
+        expected = workers * per_phone
+
+    ctx = multiprocessing.get_context("spawn")  # children read STATE_* at import
+    with ctx.Pool(workers) as pool:
+        pool.map(_worker, [([], 0, 0, 0)] * workers)  # warm imports, not timed
+        latencies = []
+        final = {}
+        started = time.perf_counter()
+        for jobs in phases:
+            for lat, counts in pool.map(_worker, jobs):
+                latencies.extend(lat)
+                for phone, count in counts.items():
+                    final[phone] = max(final.get(phone, 0), count)
+        elapsed = time.perf_counter() - started
+
+    q = statistics.quantiles(latencies, n=100)
+    return {
+        "msgs_per_sec": len(latencies) / elapsed,
+        "p50": q[49],
+        "p99": q[98],
+        "correct": sum(final.get(p) == expected for p in phones) / len(phones),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backends", nargs="+", default=["memory", "sqlite", "redis"])
+    parser.add_argument("--modes", nargs="+", default=["handoff", "interleaved"], choices=["handoff", "interleaved"])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--hold-ms", type=float, default=0, help="time spent inside each session")
+    parser.add_argument("--redis-url", help="real server (default: start scripts/resp_server.py)")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="state-bench-")
+    standin = None
+    if "redis" in args.backends and not args.redis_url:
+        port = _free_port()
+        standin = subprocess.Popen(
+            [sys.executable, "-m", "scripts.resp_server", "--port", str(port)], stdout=subprocess.DEVNULL
+        )
+        _wait_port(port)
+        args.redis_url = f"redis://127.0.0.1:{port}/0"
+    os.environ["STATE_REDIS_URL"] = args.redis_url or ""
+
+    print(f"{args.users} users, ~{args.messages} messages per run, {os.cpu_count()} CPU(s)")
+    try:
+        for mode in args.modes:
+            for backend in args.backends:
+                for workers in args.workers:
+                    # fresh keyspace per run
+                    os.environ["STATE_SQLITE_PATH"] = os.path.join(tmp, f"state-{mode}-{workers}.sqlite3")
+                    os.environ["STATE_REDIS_PREFIX"] = f"bench-{time.time_ns()}"
+                    r = run(backend, mode, workers, args.users, args.messages, args.hold_ms)
+                    print(
+                        f"{mode:<11} {backend:<7} workers={workers:<2} {r['msgs_per_sec']:9.0f} msg/s  "
+                        f"session p50 {r['p50']:7.1f} µs  p99 {r['p99']:8.1f} µs  users correct {r['correct']:6.1%}"
+                    )
+    finally:
+        if standin is not None:
+            standin.terminate()
+
+
+if __name__ == "__main__":
+    main()
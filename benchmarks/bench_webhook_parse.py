@@ -0,0 +1,63 @@
+# benchmarks/bench_webhook_parse.py
+"""
+Webhook parsing: current path (json.loads + dict walk on every delivery)
+vs fast path (raw-body classification, decode only actionable payloads).
+
+    python -m benchmarks.bench_webhook_parse --number 20000
+"""
+
+import argparse
+import json
+import timeit
+
+from app.app.whatsapp.fanout import iter_text_messages
+from app.app.whatsapp.fastparse import classify_payload, loads, PAYLOAD_TEXT, JSON_DECODER
+from benchmarks.payloads import (
+    image_payload,
+    multi_message_payload,
+    status_payload,
+    webhook_payload,
+    text_message,
+)
+
+
+def recorded_shapes() -> dict:
+    return {
+        "status_sent": status_payload("sent"),
+        "status_delivered": status_payload("delivered"),
+        "status_read": status_payload("read"),
+        "image": image_payload(),
+        "text_single": webhook_payload([text_message("919000000001", "price kya hai", "wamid.1")]),
+        "text_batch_5x4": multi_message_payload(5, 4),
+    }
+
+
+def current_path(raw: bytes):
+    payload = json.loads(raw)
+    return list(iter_text_messages(payload))
+
+
+def fast_path(raw: bytes):
+    if classify_payload(raw) != PAYLOAD_TEXT:
+        return []
+    return list(iter_text_messages(loads(raw)))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--number", type=int, default=20000)
+    args = parser.parse_args()
+
+    print(f"decoder: {JSON_DECODER}")
+    print(f"{'shape':<18}{'bytes':>7}{'current µs':>13}{'fast µs':>10}{'speedup':>9}")
+    for name, payload in recorded_shapes().items():
+        raw = json.dumps(payload).encode("utf-8")
+        assert current_path(raw) == fast_path(raw), name
+
+        cur = timeit.timeit(lambda: current_path(raw), number=args.number) / args.number * 1e6
+        fast = timeit.timeit(lambda: fast_path(raw), number=args.number) / args.number * 1e6
+        print(f"{name:<18}{len(raw):>7}{cur:>13.2f}{fast:>10.2f}{cur / fast:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+# benchmarks/loadtest/replay.py
+"""
+Webhook replay load test.
+
+Starts the Graph + OpenAI stubs in-process, optionally spawns the backend
+(`uvicorn app.main:app`) pointed at them, then drives /whatsapp/webhook at
+a target rate. End-to-end latency = webhook POST -> matching Graph send
+arriving at the stub for that phone.
+
+Synthetic conversations (closed loop per buyer, open loop across buyers):
+
+    python -m benchmarks.loadtest.replay --spawn-app --rate 5 --duration 30
+
+Recorded deliveries (one webhook JSON per line, open loop):
+
+    python -m benchmarks.loadtest.replay --spawn-app --payloads recorded.ndjson --rate 50
+
+Save a report and compare a later run against it:
+
+    ... --out baseline.json
+    ... --baseline baseline.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict, deque
+from typing import Dict, List, Optional
+
+import httpx
+
+from app.app.whatsapp.fanout import iter_text_messages
+from app.metrics import Histogram
+from benchmarks.loadtest.stubs import StubServer, add_stub_arguments, config_from_args, create_stub_app
+from benchmarks.payloads import PHONE_NUMBER_ID, text_message, webhook_payload
+
+DEFAULT_SCRIPT = [
+    "hi",
+    "english",
+    "ok",
+    "price kya hai",
+    "what about amenities",
+    "is it rera approved",
+    "any project in kankarbagh",
+    "thinking about it",
+]
+
+
+# --------------------------------------------------
+# REPLY MATCHING
+# --------------------------------------------------
+class ReplyCollector:
+    """
+    Pairs Graph sends (seen by the stub, on its own thread) with the
+    webhook that caused them: per phone, FIFO.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.waiters: Dict[str, deque] = defaultdict(deque)
+        self.unmatched = 0
+
+    def expect(self, phone: str) -> asyncio.Future:
+        future = self.loop.create_future()
+        self.waiters[phone].append(future)
+        return future
+
+    def on_message(self, to: str, body: str) -> None:
+        arrived = time.perf_counter()
+        self.loop.call_soon_threadsafe(self._deliver, to, arrived)
+
+    def _deliver(self, to: str, arrived: float) -> None:
+        queue = self.waiters.get(to)
+        while queue:
+            future = queue.popleft()
+            if not future.done():
+                future.set_result(arrived)
+                return
+        self.unmatched += 1
+
+
+class Results:
+    def __init__(self):
+        self.e2e = Histogram(size=1_000_000)
+        self.ack = Histogram(size=1_000_000)
+        self.sent = 0
+        self.replied = 0
+        self.no_reply = 0
+        self.http_errors = 0
+        self.first_sent: Optional[float] = None
+        self.last_reply: Optional[float] = None
+
+
+# --------------------------------------------------
+# DRIVERS
+# --------------------------------------------------
+async def post_webhook(client: httpx.AsyncClient, target: str, payload: dict, results: Results) -> bool:
+    started = time.perf_counter()
+    if results.first_sent is None:
+        results.first_sent = started
+    try:
+        res = await client.post(f"{target}/whatsapp/webhook", json=payload)
+        ok = res.status_code == 200
+    except httpx.HTTPError:
+        ok = False
+    results.ack.observe((time.perf_counter() - started) * 1000)
+    results.sent += 1
+    if not ok:
+        results.http_errors += 1
+    return ok
+
+
+async def await_reply(future: asyncio.Future, sent_at: float, timeout: float, results: Results) -> None:
+    try:
+        arrived = await asyncio.wait_for(future, timeout)
+    except asyncio.TimeoutError:
+        results.no_reply += 1
+        return
+    results.replied += 1
+    results.e2e.observe((arrived - sent_at) * 1000)
+    results.last_reply = max(results.last_reply or arrived, arrived)
+
+
+async def run_conversation(idx: int, script: List[str], args, client, collector, results) -> None:
+    phone = f"9188{idx:08d}"
+    for turn, text in enumerate(script):
+        payload = webhook_payload([
+            text_message(phone, text, f"wamid.lt.{idx}.{turn}.{time.time_ns()}")
+        ])
+        future = collector.expect(phone)
+        sent_at = time.perf_counter()
+        if not await post_webhook(client, args.target, payload, results):
+            future.cancel()
+            continue
+        await await_reply(future, sent_at, args.reply_timeout, results)
+
+
+async def run_recorded(payload: dict, args, client, collector, results) -> None:
+    futures = [(collector.expect(m["phone"]), m) for m in iter_text_messages(payload)]
+    sent_at = time.perf_counter()
+    if not await post_webhook(client, args.target, payload, results):
+        for future, _ in futures:
+            future.cancel()
+        return
+    await asyncio.gather(*(await_reply(f, sent_at, args.reply_timeout, results) for f, _ in futures))
+
+
+async def drive(args, collector: ReplyCollector, results: Results) -> None:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=30) as client:
+        tasks = []
+        interval = 1.0 / args.rate
+        started = time.perf_counter()
+
+        if args.payloads:
+            with open(args.payloads, "r", encoding="utf-8") as f:
+                recorded = [json.loads(line) for line in f if line.strip()]
+            total = min(len(recorded), int(args.rate * args.duration)) if args.duration else len(recorded)
+            for i in range(total):
+                await asyncio.sleep(max(0.0, started + i * interval - time.perf_counter()))
+                tasks.append(asyncio.create_task(run_recorded(recorded[i], args, client, collector, results)))
+        else:
+            total = int(args.rate * args.duration)
+            for i in range(total):
+                await asyncio.sleep(max(0.0, started + i * interval - time.perf_counter()))
+                tasks.append(asyncio.create_task(
+                    run_conversation(i, args.script, args, client, collector, results)
+                ))
+
+        await asyncio.gather(*tasks)
+
+
+# --------------------------------------------------
+# BACKEND PROCESS
+# --------------------------------------------------
+def spawn_app(args, stub_url: str) -> subprocess.Popen:
+    env = dict(os.environ)
+    env.update({
+        "WHATSAPP_GRAPH_URL": stub_url,
+        "WHATSAPP_ACCESS_TOKEN": "loadtest",
+        "WHATSAPP_PHONE_NUMBER_ID": PHONE_NUMBER_ID,
+        "OPENAI_BASE_URL": f"{stub_url}/v1",
+        "OPENAI_API_KEY": "loadtest",
+        "WHATSAPP_DEDUP_PATH": os.path.join(tempfile.mkdtemp(), "dedup.json"),
+    })
+    port = args.target.rsplit(":", 1)[-1].split("/")[0]
+    cmd = [
+        sys.executable, "-m", "uvicorn", "app.main:app",
+        "--port", port, "--workers", str(args.app_workers), "--log-level", "warning",
+    ]
+    proc = subprocess.Popen(cmd, env=env)
+
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"{args.target}/health", timeout=1).status_code == 200:
+                return proc
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("backend did not become healthy")
+
+
+# --------------------------------------------------
+# REPORT
+# --------------------------------------------------
+def build_report(args, results: Results, stub_stats: dict, app_metrics: dict, elapsed: float) -> dict:
+    window = (results.last_reply or time.perf_counter()) - (results.first_sent or 0)
+    histograms = app_metrics.get("histograms", {}) if app_metrics else {}
+    stages = {
+        name: hist for name, hist in histograms.items()
+        if name.endswith("_ms")
+    }
+    return {
+        "config": {
+            "mode": "recorded" if args.payloads else "conversations",
+            "rate": args.rate,
+            "duration": args.duration,
+            "app_workers": args.app_workers,
+        },
+        "sent": results.sent,
+        "replied": results.replied,
+        "no_reply": results.no_reply,
+        "http_errors": results.http_errors,
+        "unmatched_replies": stub_stats.get("unmatched", 0),
+        "elapsed_s": round(elapsed, 2),
+        "throughput_replies_per_s": round(results.replied / window, 2) if window > 0 else 0.0,
+        "e2e_ms": results.e2e.snapshot(),
+        "ack_ms": results.ack.snapshot(),
+        "stages": stages,
+        "stubs": stub_stats,
+    }
+
+
+def print_report(report: dict, baseline: Optional[dict]) -> None:
+    def line(label, key, sub=None):
+        value = report[key][sub] if sub else report[key]
+        text = f"{label:<28}{value:>10}"
+        if baseline is not None:
+            base = baseline.get(key, {}).get(sub) if sub else baseline.get(key)
+            if isinstance(base, (int, float)) and base:
+                text += f"   (baseline {base}, {((value - base) / base) * 100:+.1f}%)"
+        print(text)
+
+    print()
+    print(f"sent {report['sent']}  replied {report['replied']}  no_reply {report['no_reply']}  "
+          f"http_errors {report['http_errors']}  elapsed {report['elapsed_s']}s")
+    line("throughput (replies/s)", "throughput_replies_per_s")
+    for p in ("p50", "p95", "p99"):
+        if p in report["e2e_ms"]:
+            line(f"end-to-end {p} (ms)", "e2e_ms", p)
+    for p in ("p50", "p99"):
+        if p in report["ack_ms"]:
+            line(f"webhook ack {p} (ms)", "ack_ms", p)
+
+    if report["stages"]:
+        print("\nper-stage timing (backend /metrics):")
+        for name, hist in sorted(report["stages"].items()):
+            if hist.get("count"):
+                print(f"  {name:<34} p50 {hist['p50']:>9}  p95 {hist['p95']:>9}  p99 {hist['p99']:>9}  n={hist['count']}")
+    print("\nstubs:", report["stubs"])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--target", default="http://127.0.0.1:8000")
+    parser.add_argument("--spawn-app", action="store_true", help="start uvicorn app.main:app against the stubs")
+    parser.add_argument("--app-workers", type=int, default=1)
+    parser.add_argument("--stub-port", type=int, default=9100)
+    parser.add_argument("--payloads", help="NDJSON file of recorded webhook deliveries")
+    parser.add_argument("--rate", type=float, default=5.0, help="conversations (or deliveries) started per second")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds of arrivals")
+    parser.add_argument("--script", type=lambda s: s.split("|"), default=DEFAULT_SCRIPT,
+                        help="conversation turns separated by |")
+    parser.add_argument("--reply-timeout", type=float, default=15.0)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--out", help="write JSON report here")
+    parser.add_argument("--baseline", help="compare against a previous JSON report")
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+
+    loop = asyncio.new_event_loop()
+    collector = ReplyCollector(loop)
+    results = Results()
+
+    stub = StubServer(create_stub_app(config_from_args(args), collector.on_message), port=args.stub_port).start()
+    proc = spawn_app(args, stub.url) if args.spawn_app else None
+
+    try:
+        started = time.perf_counter()
+        loop.run_until_complete(drive(args, collector, results))
+        elapsed = time.perf_counter() - started
+
+        try:
+            app_metrics = httpx.get(f"{args.target}/metrics", timeout=5).json()
+        except (httpx.HTTPError, ValueError):
+            app_metrics = {}
+        stub_stats = httpx.get(f"{stub.url}/_stats", timeout=5).json()
+        stub_stats["unmatched"] = collector.unmatched
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait(timeout=10)
+        stub.stop()
+        loop.close()
+
+    report = build_report(args, results, stub_stats, app_metrics, elapsed)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
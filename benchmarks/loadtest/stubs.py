@@ -0,0 +1,316 @@
+# benchmarks/loadtest/stubs.py
+"""
+Local stand-ins for the two external services the bot calls:
+
+- Graph API     POST /{version}/{phone_number_id}/messages
+- OpenAI        POST /v1/chat/completions   (plain + stream=true)
+
+Both inject configurable latency and error rates. Point the backend at
+them with:
+
+    WHATSAPP_GRAPH_URL=http://127.0.0.1:9100
+    OPENAI_BASE_URL=http://127.0.0.1:9100/v1
+
+Run standalone:
+
+    python -m benchmarks.loadtest.stubs --port 9100 --openai-latency-ms 800
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import threading
+import time
+from typing import Callable, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+class StubConfig:
+    def __init__(
+        self,
+        graph_latency_ms: float = 80,
+        graph_jitter_ms: float = 40,
+        graph_error_rate: float = 0.0,
+        graph_throttle_rate: float = 0.0,
+        openai_latency_ms: float = 700,
+        openai_jitter_ms: float = 300,
+        openai_error_rate: float = 0.0,
+        cache_min_tokens: int = 1024,
+        seed: Optional[int] = None,
+    ):
+        self.graph_latency_ms = graph_latency_ms
+        self.graph_jitter_ms = graph_jitter_ms
+        self.graph_error_rate = graph_error_rate
+        self.graph_throttle_rate = graph_throttle_rate
+        self.openai_latency_ms = openai_latency_ms
+        self.openai_jitter_ms = openai_jitter_ms
+        self.openai_error_rate = openai_error_rate
+        self.cache_min_tokens = cache_min_tokens
+        self.rng = random.Random(seed)
+
+    def delay(self, base_ms: float, jitter_ms: float) -> float:
+        return max(0.0, base_ms + self.rng.uniform(-jitter_ms, jitter_ms)) / 1000
+
+
+class StubStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.graph_requests = 0
+        self.graph_errors = 0
+        self.graph_throttled = 0
+        self.openai_requests = 0
+        self.openai_errors = 0
+        self.connections = set()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "graph_requests": self.graph_requests,
+                "graph_errors": self.graph_errors,
+                "graph_throttled": self.graph_throttled,
+                "openai_requests": self.openai_requests,
+                "openai_errors": self.openai_errors,
+                # distinct client (host, port) pairs ~= TCP connections opened
+                "connections": len(self.connections),
+            }
+
+    def bump(self, field: str, peer=None) -> None:
+        with self._lock:
+            setattr(self, field, getattr(self, field) + 1)
+            if peer is not None:
+                self.connections.add(peer)
+
+
+def _approx_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def create_stub_app(config: StubConfig, on_message: Optional[Callable[[str, str], None]] = None) -> FastAPI:
+    """
+    on_message(to, body) is called for every accepted Graph send.
+    """
+    app = FastAPI(title="EstatePilot external stubs")
+    stats = StubStats()
+    seen_prefixes = set()
+    app.state.stats = stats
+
+    # ---------- Graph API ----------
+    @app.post("/{version}/{phone_number_id}/messages")
+    async def graph_send(version: str, phone_number_id: str, request: Request):
+        peer = (request.client.host, request.client.port) if request.client else None
+        stats.bump("graph_requests", peer)
+        payload = await request.json()
+        await asyncio.sleep(config.delay(config.graph_latency_ms, config.graph_jitter_ms))
+
+        roll = config.rng.random()
+        if roll < config.graph_throttle_rate:
+            stats.bump("graph_throttled")
+            return JSONResponse(
+                {"error": {"code": 130429, "message": "Rate limit hit"}},
+                status_code=429,
+                headers={"Retry-After": "1"},
+            )
+        if roll < config.graph_throttle_rate + config.graph_error_rate:
+            stats.bump("graph_errors")
+            return JSONResponse({"error": {"code": 131000, "message": "stub error"}}, status_code=500)
+
+        to = payload.get("to", "")
+        if on_message is not None:
+            on_message(to, (payload.get("text") or {}).get("body", ""))
+
+        return {
+            "messaging_product": "whatsapp",
+            "contacts": [{"input": to, "wa_id": to}],
+            "messages": [{"id": f"wamid.stub.{stats.graph_requests}"}],
+        }
+
+    # ---------- OpenAI chat completions ----------
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        peer = (request.client.host, request.client.port) if request.client else None
+        stats.bump("openai_requests", peer)
+        body = await request.json()
+        await asyncio.sleep(config.delay(config.openai_latency_ms, config.openai_jitter_ms))
+
+        if config.rng.random() < config.openai_error_rate:
+            stats.bump("openai_errors")
+            return JSONResponse(
+                {"error": {"message": "stub overloaded", "type": "server_error"}},
+                status_code=500,
+            )
+
+        messages = body.get("messages") or []
+        prompt = "".join(str(m.get("content") or "") for m in messages)
+        prompt_tokens = _approx_tokens(prompt)
+
+        # Provider-style prefix caching: 128-token blocks, only above a minimum
+        cached_tokens = 0
+        block_chars = 128 * 4
+        for end in range(block_chars, len(prompt) + 1, block_chars):
+            digest = hashlib.sha1(prompt[:end].encode("utf-8")).hexdigest()
+            if digest in seen_prefixes:
+                cached_tokens = end // 4
+            seen_prefixes.add(digest)
+        if cached_tokens < config.cache_min_tokens:
+            cached_tokens = 0
+
+        fmt = (body.get("response_format") or {}).get("type")
+        if fmt in ("json_object", "json_schema"):
+            content = json.dumps({"status": "ok", "source": "stub"})
+        else:
+            content = (
+                "Sure — happy to help with that. The project is ready to move "
+                "with 2BHK and 3BHK options. Would you like pricing details?"
+            )
+        completion_tokens = _approx_tokens(content)
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "prompt_tokens_details": {"cached_tokens": cached_tokens},
+        }
+        model = body.get("model", "gpt-4o-mini")
+        created = int(time.time())
+
+        if body.get("stream"):
+            include_usage = (body.get("stream_options") or {}).get("include_usage")
+
+            async def events():
+                words = content.split(" ")
+                for i, word in enumerate(words):
+                    chunk = {
+                        "id": "chatcmpl-stub", "object": "chat.completion.chunk",
+                        "created": created, "model": model,
+                        "choices": [{
+                            "index": 0,
+                            "delta": {"content": word if i == 0 else " " + word},
+                            "finish_reason": None,
+                        }],
+                    }
+                    yield f"data: {json.dumps(chunk)}\n\n"
+                    await asyncio.sleep(0.005)
+                final = {
+                    "id": "chatcmpl-stub", "object": "chat.completion.chunk",
+                    "created": created, "model": model,
+                    "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                }
+                yield f"data: {json.dumps(final)}\n\n"
+                if include_usage:
+                    tail = {
+                        "id": "chatcmpl-stub", "object": "chat.completion.chunk",
+                        "created": created, "model": model, "choices": [], "usage": usage,
+                    }
+                    yield f"data: {json.dumps(tail)}\n\n"
+                yield "data: [DONE]\n\n"
+
+            return StreamingResponse(events(), media_type="text/event-stream")
+
+        return {
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": usage,
+        }
+
+    @app.get("/_stats")
+    async def get_stats():
+        return stats.snapshot()
+
+    return app
+
+
+def self_signed_cert(directory: str) -> tuple:
+    """
+    (certfile, keyfile) for a localhost TLS stub, via the openssl CLI.
+    Lets benchmarks include real TLS handshakes.
+    """
+    import os
+    import subprocess
+
+    cert, key = os.path.join(directory, "stub.crt"), os.path.join(directory, "stub.key")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+         "-subj", "/CN=127.0.0.1", "-keyout", key, "-out", cert],
+        check=True, capture_output=True,
+    )
+    return cert, key
+
+
+class StubServer:
+    """
+    Run the stub app with uvicorn on a background thread.
+    """
+
+    def __init__(self, app: FastAPI, host: str = "127.0.0.1", port: int = 9100,
+                 ssl_certfile: Optional[str] = None, ssl_keyfile: Optional[str] = None):
+        import uvicorn
+
+        scheme = "https" if ssl_certfile else "http"
+        self.url = f"{scheme}://{host}:{port}"
+        self._server = uvicorn.Server(uvicorn.Config(
+            app, host=host, port=port, log_level="warning",
+            ssl_certfile=ssl_certfile, ssl_keyfile=ssl_keyfile,
+        ))
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+
+    def start(self) -> "StubServer":
+        self._thread.start()
+        while not self._server.started:
+            time.sleep(0.01)
+        return self
+
+    def stop(self) -> None:
+        self._server.should_exit = True
+        self._thread.join(timeout=5)
+
+
+def add_stub_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--graph-latency-ms", type=float, default=80)
+    parser.add_argument("--graph-jitter-ms", type=float, default=40)
+    parser.add_argument("--graph-error-rate", type=float, default=0.0)
+    parser.add_argument("--graph-throttle-rate", type=float, default=0.0)
+    parser.add_argument("--openai-latency-ms", type=float, default=700)
+    parser.add_argument("--openai-jitter-ms", type=float, default=300)
+    parser.add_argument("--openai-error-rate", type=float, default=0.0)
+    parser.add_argument("--cache-min-tokens", type=int, default=1024)
+    parser.add_argument("--seed", type=int, default=None)
+
+
+def config_from_args(args) -> StubConfig:
+    return StubConfig(
+        graph_latency_ms=args.graph_latency_ms,
+        graph_jitter_ms=args.graph_jitter_ms,
+        graph_error_rate=args.graph_error_rate,
+        graph_throttle_rate=args.graph_throttle_rate,
+        openai_latency_ms=args.openai_latency_ms,
+        openai_jitter_ms=args.openai_jitter_ms,
+        openai_error_rate=args.openai_error_rate,
+        cache_min_tokens=args.cache_min_tokens,
+        seed=args.seed,
+    )
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+
+    uvicorn.run(create_stub_app(config_from_args(args)), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
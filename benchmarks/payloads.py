@@ -0,0 +1,109 @@
+# benchmarks/payloads.py
+
+import random
+import time
+
+# Synthetic Meta webhook payloads (same shape as real deliveries).
+
+SAMPLE_TEXTS = [
+    "hi", "price kya hai", "where exactly is the project", "is it rera approved",
+    "2bhk ka size kitna hai", "site visit kal kar sakte hai", "emi kitna banega",
+    "parking hai kya", "just exploring for now", "any project in kankarbagh",
+    "tell me more about amenities", "possession kab tak milega",
+]
+
+PHONE_NUMBER_ID = "100000000000001"
+
+
+def text_message(phone: str, text: str, message_id: str, ts: int = None) -> dict:
+    return {
+        "from": phone,
+        "id": message_id,
+        "timestamp": str(ts or int(time.time())),
+        "type": "text",
+        "text": {"body": text},
+    }
+
+
+def webhook_payload(messages, contacts=None) -> dict:
+    """
+    Wrap a list of message dicts into one entry/change delivery.
+    """
+    return {
+        "object": "whatsapp_business_account",
+        "entry": [{
+            "id": "WABA_ID",
+            "changes": [{
+                "field": "messages",
+                "value": {
+                    "messaging_product": "whatsapp",
+                    "metadata": {
+                        "display_phone_number": "15550000000",
+                        "phone_number_id": PHONE_NUMBER_ID,
+                    },
+                    "contacts": contacts or [],
+                    "messages": messages,
+                },
+            }],
+        }],
+    }
+
+
+def multi_message_payload(users: int, per_user: int, seq: int = 0, rng=random) -> dict:
+    """
+    One delivery carrying `users * per_user` text messages,
+    interleaved across users like Meta does under load.
+    """
+    now = int(time.time())
+    messages = []
+    for turn in range(per_user):
+        for u in range(users):
+            phone = f"9190000{seq % 1000:03d}{u:03d}"
+            messages.append(text_message(
+                phone, rng.choice(SAMPLE_TEXTS), f"wamid.{seq}.{u}.{turn}", now + turn
+            ))
+    return webhook_payload(messages)
+
+
+def status_payload(status: str = "delivered", seq: int = 0) -> dict:
+    return {
+        "object": "whatsapp_business_account",
+        "entry": [{
+            "id": "WABA_ID",
+            "changes": [{
+                "field": "messages",
+                "value": {
+                    "messaging_product": "whatsapp",
+                    "metadata": {
+                        "display_phone_number": "15550000000",
+                        "phone_number_id": PHONE_NUMBER_ID,
+                    },
+                    "statuses": [{
+                        "id": f"wamid.out.{seq}",
+                        "status": status,
+                        "timestamp": str(int(time.time())),
+                        "recipient_id": "919000000001",
+                        "conversation": {
+                            "id": "CONVERSATION_ID",
+                            "origin": {"type": "service"},
+                        },
+                        "pricing": {
+                            "billable": True,
+                            "pricing_model": "CBP",
+                            "category": "service",
+                        },
+                    }],
+                },
+            }],
+        }],
+    }
+
+
+def image_payload(seq: int = 0) -> dict:
+    return webhook_payload([{
+        "from": "919000000002",
+        "id": f"wamid.img.{seq}",
+        "timestamp": str(int(time.time())),
+        "type": "image",
+        "image": {"mime_type": "image/jpeg", "sha256": "abc", "id": "MEDIA_ID"},
+    }])
@@ -0,0 +1,61 @@
+# scripts/backfill.py
+"""
+Re-classify and re-score historical messages after the keyword tables
+or scoring weights change (app.backfill).
+
+Input: NDJSON, one message per line, time-ordered per phone:
+    {"phone": "9198...", "timestamp": 1718000000, "text": "price kya hai"}
+
+Output: one line per message with the new intent / running score / rank
+(--output, default stdout), plus final per-user states (--users).
+
+    python -m scripts.backfill --input logs/messages.ndjson --output out.ndjson --workers 4
+    python -m scripts.backfill --input logs/messages.ndjson --users users.ndjson --workers 0
+"""
+
+import argparse
+import json
+import os
+import sys
+
+from app.backfill import BACKFILL_CHUNK_SIZE, backfill, read_records, write_users
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--input", default="-", help="NDJSON file (default: stdin)")
+    parser.add_argument("--output", help="per-message results NDJSON (default: stdout, '' to skip)", default="-")
+    parser.add_argument("--users", help="final per-user states NDJSON")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="classifier processes (0 = in-process)")
+    parser.add_argument("--chunk", type=int, default=BACKFILL_CHUNK_SIZE)
+    parser.add_argument("--weight", type=int, default=5, help="score per new intent")
+    args = parser.parse_args()
+
+    source = sys.stdin if args.input == "-" else open(args.input, "r", encoding="utf-8")
+    sink = None
+    if args.output == "-":
+        sink = sys.stdout
+    elif args.output:
+        sink = open(args.output, "w", encoding="utf-8")
+
+    try:
+        users, stats = backfill(read_records(source), sink, workers=args.workers, chunk_size=args.chunk, intent_weight=args.weight)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if sink not in (None, sys.stdout):
+            sink.close()
+
+    if args.users:
+        with open(args.users, "w", encoding="utf-8") as f:
+            write_users(users, f)
+
+    print(json.dumps(stats), file=sys.stderr)
+    if stats["out_of_order"]:
+        print(f"⚠️ {stats['out_of_order']} messages older than the previous one for the same phone (input not time-ordered)", file=sys.stderr)
+    if stats["bad_timestamp"]:
+        print(f"⚠️ {stats['bad_timestamp']} timestamps neither epoch seconds nor ISO-8601 (not order-checked)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+# scripts/intent_corpus.py
+"""
+Synthetic labelled buyer messages for bootstrapping / evaluating the
+on-box intent model before enough real conversations are logged.
+
+Phrases are split per intent into train / eval pools, so evaluation
+measures generalisation to wordings the model never saw. Many phrases
+deliberately miss the keyword tables (paraphrases, typos, "kahan",
+"2 bedroom"), which is the traffic that used to fall through to GPT.
+"""
+
+import random
+from typing import List, Tuple
+
+PHRASES = {
+    "greeting": [
+        "hi", "hello", "hey there", "namaste", "good morning", "good evening", "hii",
+        "helo", "hlo", "namaskar", "hey", "hi sir", "hello ji", "pranam", "gm",
+        "good afternoon", "hellooo", "hie", "heya", "ram ram",
+    ],
+    "price_query": [
+        "what is the price", "how much does it cost", "how much for a 2 bedroom",
+        "kitne ka padega", "kitne paise lagenge", "prise list", "what's the rate",
+        "total amount kya hoga", "price range?", "cost of 3bhk", "how much is the flat",
+        "wat is the amount", "price batao", "daam kya hai", "rate per sqft",
+        "how much will it come to", "kitna lagega total", "all inclusive cost",
+        "price kitna hai", "what will i have to pay", "expected pricing", "quote please",
+        "starting kitne se hai", "how much money", "price details",
+    ],
+    "location_query": [
+        "where is it", "location?", "kahan pe hai", "which area", "address please",
+        "adress pls", "kidhar hai project", "how far from station", "nearest landmark",
+        "send location", "map bhejo", "where exactly", "which locality", "kaha hai",
+        "how far from airport", "distance from main road", "which side of patna",
+        "loc?", "where is the site located", "google map link", "kis taraf hai",
+        "near which market", "pin location", "area konsa hai",
+    ],
+    "configuration_query": [
+        "2bhk available?", "3 bhk size", "how many bedrooms", "flat size", "carpet area kitna",
+        "square feet of 2bhk", "1 bhk hai kya", "how big is the flat", "room size",
+        "2 bedroom options", "3 bed flat", "sq ft?", "kitne room hai", "ghar ka size",
+        "super built up area", "balcony kitni hai", "unit sizes", "which configurations",
+        "duplex hai kya", "floor plan of 3bhk", "size of the master bedroom", "bhk options",
+    ],
+    "amenities_query": [
+        "amenities?", "facilities kya hai", "is there a gym", "swimming pool hai",
+        "swiming pool?", "parking available", "lift hai kya", "security guard",
+        "club house", "kids play area", "power backup", "what facilities", "garden hai",
+        "cctv hai kya", "jogging track", "community hall", "water supply 24 hours",
+        "kya kya milega", "indoor games", "amnities list",
+    ],
+    "site_visit": [
+        "i want to visit", "site visit", "can i come see", "kab dekh sakte",
+        "show me the flat", "want to see the property", "visit kal", "site dikhao",
+        "can we come on sunday", "i will come tomorrow", "dekhne aana hai",
+        "visit schedule karo", "can i see the sample flat", "kab aa sakte hai",
+        "book a visit", "site tour", "want to check the site", "dekhna hai",
+    ],
+    "purchase_intent_high": [
+        "i want to book", "booking amount", "ready to buy", "i will buy", "final karna hai",
+        "token amount kitna", "how to book", "advance dena hai", "payment kaise kare",
+        "lock the unit", "i am serious buyer", "block kar do", "let's finalise",
+        "i want to purchase", "book kar do", "confirm my flat", "where do i pay",
+        "agreement kab hoga",
+    ],
+    "loan_query": [
+        "loan milega", "emi kitna", "home loan", "bank loan available", "emi options",
+        "which banks", "finance option", "loan approval", "bank tie up",
+        "down payment kitna", "monthly installment", "sbi loan hai", "loan process",
+        "interest rate", "emi calculator", "hdfc approved",
+    ],
+    "vague": [
+        "ok", "hmm", "tell me more", "thinking", "just exploring", "not sure",
+        "let me check", "later", "will think", "ok thanks", "fine", "k", "acha",
+        "thik hai", "what else", "anything else", "not now", "maybe", "will discuss with family",
+        "busy now", "ok sir", "noted",
+    ],
+}
+
+PREFIXES = ["", "", "", "sir ", "pls ", "hello ", "ji ", "bhai ", "can you tell "]
+SUFFIXES = ["", "", "", "?", " please", " pls", " ??", " sir", " bhai", " ji"]
+
+
+def _typo(text: str, rng: random.Random) -> str:
+    if len(text) < 4:
+        return text
+    i = rng.randrange(1, len(text) - 1)
+    kind = rng.choice(("drop", "double", "swap"))
+    if kind == "drop":
+        return text[:i] + text[i + 1:]
+    if kind == "double":
+        return text[:i] + text[i] + text[i:]
+    return text[:i - 1] + text[i] + text[i - 1] + text[i + 1:]
+
+
+def _split_phrases(seed: int) -> Tuple[dict, dict]:
+    rng = random.Random(seed)
+    train, held_out = {}, {}
+    for intent, phrases in PHRASES.items():
+        phrases = list(phrases)
+        rng.shuffle(phrases)
+        cut = max(1, int(len(phrases) * 0.7))
+        train[intent], held_out[intent] = phrases[:cut], phrases[cut:]
+    return train, held_out
+
+
+def _expand(pools: dict, n: int, rng: random.Random, typo_rate: float) -> List[Tuple[str, str]]:
+    intents = sorted(pools)
+    out = []
+    for _ in range(n):
+        intent = rng.choice(intents)
+        text = rng.choice(PREFIXES) + rng.choice(pools[intent]) + rng.choice(SUFFIXES)
+        if rng.random() < typo_rate:
+            text = _typo(text, rng)
+        out.append((text, intent))
+    return out
+
+
+def corpus(n_train: int = 4000, n_eval: int = 1000, seed: int = 13) -> Tuple[list, list]:
+    """
+    (train, eval) lists of (text, intent); eval uses held-out phrases.
+    """
+    train_pools, eval_pools = _split_phrases(seed)
+    rng = random.Random(seed + 1)
+    return _expand(train_pools, n_train, rng, 0.2), _expand(eval_pools, n_eval, rng, 0.2)
@@ -0,0 +1,183 @@
+# scripts/resp_server.py
+"""
+Tiny in-memory Redis-protocol stand-in for local development and the
+state benchmarks (STATE_BACKEND=redis without installing Redis). Only
+the commands app.state_store.RedisBackend uses; single process, no
+persistence (string keys honour PX expiry).
+
+    python -m scripts.resp_server --port 6399
+    STATE_BACKEND=redis STATE_REDIS_URL=redis://127.0.0.1:6399/0 uvicorn app.main:app --workers 4
+"""
+
+import argparse
+import asyncio
+import fnmatch
+import time
+from typing import Dict, List, Optional, Tuple
+
+_hashes: Dict[bytes, Dict[bytes, bytes]] = {}
+# key -> (value, expires at (monotonic) or None)
+_strings: Dict[bytes, Tuple[bytes, Optional[float]]] = {}
+# key -> number of writes, for WATCH
+_writes: Dict[bytes, int] = {}
+_WRITES = {b"HSET", b"HDEL", b"HINCRBY", b"DEL"}  # + SET when it sets
+
+
+class _Error(Exception):
+    pass
+
+
+# --------------------------------------------------
+# ENCODING
+# --------------------------------------------------
+def _encode(value) -> bytes:
+    if isinstance(value, _Error):
+        return b"-ERR %s\r\n" % str(value).encode()
+    if value is None:
+        return b"$-1\r\n"
+    if isinstance(value, str):
+        return b"+%s\r\n" % value.encode()
+    if isinstance(value, int):
+        return b":%d\r\n" % value
+    if isinstance(value, bytes):
+        return b"$%d\r\n%s\r\n" % (len(value), value)
+    return b"*%d\r\n" % len(value) + b"".join(_encode(v) for v in value)
+
+
+async def _read_command(reader: asyncio.StreamReader) -> Optional[List[bytes]]:
+    line = await reader.readline()
+    if not line:
+        return None
+    if not line.startswith(b"*"):
+        return line.split()  # inline command (redis-cli / telnet)
+    args = []
+    for _ in range(int(line[1:-2])):
+        size = int((await reader.readline())[1:-2])
+        args.append((await reader.readexactly(size + 2))[:-2])
+    return args
+
+
+# --------------------------------------------------
+# COMMANDS
+# --------------------------------------------------
+def _string(key: bytes) -> Optional[bytes]:
+    value = _strings.get(key)
+    if value is None:
+        return None
+    if value[1] is not None and value[1] <= time.monotonic():
+        del _strings[key]
+        return None
+    return value[0]
+
+
+def _run(args: List[bytes]):
+    name, rest = args[0].upper(), args[1:]
+    if name in _WRITES and rest:
+        for key in rest if name == b"DEL" else rest[:1]:
+            _writes[key] = _writes.get(key, 0) + 1
+    if name in (b"PING",):
+        return "PONG"
+    if name in (b"AUTH", b"SELECT"):
+        return "OK"
+    if name == b"FLUSHDB":
+        for key in list(_hashes) + list(_strings):
+            _writes[key] = _writes.get(key, 0) + 1
+        _hashes.clear()
+        _strings.clear()
+        return "OK"
+    if name == b"GET":
+        return _string(rest[0])
+    if name == b"SET":
+        options = [arg.upper() for arg in rest[2:]]
+        if b"NX" in options and _string(rest[0]) is not None:
+            return None
+        expires = None
+        if b"PX" in options:
+            expires = time.monotonic() + int(rest[2 + options.index(b"PX") + 1]) / 1000
+        _strings[rest[0]] = (rest[1], expires)
+        _writes[rest[0]] = _writes.get(rest[0], 0) + 1
+        return "OK"
+    if name == b"HGET":
+        return _hashes.get(rest[0], {}).get(rest[1])
+    if name == b"HGETALL":
+        return [item for pair in _hashes.get(rest[0], {}).items() for item in pair]
+    if name == b"HSET":
+        h = _hashes.setdefault(rest[0], {})
+        added = 0
+        for field, value in zip(rest[1::2], rest[2::2]):
+            added += field not in h
+            h[field] = value
+        return added
+    if name == b"HDEL":
+        h = _hashes.get(rest[0], {})
+        removed = sum(h.pop(field, None) is not None for field in rest[1:])
+        if not h:
+            _hashes.pop(rest[0], None)
+        return removed
+    if name == b"HINCRBY":
+        h = _hashes.setdefault(rest[0], {})
+        value = int(h.get(rest[1], b"0")) + int(rest[2])
+        h[rest[1]] = str(value).encode()
+        return value
+    if name == b"DEL":
+        return sum((_hashes.pop(key, None) or _strings.pop(key, None)) is not None for key in rest)
+    if name == b"SCAN":
+        # whole keyspace in one page (cursor always "0")
+        pattern = rest[rest.index(b"MATCH") + 1].decode() if b"MATCH" in rest else "*"
+        return [b"0", [k for k in [*_hashes, *_strings] if fnmatch.fnmatchcase(k.decode(), pattern)]]
+    return _Error(f"unknown command '{name.decode()}'")
+
+
+async def _client(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    queued: Optional[list] = None
+    watched: Dict[bytes, int] = {}
+    try:
+        while True:
+            args = await _read_command(reader)
+            if not args:
+                break
+            name = args[0].upper()
+            if name == b"WATCH":
+                watched.update((key, _writes.get(key, 0)) for key in args[1:])
+                reply = "OK"
+            elif name == b"UNWATCH":
+                watched, reply = {}, "OK"
+            elif name == b"MULTI":
+                queued, reply = [], "OK"
+            elif name == b"EXEC":
+                # commands run back to back: nothing else interleaves on one event loop
+                if any(_writes.get(key, 0) != seen for key, seen in watched.items()):
+                    reply = None  # a watched key was written: abort
+                else:
+                    reply = [_run(cmd) for cmd in queued or []]
+                queued, watched = None, {}
+            elif queued is not None:
+                queued.append(args)
+                reply = "QUEUED"
+            else:
+                reply = _run(args)
+            writer.write(_encode(reply))
+            await writer.drain()
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(host: str, port: int) -> None:
+    server = await asyncio.start_server(_client, host, port)
+    print(f"✅ RESP stand-in listening on {host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6399)
+    args = parser.parse_args()
+    asyncio.run(serve(args.host, args.port))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+# scripts/train_intent_model.py
+"""
+Train + evaluate the on-box intent model (app.intent_model) offline.
+
+Inputs (JSON lines, any mix):
+    {"text": "...", "intent": "price_query"}          labelled message
+    {"conversation_history": [{"from": "user", ...}]}  logged conversation
+    {"state": {"conversation_history": [...]}}         state snapshot row
+
+Buyer messages from logged conversations are weakly labelled with the
+keyword engine (app.intent_engine.detect_intent); keyword misses are
+skipped, the model learns to generalise from the hits. The synthetic
+seed corpus (scripts/intent_corpus.py) is added with --seed-corpus, or
+automatically when no labelled rows are given.
+
+    python -m scripts.train_intent_model --seed-corpus
+    python -m scripts.train_intent_model --data logs/conversations.jsonl --out data/intent_model.npz
+"""
+
+import argparse
+import json
+import random
+from typing import List, Tuple
+
+import numpy as np
+
+from app.intent_engine import detect_intent
+from app.intent_model import INTENT_MODEL_PATH, INTENT_MODEL_THRESHOLD, IntentModel
+from scripts.intent_corpus import corpus
+
+
+def read_rows(paths: List[str]) -> Tuple[list, int]:
+    """
+    Returns ([(text, intent)], number of weakly labelled messages).
+    """
+    rows, weak = [], 0
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                item = json.loads(line)
+                if item.get("text") and item.get("intent"):
+                    rows.append((item["text"], item["intent"]))
+                    continue
+                history = item.get("conversation_history") or (item.get("state") or {}).get("conversation_history") or []
+                for entry in history:
+                    if entry.get("from") != "user" or not entry.get("text"):
+                        continue
+                    intent = detect_intent(entry["text"])
+                    if intent != "vague":
+                        rows.append((entry["text"], intent))
+                        weak += 1
+    return rows, weak
+
+
+def evaluate(model: IntentModel, rows: list, threshold: float) -> dict:
+    texts = [t for t, _ in rows]
+    gold = [label for _, label in rows]
+    preds = [model.predict(t) for t in texts]
+
+    correct = np.array([p == g for (p, _), g in zip(preds, gold)])
+    conf = np.array([c for _, c in preds])
+    keyword = np.array([detect_intent(t) == g for t, g in zip(texts, gold)])
+
+    # expected calibration error over 10 confidence bins
+    ece = 0.0
+    bins = np.minimum((conf * 10).astype(int), 9)
+    for b in range(10):
+        mask = bins == b
+        if mask.any():
+            ece += mask.mean() * abs(correct[mask].mean() - conf[mask].mean())
+
+    confident = conf >= threshold
+    return {
+        "examples": len(rows),
+        "model_accuracy": round(float(correct.mean()), 4),
+        "keyword_accuracy": round(float(keyword.mean()), 4),
+        "ece": round(float(ece), 4),
+        "coverage_at_threshold": round(float(confident.mean()), 4),
+        "precision_at_threshold": round(float(correct[confident].mean()), 4) if confident.any() else None,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--data", action="append", default=[], help="JSON lines file (repeatable)")
+    parser.add_argument("--seed-corpus", action="store_true", help="add the synthetic seed corpus")
+    parser.add_argument("--epochs", type=int, default=150)
+    parser.add_argument("--threshold", type=float, default=INTENT_MODEL_THRESHOLD)
+    parser.add_argument("--out", default=INTENT_MODEL_PATH)
+    parser.add_argument("--seed", type=int, default=13)
+    args = parser.parse_args()
+
+    rows, weak = read_rows(args.data)
+    rng = random.Random(args.seed)
+    rng.shuffle(rows)
+    cut = int(len(rows) * 0.8)
+    train, held_out = rows[:cut], rows[cut:]
+
+    if args.seed_corpus or not rows:
+        seed_train, seed_eval = corpus(seed=args.seed)
+        train += seed_train
+        held_out += seed_eval
+    print(f"train {len(train)}  eval {len(held_out)}  (weakly labelled from logs: {weak})")
+
+    # calibrate on half of the held-out rows, report on the other half
+    rng.shuffle(held_out)
+    calib, test = held_out[: len(held_out) // 2], held_out[len(held_out) // 2:]
+    model = IntentModel.train([t for t, _ in train], [label for _, label in train], epochs=args.epochs)
+    temperature = model.calibrate([t for t, _ in calib], [label for _, label in calib])
+    print(f"temperature {temperature:.2f}")
+    print(json.dumps(evaluate(model, test, args.threshold), indent=2))
+
+    model.save(args.out)
+    print(f"✅ saved {args.out}")
+
+
+if __name__ == "__main__":
+    main()